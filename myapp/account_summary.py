@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import Reservation
+
+# Counted over the customer's reservations, besides the total reservation_count
+COUNTS = {
+    'pending_count': Q(status='pending'),
+    'accepted_count': Q(status='accepted'),
+    'completed_count': Q(status='completed'),
+    'expired_count': Q(status='expired'),
+    'paid_count': Q(is_paid=True),
+    'unpaid_accepted_count': Q(status='accepted', is_paid=False),
+}
+
+
+def _key(user_id):
+    return f'account_summary:{user_id}'
+
+
+def invalidate(user_ids):
+    cache.delete_many([_key(pk) for pk in user_ids])
+
+
+def summary(user):
+    """Every per-status and per-payment count of user's reservations, in one query.
+
+    Cached for ACCOUNT_SUMMARY_CACHE_SECONDS when that is set; reservation
+    saves, deletes and transitions drop the cached copy (see signals.py).
+    """
+    timeout = settings.ACCOUNT_SUMMARY_CACHE_SECONDS
+    counts = cache.get(_key(user.pk)) if timeout else None
+    if counts is None:
+        counts = Reservation.objects.filter(user=user).aggregate(
+            reservation_count=Count('pk'),
+            **{name: Count('pk', filter=condition) for name, condition in COUNTS.items()},
+        )
+        if timeout:
+            cache.set(_key(user.pk), counts, timeout)
+    return counts
@@ -1,12 +1,66 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import UserProfile, Pig, Reservation, Feedback, Cart
+from django.db import router, transaction
+
+from . import search
+from .catalog import bump_catalog_version
+from .models import (UserProfile, Pig, Reservation, Feedback, Cart, Job, DeadLetter, ArchivedRecord, SalesRollup,
+                     Notification)
+from .paginators import EstimatedCountPaginator
+
+
+class TunedModelAdmin(admin.ModelAdmin):
+    """ModelAdmin for this app's tables: estimated counts on large tables and
+    no second COUNT(*) for the "N total" link on filtered lists"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class BulkListEditMixin:
+    """Save list_editable changes with one bulk_update() instead of a save() per row.
+
+    bulk_update() sends no save signals, so list_edits_saved() redoes
+    whatever the model's receivers in signals.py would have done.
+    """
+
+    def changelist_view(self, request, extra_context=None):
+        if not (request.method == 'POST' and '_save' in request.POST):
+            return super().changelist_view(request, extra_context)
+        request._list_edits = []
+        with transaction.atomic(using=router.db_for_write(self.model)):
+            response = super().changelist_view(request, extra_context)
+            if request._list_edits:
+                self._bulk_save(request._list_edits)
+        return response
+
+    def save_model(self, request, obj, form, change):
+        if getattr(request, '_list_edits', None) is not None:
+            # Saved in changelist_view once every row has been validated
+            request._list_edits.append((obj, form.changed_data))
+        else:
+            super().save_model(request, obj, form, change)
+
+    def _bulk_save(self, edits):
+        objs = [obj for obj, _ in edits]
+        fields = {name for _, changed in edits for name in changed}
+        for field in self.model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False):
+                for obj in objs:
+                    field.pre_save(obj, add=False)
+                fields.add(field.name)
+        self.model._default_manager.bulk_update(objs, sorted(fields))
+        self.list_edits_saved(objs)
+
+    def list_edits_saved(self, objs):
+        pass
 
 # Custom User Admin to ensure password change functionality
 class CustomUserAdmin(UserAdmin):
     """Custom User admin with enhanced functionality"""
     list_display = ['username', 'email', 'first_name', 'last_name', 'is_staff', 'is_active', 'date_joined']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     list_filter = ['is_staff', 'is_superuser', 'is_active', 'date_joined']
     search_fields = ['username', 'first_name', 'last_name', 'email']
     ordering = ['-date_joined']
@@ -48,30 +102,39 @@ admin.site.register(User, CustomUserAdmin)
 
 # Register your models here.
 @admin.register(UserProfile)
-class UserProfileAdmin(admin.ModelAdmin):
+class UserProfileAdmin(TunedModelAdmin):
     list_display = ['user', 'first_name', 'last_name', 'email', 'cellphone_number', 'created_at']
+    list_select_related = ['user']
+    autocomplete_fields = ['user']
     list_filter = ['created_at']
     search_fields = ['first_name', 'last_name', 'email', 'user__username']
 
 @admin.register(Pig)
-class PigAdmin(admin.ModelAdmin):
+class PigAdmin(BulkListEditMixin, TunedModelAdmin):
     list_display = ['breed', 'age_months', 'weight_kg', 'sex', 'price', 'is_available', 'created_at']
     list_filter = ['breed', 'sex', 'is_available', 'created_at']
     search_fields = ['breed', 'description']
     list_editable = ['is_available', 'price']
 
+    def list_edits_saved(self, objs):
+        bump_catalog_version()
+        transaction.on_commit(bump_catalog_version)
+        search.index_many(objs)
+
 @admin.register(Reservation)
-class ReservationAdmin(admin.ModelAdmin):
+class ReservationAdmin(TunedModelAdmin):
     list_display = ['user', 'pig', 'fullname', 'contact_number', 'delivery_option', 'payment_method', 'status', 'created_at']
     list_filter = ['delivery_option', 'payment_method', 'status', 'created_at']
     search_fields = ['fullname', 'contact_number', 'user__username']
-    list_editable = ['status']
+    list_select_related = ['user', 'pig']
+    autocomplete_fields = ['user', 'pig']
 
 @admin.register(Feedback)
-class FeedbackAdmin(admin.ModelAdmin):
+class FeedbackAdmin(TunedModelAdmin):
     list_display = ['user', 'feedback_type', 'overall_rating', 'get_average_rating', 'would_recommend', 'created_at']
     list_filter = ['feedback_type', 'overall_rating', 'would_recommend', 'created_at']
     search_fields = ['user__username', 'comments']
+    list_select_related = ['user']
     readonly_fields = ['user', 'reservation', 'feedback_type', 'created_at', 'get_average_rating']
     
     def get_average_rating(self, obj):
@@ -91,11 +154,56 @@ class FeedbackAdmin(admin.ModelAdmin):
     )
 
 @admin.register(Cart)
-class CartAdmin(admin.ModelAdmin):
+class CartAdmin(TunedModelAdmin):
     list_display = ['user', 'pig', 'quantity', 'get_total_price', 'created_at']
     list_filter = ['created_at']
     search_fields = ['user__username', 'pig__breed']
+    list_select_related = ['user', 'pig']
+    autocomplete_fields = ['user', 'pig']
     
     def get_total_price(self, obj):
         return f"₱{obj.get_total_price():,.2f}"
     get_total_price.short_description = 'Total Price'
+
+@admin.register(Job)
+class JobAdmin(TunedModelAdmin):
+    list_display = ['task', 'status', 'attempts', 'run_at', 'locked_by', 'created_at']
+    list_filter = ['task', 'status']
+    readonly_fields = ['locked_by', 'locked_at', 'last_error', 'created_at']
+
+@admin.register(DeadLetter)
+class DeadLetterAdmin(TunedModelAdmin):
+    list_display = ['task', 'attempts', 'enqueued_at', 'failed_at']
+    list_filter = ['task']
+    readonly_fields = ['task', 'payload', 'attempts', 'error', 'enqueued_at', 'failed_at']
+    actions = ['requeue']
+
+    def requeue(self, request, queryset):
+        """Put the selected jobs back on the queue"""
+        from .jobs import requeue_dead_letter
+        for dead_letter in queryset:
+            requeue_dead_letter(dead_letter)
+    requeue.short_description = "Requeue selected jobs"
+
+@admin.register(Notification)
+class NotificationAdmin(TunedModelAdmin):
+    list_display = ['user', 'kind', 'is_read', 'created_at']
+    list_filter = ['kind', 'is_read']
+    search_fields = ['user__username']
+    list_select_related = ['user']
+    # Read-only: the unread counters are kept by myapp.notifications
+    readonly_fields = ['user', 'kind', 'reservation', 'message', 'is_read', 'created_at']
+
+@admin.register(ArchivedRecord)
+class ArchivedRecordAdmin(TunedModelAdmin):
+    list_display = ['kind', 'object_id', 'user', 'created_at', 'archived_at']
+    list_filter = ['kind', 'archived_at']
+    search_fields = ['user__username']
+    list_select_related = ['user']
+    readonly_fields = ['kind', 'object_id', 'user', 'created_at', 'data', 'archived_at']
+
+@admin.register(SalesRollup)
+class SalesRollupAdmin(TunedModelAdmin):
+    list_display = ['month', 'breed', 'orders', 'revenue']
+    list_filter = ['breed']
+    readonly_fields = ['month', 'breed', 'orders', 'revenue']
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class MyappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'myapp'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .metrics import on_connection_created
+        from . import signals, tasks  # noqa: F401
+
+        connection_created.connect(on_connection_created, dispatch_uid='myapp.metrics.connection_created')
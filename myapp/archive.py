@@ -0,0 +1,220 @@
+import json
+import time
+from collections import defaultdict
+from datetime import date, datetime, time as datetime_time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import serializers
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import search
+from .models import ArchivedRecord, Conversation, Feedback, Message, Pig, Reservation, Revenue, SalesRollup
+
+# Notifications aren't archived; prune_notifications deletes them after
+# NOTIFICATION_RETENTION_DAYS
+KINDS = ['reservation', 'message']
+
+# Reservation statuses that are finished with and safe to archive
+ARCHIVE_STATUSES = ['completed', 'expired']
+
+
+def cutoff(months=None):
+    """Rows last touched before this are archived (default ARCHIVE_AFTER_MONTHS)"""
+    months = settings.ARCHIVE_AFTER_MONTHS if months is None else months
+    return timezone.now() - timedelta(days=30 * months)
+
+
+def _month(value):
+    # Same month TruncMonth('created_at') gives in tracking_records
+    return timezone.localtime(value).date().replace(day=1)
+
+
+def _encode(value):
+    # Unlike DjangoJSONEncoder, keeps microseconds so restored rows match
+    if isinstance(value, (datetime, date, datetime_time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'Cannot archive {value!r}')
+
+
+def _dump(objects):
+    return json.loads(json.dumps(serializers.serialize('python', objects), default=_encode))
+
+
+def _load(rows):
+    # Raw saves keep the original ids and timestamps, like loaddata
+    for obj in serializers.deserialize('python', rows):
+        obj.save()
+
+
+def _candidates(before):
+    return {
+        'reservation': Reservation.objects.filter(status__in=ARCHIVE_STATUSES, updated_at__lt=before),
+        'message': Message.objects.filter(is_read=True, created_at__lt=before),
+    }
+
+
+def _update_rollups(changes, sign):
+    for (month, breed), (orders, revenue) in changes.items():
+        rollup, _ = SalesRollup.objects.get_or_create(month=month, breed=breed)
+        SalesRollup.objects.filter(pk=rollup.pk).update(
+            orders=F('orders') + sign * orders, revenue=F('revenue') + sign * revenue
+        )
+    SalesRollup.objects.filter(orders=0).delete()
+
+
+def _archive_reservations(batch):
+    revenue = dict(Revenue.objects.filter(reservation__in=batch).values_list('reservation_id', 'pk'))
+    # Detach the sales so deleting the reservations doesn't cascade to them
+    Revenue.objects.filter(pk__in=revenue.values()).update(reservation=None)
+    feedback = defaultdict(list)
+    for reservation_id, pk in Feedback.objects.filter(reservation__in=batch).values_list('reservation_id', 'pk'):
+        feedback[reservation_id].append(pk)
+    rollups = defaultdict(lambda: [0, Decimal(0)])
+    records = []
+    for reservation in batch:
+        month = _month(reservation.created_at)
+        records.append(ArchivedRecord(
+            kind='reservation', object_id=reservation.pk, user_id=reservation.user_id,
+            created_at=reservation.created_at,
+            data={
+                'rows': _dump([reservation, *reservation.payment_proofs.all()]),
+                'month': month.isoformat(),
+                'breed': reservation.pig.breed,
+                'price': str(reservation.pig.price),
+                # Revenue and Feedback rows keep existing with reservation NULL
+                # (see above and Feedback's SET_NULL); restore points them back
+                'revenue': revenue.get(reservation.pk),
+                'feedback': feedback[reservation.pk],
+            },
+        ))
+        if reservation.status == 'completed':
+            rollups[month, reservation.pig.breed][0] += 1
+            rollups[month, reservation.pig.breed][1] += reservation.pig.price
+    _update_rollups(rollups, 1)
+    return records
+
+
+def _archive_messages(batch):
+    return [
+        ArchivedRecord(kind='message', object_id=message.pk, created_at=message.created_at,
+                       user_id=message.conversation.user_id if message.conversation else None,
+                       data={'rows': _dump([message])})
+        for message in batch
+    ]
+
+
+ARCHIVERS = {
+    'reservation': (lambda qs: qs.select_related('pig').prefetch_related('payment_proofs'), _archive_reservations),
+    'message': (lambda qs: qs.select_related('conversation'), _archive_messages),
+}
+
+
+def archive(months=None, kinds=None, dry_run=False, batch_size=500, pause=0.1):
+    """Move old finished rows into ArchivedRecord and return counts per kind.
+
+    Archives completed and expired reservations (with their payment proofs)
+    not updated for `months`, and read messages older than that. Completed sales are added to SalesRollup so
+    tracking_records still counts them. Each batch moves in one
+    transaction.
+    """
+    candidates = _candidates(cutoff(months))
+    counts = {}
+    for kind in kinds or KINDS:
+        queryset = candidates[kind].order_by('pk')
+        if dry_run:
+            counts[kind] = queryset.count()
+            continue
+        prepare, build = ARCHIVERS[kind]
+        counts[kind] = 0
+        while True:
+            with transaction.atomic():
+                batch = list(prepare(queryset.select_for_update(of=('self',)))[:batch_size])
+                if not batch:
+                    break
+                ArchivedRecord.objects.bulk_create(build(batch))
+                # Queryset delete still sends post_delete, which drops the
+                # search documents
+                queryset.model.objects.filter(pk__in=[obj.pk for obj in batch]).delete()
+            counts[kind] += len(batch)
+            if len(batch) < batch_size:
+                break
+            time.sleep(pause)
+    return counts
+
+
+def _restore_reservation(record):
+    data = record.data
+    reservation = data['rows'][0]['fields']
+    if not Pig.objects.filter(pk=reservation['pig']).exists():
+        return False
+    _load(data['rows'])
+    Revenue.objects.filter(pk=data['revenue'], reservation__isnull=True).update(reservation_id=record.object_id)
+    Feedback.objects.filter(pk__in=data['feedback'], reservation__isnull=True).update(reservation_id=record.object_id)
+    if reservation['status'] == 'completed':
+        month = date.fromisoformat(data['month'])
+        _update_rollups({(month, data['breed']): (1, Decimal(data['price']))}, -1)
+    search.index_instance(Reservation.objects.select_related('pig').get(pk=record.object_id))
+    return True
+
+
+def _restore_message(record):
+    conversation_id = record.data['rows'][0]['fields']['conversation']
+    if conversation_id is not None and not Conversation.objects.filter(pk=conversation_id).exists():
+        return False
+    _load(record.data['rows'])
+    search.index_instance(Message.objects.get(pk=record.object_id))
+    return True
+
+
+RESTORERS = {
+    'reservation': _restore_reservation,
+    'message': _restore_message,
+}
+
+
+def restore(kinds=None, user=None, since=None, until=None, dry_run=False):
+    """Move archived rows back into their live tables, undoing archive().
+
+    Filters by kind, user and created_at range. Rows whose pig or
+    conversation has since been deleted stay archived and are counted
+    under 'skipped'. Returns counts per kind.
+    """
+    records = ArchivedRecord.objects.filter(kind__in=kinds or KINDS).order_by('created_at')
+    if user is not None:
+        records = records.filter(user=user)
+    if since is not None:
+        records = records.filter(created_at__gte=since)
+    if until is not None:
+        records = records.filter(created_at__lt=until)
+
+    counts = defaultdict(int)
+    for record in records.iterator():
+        if dry_run:
+            counts[record.kind] += 1
+            continue
+        with transaction.atomic():
+            if RESTORERS[record.kind](record):
+                record.delete()
+                counts[record.kind] += 1
+            else:
+                counts['skipped'] += 1
+    return dict(counts)
+
+
+def archived_sales(key=None, **filters):
+    """Archived completed orders and revenue from SalesRollup, grouped by key(rollup).
+
+    With no key everything is totalled under None. Returns a defaultdict of
+    {'orders': n, 'revenue': Decimal}, so missing groups read as zero.
+    """
+    totals = defaultdict(lambda: {'orders': 0, 'revenue': Decimal(0)})
+    for rollup in SalesRollup.objects.filter(**filters):
+        group = totals[key(rollup) if key else None]
+        group['orders'] += rollup.orders
+        group['revenue'] += rollup.revenue
+    return totals
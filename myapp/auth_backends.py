@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+from .models import UserProfile
+
+
+def _key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def invalidate(user_id):
+    """Drop the cached user so the next request reloads it"""
+    cache.delete(_key(user_id))
+
+
+def ensure_profile(user):
+    """user's UserProfile, created from the User's own fields if it is missing"""
+    try:
+        return user.userprofile
+    except UserProfile.DoesNotExist:
+        profile, _ = UserProfile.objects.get_or_create(user=user, defaults={
+            'first_name': user.first_name, 'last_name': user.last_name, 'email': user.email, 'address': '',
+        })
+        user.userprofile = profile
+        return profile
+
+
+class ProfileBackend(ModelBackend):
+    """ModelBackend whose per-request user lookup also loads the UserProfile.
+
+    AuthenticationMiddleware resolves request.user through get_user(); here
+    that is one query joining auth_user to myapp_userprofile, and with a
+    shared cache (AUTH_USER_CACHE_SECONDS > 0) usually none at all. User and
+    UserProfile saves drop the cached pair (see signals.py), and a password
+    change still logs other sessions out because the session hash is
+    checked against the reloaded user.
+    """
+
+    def get_user(self, user_id):
+        timeout = settings.AUTH_USER_CACHE_SECONDS
+        user = cache.get(_key(user_id)) if timeout else None
+        if user is None:
+            user = User._default_manager.select_related('userprofile').filter(pk=user_id).first()
+            if user is None:
+                return None
+            ensure_profile(user)
+            if timeout:
+                cache.set(_key(user_id), user, timeout)
+        return user if self.user_can_authenticate(user) else None
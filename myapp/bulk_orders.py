@@ -0,0 +1,101 @@
+from django.db import transaction
+
+from . import notifications, search
+from .catalog import bump_catalog_version
+from .expiry import releasable_pigs
+from .models import Notification, Pig, Reservation, Revenue
+from .transitions import ENOUGH_DOWN_PAYMENT, GUARDS, MINIMUM_DOWN_PAYMENT, TRANSITIONS, transition
+
+ACTIONS = ['accept', 'decline', 'mark_paid']
+
+
+def _results(ids, done, rows, reason):
+    """Per-order results in request order; reason(row) explains a skipped order"""
+    results = []
+    for pk in ids:
+        row = rows.get(pk)
+        if row is None:
+            results.append({'id': pk, 'ok': False, 'message': 'Order not found'})
+        elif pk in done:
+            results.append({'id': pk, 'ok': True, 'message': done[pk]})
+        else:
+            results.append({'id': pk, 'ok': False, 'message': reason(row)})
+    return results
+
+
+def accept(ids):
+    """Accept pending orders whose down payment (if any) covers the 50% minimum"""
+    rows = {row['pk']: row for row in Reservation.objects.filter(pk__in=ids).annotate(
+        minimum=MINIMUM_DOWN_PAYMENT
+    ).values('pk', 'fullname', 'status', 'down_payment', 'minimum')}
+    with transaction.atomic():
+        accepted = list(Reservation.objects.select_for_update(of=('self',)).filter(
+            pk__in=ids, status='pending'
+        ).filter(ENOUGH_DOWN_PAYMENT).values_list('pk', flat=True))
+        transition('accept', accepted)
+
+    def reason(row):
+        if row['status'] != 'pending':
+            return f"{row['fullname']}: order is already {row['status']}"
+        return (f"{row['fullname']}: payment of ₱{row['down_payment']:,.2f} is insufficient, "
+                f"minimum 50% down payment is ₱{row['minimum']:,.2f}")
+    done = {row['pk']: f"{row['fullname']}: accepted" for row in rows.values() if row['pk'] in accepted}
+    return _results(ids, done, rows, reason)
+
+
+def decline(ids):
+    """Delete pending or accepted orders, release their pigs and notify the customers"""
+    rows = {row['pk']: row for row in Reservation.objects.filter(pk__in=ids).values(
+        'pk', 'fullname', 'status', 'user_id', 'pig_id', 'pig__breed', 'pig__price'
+    )}
+    with transaction.atomic():
+        declined = list(Reservation.objects.select_for_update(of=('self',)).filter(
+            pk__in=ids, status__in=['pending', 'accepted']
+        ).values_list('pk', flat=True))
+        notifications.notify([
+            Notification(user_id=rows[pk]['user_id'], kind='order_declined',
+                         message=notifications.message_for('order_declined', rows[pk]['pig__breed'],
+                                                           rows[pk]['pig__price']))
+            for pk in declined
+        ])
+        pig_ids = {rows[pk]['pig_id'] for pk in declined}
+        released = list(releasable_pigs(pig_ids, declined).values_list('pk', flat=True))
+        Pig.objects.filter(pk__in=released).update(is_available=True)
+        Reservation.objects.filter(pk__in=declined).delete()
+    if released:
+        # update() skips the save signals that keep these in step
+        bump_catalog_version()
+        search.index_many(Pig.objects.filter(pk__in=released))
+
+    done = {pk: f"{rows[pk]['fullname']}: declined, customer notified" for pk in declined}
+    return _results(ids, done, rows, lambda row: f"{row['fullname']}: order is already {row['status']}")
+
+
+def mark_paid(ids):
+    """Mark unpaid orders paid, which completes them, and record their revenue"""
+    rows = {row['pk']: row for row in Reservation.objects.filter(pk__in=ids).values(
+        'pk', 'fullname', 'status', 'is_paid'
+    )}
+    sources = TRANSITIONS['mark_paid'][0]
+    with transaction.atomic():
+        paid = list(Reservation.objects.select_for_update(of=('self',)).filter(
+            pk__in=ids, status__in=sources
+        ).filter(GUARDS['mark_paid']).select_related('pig'))
+        transition('mark_paid', [r.pk for r in paid])
+        Revenue.objects.bulk_create([
+            Revenue(reservation=r, amount=r.pig.price, pig_breed=r.pig.breed, customer_name=r.fullname,
+                    payment_method=r.payment_method)
+            for r in paid
+        ], ignore_conflicts=True)
+
+    def reason(row):
+        if row['is_paid']:
+            return f"{row['fullname']}: already paid"
+        return f"{row['fullname']}: order is already {row['status']}"
+    done = {r.pk: f"{r.fullname}: paid, ₱{r.pig.price:,.2f} added to revenue" for r in paid}
+    return _results(ids, done, rows, reason)
+
+
+def run(action, ids):
+    """Apply one of ACTIONS to the orders in ids; returns per-order results"""
+    return {'accept': accept, 'decline': decline, 'mark_paid': mark_paid}[action](ids)
@@ -0,0 +1,29 @@
+import time
+
+from django.core.cache import cache
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def catalog_version():
+    """Monotonically increasing counter bumped on every Pig write.
+
+    Cached catalog data (facet counts, inventory snapshots) is keyed on it.
+    The counter starts from the clock, so an evicted or flushed cache never
+    moves it backwards.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, time.time_ns() // 1000, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Call after any Pig write that bypasses save()/delete() signals (e.g. .update())"""
+    catalog_version()
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        # Evicted between the two calls
+        return catalog_version()
@@ -0,0 +1,140 @@
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:
+    # Optional: without it every client gets gzip
+    brotli = None
+
+# Blocks whose whitespace is significant and left untouched by minify_html()
+PRESERVED_BLOCK_RE = re.compile(r'(<(pre|textarea|script|style)\b.*?</\2\s*>)', re.IGNORECASE | re.DOTALL)
+NEWLINE_RUN_RE = re.compile(r'[ \t]*(?:\r?\n[ \t]*)+')
+SPACE_RUN_RE = re.compile(r'[ \t]{2,}')
+
+
+def minify_html(html):
+    """Collapse indentation and blank lines outside <pre>/<textarea>/<script>/<style>.
+
+    Newlines are kept (as single newlines) so inline event handlers that
+    rely on line breaks behave the same.
+    """
+    parts = PRESERVED_BLOCK_RE.split(html)
+    out = []
+    # split() yields text, block, tag name, text, block, tag name, ...
+    for index in range(0, len(parts), 3):
+        text = NEWLINE_RUN_RE.sub('\n', parts[index])
+        out.append(SPACE_RUN_RE.sub(' ', text))
+        if index + 1 < len(parts):
+            out.append(parts[index + 1])
+    return ''.join(out)
+
+
+def accepted_encodings(header):
+    """Encodings from an Accept-Encoding header that the client didn't refuse with q=0"""
+    accepted = set()
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name and q > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def choose_encoding(header, has_secret=False):
+    """Encoding to use for a client's Accept-Encoding header, or None.
+
+    Responses that carry a secret (a CSRF token) never get brotli: only the
+    gzip path randomizes its output length against BREACH.
+    """
+    accepted = accepted_encodings(header)
+    if brotli is not None and 'br' in accepted and not has_secret:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return compress_string(data, max_random_bytes=settings.COMPRESSION_GZIP_RANDOM_BYTES)
+
+
+def compress_stream(chunks, encoding):
+    """Compress an iterable of byte chunks as they arrive (brotli flushes after each)"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        yield from compress_sequence(chunks, max_random_bytes=settings.COMPRESSION_GZIP_RANDOM_BYTES)
+
+
+class CompressionMiddleware:
+    """Brotli or gzip responses according to Accept-Encoding.
+
+    Like django.middleware.gzip.GZipMiddleware, but prefers brotli when the
+    client and server both support it and the response carries no CSRF
+    token, and compresses streaming responses chunk by chunk. gzip output
+    gets the same random-length filename GZipMiddleware adds against BREACH. Responses smaller than COMPRESSION_MIN_SIZE or already
+    encoded (WhiteNoise's precompressed static files) pass through. With
+    COMPRESSION_MINIFY_HTML, HTML whitespace is collapsed first.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.has_header('Content-Encoding') or getattr(response, 'is_async', False):
+            return response
+
+        is_html = response.get('Content-Type', '').startswith('text/html')
+        if settings.COMPRESSION_MINIFY_HTML and is_html and not response.streaming:
+            charset = response.charset or 'utf-8'
+            response.content = minify_html(response.content.decode(charset)).encode(charset)
+            if response.has_header('Content-Length'):
+                response['Content-Length'] = str(len(response.content))
+
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        # Any page that calls get_token() (e.g. renders {% csrf_token %}) has
+        # CsrfViewMiddleware (re)send the CSRF cookie
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''),
+                                   has_secret=settings.CSRF_COOKIE_NAME in response.cookies)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_stream(response.streaming_content, encoding)
+            # The compressed length isn't known up front
+            del response['Content-Length']
+        else:
+            compressed = compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # The body changed, so a strong ETag would be wrong (RFC 9110 8.8.3)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,70 @@
+from django.contrib.auth.models import User
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection
+from django.db.models import Q
+from django.db.models.functions import Greatest
+
+from .models import UserProfile
+
+USERNAME_MAX_LENGTH = User._meta.get_field('username').max_length
+
+
+def allocate_username(base):
+    """Return base, or base<N> with the smallest free N, using one query.
+
+    Replaces probing User.objects.filter(username=...).exists() in a loop.
+    """
+    base = base[:USERNAME_MAX_LENGTH - 6] or 'customer'
+    taken = set(User.objects.filter(username__startswith=base).values_list('username', flat=True))
+    if base not in taken:
+        return base
+    suffixes = {
+        int(username[len(base):])
+        for username in taken
+        if username[len(base):].isdigit()
+    }
+    counter = 1
+    while counter in suffixes:
+        counter += 1
+    return f"{base}{counter}"
+
+
+def autocomplete_customers(query, limit=10):
+    """Customers whose name, username, email or phone contains every word of query.
+
+    On PostgreSQL the icontains lookups are served by the trigram indexes
+    from migration 0022 and results are ordered by word similarity.
+    """
+    terms = query.split()[:4]
+    if not terms:
+        return User.objects.none()
+
+    users = User.objects.filter(is_staff=False, is_superuser=False, is_active=True)
+    for term in terms:
+        profile_matches = UserProfile.objects.filter(
+            Q(first_name__icontains=term) |
+            Q(last_name__icontains=term) |
+            Q(email__icontains=term) |
+            Q(cellphone_number__icontains=term)
+        ).values('user_id')
+        users = users.filter(
+            Q(username__icontains=term) |
+            Q(email__icontains=term) |
+            Q(first_name__icontains=term) |
+            Q(last_name__icontains=term) |
+            Q(id__in=profile_matches)
+        )
+
+    users = users.select_related('userprofile')
+    if connection.vendor == 'postgresql':
+        users = users.annotate(
+            similarity=Greatest(
+                TrigramWordSimilarity(query, 'username'),
+                TrigramWordSimilarity(query, 'email'),
+                TrigramWordSimilarity(query, 'first_name'),
+                TrigramWordSimilarity(query, 'last_name'),
+            )
+        ).order_by('-similarity', 'username')
+    else:
+        users = users.order_by('username')
+    return users[:limit]
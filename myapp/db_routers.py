@@ -0,0 +1,98 @@
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+
+REPLICA_ALIAS = 'replica'
+PIN_COOKIE = 'db_pin'
+
+# Per-request routing state. ReplicaPinningMiddleware resets these on every
+# request because WSGI worker threads are reused between requests.
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+_pinned_to_primary = contextvars.ContextVar('pinned_to_primary', default=False)
+_wrote_to_primary = contextvars.ContextVar('wrote_to_primary', default=False)
+
+# Apps that must always be read from the primary
+PRIMARY_ONLY_APPS = {'sessions'}
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def use_replica():
+    """Send reads inside the block to the replica (when one is configured)"""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def read_from_replica(view_func):
+    """View decorator for read-mostly reporting and catalog pages"""
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        with use_replica():
+            return view_func(request, *args, **kwargs)
+    return _wrapped_view
+
+
+class PrimaryReplicaRouter:
+    """Route reads from replica-marked views to the replica, everything else to default.
+
+    Reads stay on the primary when no replica is configured, inside a
+    transaction, after the current request wrote, or while the browser is
+    pinned by ReplicaPinningMiddleware (read-your-writes).
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get() or not replica_configured():
+            return 'default'
+        if _pinned_to_primary.get() or _wrote_to_primary.get():
+            return 'default'
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return 'default'
+        if connections['default'].in_atomic_block:
+            return 'default'
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in PRIMARY_ONLY_APPS:
+            _wrote_to_primary.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives schema changes through replication
+        return db == 'default'
+
+
+class ReplicaPinningMiddleware:
+    """Keep a browser on the primary for REPLICA_PIN_SECONDS after it writes"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned_token = _pinned_to_primary.set(PIN_COOKIE in request.COOKIES)
+        wrote_token = _wrote_to_primary.set(False)
+        try:
+            response = self.get_response(request)
+            if _wrote_to_primary.get() and replica_configured():
+                response.set_cookie(
+                    PIN_COOKIE, '1',
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True,
+                    samesite='Lax',
+                )
+        finally:
+            _pinned_to_primary.reset(pinned_token)
+            _wrote_to_primary.reset(wrote_token)
+        return response
@@ -0,0 +1,108 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from . import search
+from .catalog import bump_catalog_version
+from .models import Cart, PaymentProof, Pig, Reservation
+from .transitions import transition
+
+# Statuses that still hold a pig
+ACTIVE_STATUSES = ['pending', 'accepted', 'completed']
+
+
+def _paid_something():
+    """Pending orders with a down payment or payment proof, which wait for the
+    admin's review however long it takes"""
+    return (Q(down_payment__gt=0)
+            | (Q(proof_of_payment__isnull=False) & ~Q(proof_of_payment=''))
+            | Exists(PaymentProof.objects.filter(reservation=OuterRef('pk'))))
+
+
+def _expirable(cutoff):
+    return Q(status='pending', created_at__lt=cutoff) & ~_paid_something()
+
+
+def releasable_pigs(pig_ids, exclude_reservations):
+    """Unavailable pigs among pig_ids that no other active reservation holds"""
+    held = Reservation.objects.filter(pig_id__in=pig_ids, status__in=ACTIVE_STATUSES).exclude(
+        pk__in=exclude_reservations
+    ).values('pig_id')
+    return Pig.objects.filter(pk__in=pig_ids, is_available=False).exclude(pk__in=held)
+
+
+def _batches(queryset, batch_size, pause):
+    """Yield lists of primary keys from queryset, re-querying after each batch"""
+    while True:
+        ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return
+        yield ids
+        if len(ids) < batch_size:
+            return
+        time.sleep(pause)
+
+
+def expire_reservations(dry_run=False, batch_size=200, pause=0.1):
+    """Expire reservations pending longer than RESERVATION_PENDING_TTL_HOURS.
+
+    Orders the customer has paid a down payment on or uploaded a payment
+    proof for are never expired.
+
+    Each expired reservation gets status 'expired', its pig is made
+    available again (unless another active reservation holds it) and the
+    customer gets an 'order_expired' Notification from the transition
+    signal. Returns {'reservations': n, 'pigs': n, 'notifications': n}.
+    """
+    cutoff = timezone.now() - timedelta(hours=settings.RESERVATION_PENDING_TTL_HOURS)
+    stale = Reservation.objects.filter(_expirable(cutoff)).order_by('pk')
+    counts = {'reservations': 0, 'pigs': 0, 'notifications': 0}
+
+    if dry_run:
+        counts['reservations'] = counts['notifications'] = stale.count()
+        counts['pigs'] = releasable_pigs(stale.values('pig_id'), stale.values('pk')).count()
+        return counts
+
+    released = []
+    for ids in _batches(stale, batch_size, pause):
+        with transaction.atomic():
+            # Lock the batch and re-check it, so an order the admin accepted
+            # meanwhile is left alone
+            reservations = list(
+                Reservation.objects.select_for_update()
+                .filter(_expirable(cutoff), pk__in=ids)
+            )
+            if not reservations:
+                continue
+            transition('expire', [r.pk for r in reservations])
+            # Pigs still held by another active reservation stay unavailable
+            batch_released = list(
+                releasable_pigs({r.pig_id for r in reservations}, []).values_list('pk', flat=True)
+            )
+            Pig.objects.filter(pk__in=batch_released).update(is_available=True)
+        released += batch_released
+        counts['reservations'] += len(reservations)
+        counts['notifications'] += len(reservations)
+        counts['pigs'] += len(batch_released)
+
+    if released:
+        # update() skips the save signals that keep these in step
+        bump_catalog_version()
+        search.index_many(Pig.objects.filter(pk__in=released))
+    return counts
+
+
+def prune_carts(dry_run=False, batch_size=1000, pause=0.1):
+    """Delete cart rows older than CART_TTL_DAYS or whose pig is no longer available"""
+    cutoff = timezone.now() - timedelta(days=settings.CART_TTL_DAYS)
+    stale = Cart.objects.filter(Q(created_at__lt=cutoff) | Q(pig__is_available=False)).order_by('pk')
+    if dry_run:
+        return stale.count()
+    deleted = 0
+    for ids in _batches(stale, batch_size, pause):
+        deleted += Cart.objects.filter(pk__in=ids).delete()[0]
+    return deleted
@@ -0,0 +1,96 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, CharField, Count, Value, When
+
+from .catalog import catalog_version
+from .models import Pig
+
+# (key, label, exclusive upper bound); the last bucket has no upper bound
+AGE_BUCKETS = [
+    ('under_3', 'Under 3 months', 3),
+    ('3_5', '3-5 months', 6),
+    ('6_11', '6-11 months', 12),
+    ('12_plus', '1 year and up', None),
+]
+
+# The Pigs/Piglets toggle on available_pigs.html (piglets are under 6 months)
+AGE_GROUPS = {
+    'piglets': {'under_3', '3_5'},
+    'pigs': {'6_11', '12_plus'},
+}
+
+
+def _bucket(field, buckets):
+    whens = [
+        When(**{f'{field}__lt': upper}, then=Value(key))
+        for key, _, upper in buckets if upper is not None
+    ]
+    return Case(*whens, default=Value(buckets[-1][0]), output_field=CharField())
+
+
+def _facet_list(choices, counts):
+    return [{'value': value, 'label': label, 'count': counts.get(value, 0)} for value, label, *_ in choices]
+
+
+def _compute(pigs, breed, age_filter):
+    """The breed and pigs/piglets counts available_pigs.html renders"""
+    rows = list(
+        pigs.order_by()
+        .annotate(age_bucket=_bucket('age_months', AGE_BUCKETS))
+        .values('breed', 'age_bucket')
+        .annotate(count=Count('id'))
+    )
+
+    age_group = AGE_GROUPS.get(age_filter)
+
+    def matches_breed(row):
+        return not breed or row['breed'] == breed
+
+    def matches_age_group(row):
+        return age_group is None or row['age_bucket'] in age_group
+
+    counts = {'breed': {}, 'age_group': {}}
+    total = 0
+    for row in rows:
+        n = row['count']
+        # Each selectable facet is counted ignoring its own selection, so
+        # the options show what picking them would return
+        if matches_age_group(row):
+            counts['breed'][row['breed']] = counts['breed'].get(row['breed'], 0) + n
+        if matches_breed(row):
+            for group, buckets in AGE_GROUPS.items():
+                if row['age_bucket'] in buckets:
+                    counts['age_group'][group] = counts['age_group'].get(group, 0) + n
+        if matches_breed(row) and matches_age_group(row):
+            total += n
+
+    return {
+        'total': total,
+        'breeds': _facet_list(Pig.BREED_CHOICES, counts['breed']),
+        'age_groups': {
+            'all': sum(counts['age_group'].values()),
+            'pigs': counts['age_group'].get('pigs', 0),
+            'piglets': counts['age_group'].get('piglets', 0),
+        },
+    }
+
+
+def facet_counts(pigs, breed='', age_filter='', params=None):
+    """Facet counts for the available pigs page from one grouped query.
+
+    `pigs` is the queryset with every filter applied except breed and the
+    pigs/piglets toggle, which are applied here per facet. `params` (the
+    page's full filter set) keys the cache entry, and the catalog version
+    in the key invalidates it on any Pig change (see FACET_CACHE_TIMEOUT).
+    """
+    params = params or {}
+    digest = hashlib.md5(json.dumps(params, sort_keys=True).encode()).hexdigest()
+    key = f'facets:{catalog_version()}:{digest}'
+    facets = cache.get(key)
+    if facets is None:
+        facets = _compute(pigs, breed, age_filter)
+        cache.set(key, facets, settings.FACET_CACHE_TIMEOUT)
+    return facets
@@ -0,0 +1,174 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DateField, Q
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import Feedback, FeedbackRollup
+
+# Rating fields and the label admin_feedback_list shows for each
+DIMENSIONS = {
+    'overall_rating': 'Overall',
+    'service_quality': 'Service',
+    'pig_quality': 'Pig quality',
+    'delivery_experience': 'Delivery',
+}
+RATINGS = range(1, 6)
+# Rows per admin_feedback_list page
+PAGE_SIZE = 25
+TRUNCATE = {'week': TruncWeek, 'month': TruncMonth}
+
+
+def _aggregates():
+    """Count() of everything the statistics need, to run as one aggregate"""
+    counts = {
+        'feedback_count': Count('pk'),
+        'recommend_count': Count('pk', filter=Q(would_recommend=True)),
+    }
+    for dimension in DIMENSIONS:
+        for rating in RATINGS:
+            counts[f'{dimension}_{rating}'] = Count('pk', filter=Q(**{dimension: rating}))
+    return counts
+
+
+def _totals(row):
+    """Rollup-shaped totals from a row of _aggregates()"""
+    return {
+        'feedback_count': row['feedback_count'],
+        'recommend_count': row['recommend_count'],
+        'histograms': {dimension: [row[f'{dimension}_{rating}'] for rating in RATINGS] for dimension in DIMENSIONS},
+    }
+
+
+def _merge(rows):
+    """Sum rollup-shaped totals"""
+    totals = {'feedback_count': 0, 'recommend_count': 0,
+              'histograms': {dimension: [0] * len(RATINGS) for dimension in DIMENSIONS}}
+    for row in rows:
+        totals['feedback_count'] += row['feedback_count']
+        totals['recommend_count'] += row['recommend_count']
+        for dimension, counts in row['histograms'].items():
+            totals['histograms'][dimension] = [a + b for a, b in zip(totals['histograms'][dimension], counts)]
+    return totals
+
+
+def _rating_sum(counts):
+    return sum(rating * count for rating, count in zip(RATINGS, counts))
+
+
+def _summary(totals):
+    count = totals['feedback_count']
+    histograms = totals['histograms']
+
+    def average(total):
+        return round(total / count, 1) if count else 0
+    # The mean of each feedback's get_average_rating()
+    average_rating = average(sum(_rating_sum(counts) for counts in histograms.values()) / len(DIMENSIONS))
+    return {
+        'total_feedbacks': count,
+        'average_rating': average_rating,
+        'recommendation_rate': average(totals['recommend_count'] * 100),
+        'dimensions': [{
+            'name': dimension,
+            'label': label,
+            'average': average(_rating_sum(histograms[dimension])),
+            'histogram': [{
+                'rating': rating,
+                'count': ratings,
+                'percent': average(ratings * 100),
+            } for rating, ratings in zip(RATINGS, histograms[dimension])],
+        } for dimension, label in DIMENSIONS.items()],
+    }
+
+
+def _use_rollup():
+    return settings.FEEDBACK_STATS_FROM_ROLLUP
+
+
+def stats():
+    """Totals, averages and per-dimension rating histograms of all feedback.
+
+    One aggregate query over Feedback, or over the per-day FeedbackRollup
+    rows when FEEDBACK_STATS_FROM_ROLLUP is set.
+    """
+    if _use_rollup():
+        totals = _merge(FeedbackRollup.objects.values('feedback_count', 'recommend_count', 'histograms'))
+    else:
+        totals = _totals(Feedback.objects.aggregate(**_aggregates()))
+    return _summary(totals)
+
+
+def _period_start(day, period):
+    return day - timedelta(days=day.weekday()) if period == 'week' else day.replace(day=1)
+
+
+def _periods(period, count):
+    """Start dates of the last `count` weeks or months, oldest first"""
+    starts = [_period_start(timezone.localdate(), period)]
+    while len(starts) < count:
+        starts.append(_period_start(starts[-1] - timedelta(days=1), period))
+    return starts[::-1]
+
+
+def trend(period='month', count=6):
+    """Feedback count, average rating and recommendation rate per week or month.
+
+    One grouped query; periods without feedback are included with zeros.
+    """
+    starts = _periods(period, count)
+    buckets = defaultdict(list)
+    if _use_rollup():
+        for row in FeedbackRollup.objects.filter(day__gte=starts[0]).values(
+            'day', 'feedback_count', 'recommend_count', 'histograms'
+        ):
+            buckets[_period_start(row['day'], period)].append(row)
+    else:
+        for row in Feedback.objects.filter(created_at__date__gte=starts[0]).annotate(
+            period=TRUNCATE[period]('created_at', output_field=DateField())
+        ).values('period').annotate(**_aggregates()).order_by('period'):
+            buckets[row['period']].append(_totals(row))
+    series = []
+    for start in starts:
+        summary = _summary(_merge(buckets[start]))
+        series.append({
+            'start': start,
+            'total_feedbacks': summary['total_feedbacks'],
+            'average_rating': summary['average_rating'],
+            'recommendation_rate': summary['recommendation_rate'],
+        })
+    return series
+
+
+def refresh_days(days):
+    """Recompute the FeedbackRollup rows of the given (local) days"""
+    days = set(days)
+    with transaction.atomic():
+        # Create then lock, so concurrent refreshes of a day take turns and
+        # the last one reads every committed feedback
+        FeedbackRollup.objects.bulk_create([FeedbackRollup(day=day) for day in days], ignore_conflicts=True)
+        rollups = {r.day: r for r in FeedbackRollup.objects.select_for_update().filter(day__in=days)}
+        rows = Feedback.objects.filter(created_at__date__in=days).annotate(
+            day=TruncDate('created_at')
+        ).values('day').annotate(**_aggregates()).order_by()
+        totals = {row['day']: _totals(row) for row in rows}
+        for day, rollup in rollups.items():
+            if day not in totals:
+                rollup.delete()
+                continue
+            for field, value in totals[day].items():
+                setattr(rollup, field, value)
+            rollup.save()
+
+
+def rebuild():
+    """Recompute every FeedbackRollup row from Feedback; returns how many days"""
+    rows = Feedback.objects.annotate(day=TruncDate('created_at')).values('day').annotate(
+        **_aggregates()
+    ).order_by()
+    with transaction.atomic():
+        FeedbackRollup.objects.all().delete()
+        FeedbackRollup.objects.bulk_create([FeedbackRollup(day=row['day'], **_totals(row)) for row in rows])
+    return FeedbackRollup.objects.count()
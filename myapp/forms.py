@@ -4,6 +4,7 @@ from django.contrib.auth.forms import UserCreationForm
 from decimal import Decimal
 import re
 from .models import Reservation, Pig, Feedback, Message, PaymentProof
+from . import inventory
 
 class SignUpForm(UserCreationForm):
     first_name = forms.CharField(max_length=30, required=True, widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'First Name'}))
@@ -69,29 +70,22 @@ class ReservationForm(forms.ModelForm):
         # Extract user from kwargs if provided
         user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
-        # Only show available pigs
+        # Only show available pigs; the options come from the inventory
+        # snapshot, the queryset still validates the submitted pig
         self.fields['pig'].queryset = Pig.objects.filter(is_available=True)
+        self.fields['pig'].choices = [('', '---------')] + [
+            (record.id, str(record)) for record in inventory.available_pigs()
+        ]
         # Clear default value for down_payment field in new forms
         if not self.instance.pk:  # Only for new instances, not editing existing ones
             self.fields['down_payment'].initial = None
             
         # Auto-populate user profile data for new forms
         if user and not self.instance.pk:
-            try:
-                # Try to get user profile first
-                if hasattr(user, 'userprofile'):
-                    profile = user.userprofile
-                    self.fields['fullname'].initial = f"{profile.first_name} {profile.last_name}".strip()
-                    self.fields['contact_number'].initial = profile.cellphone_number
-                    self.fields['address'].initial = profile.address
-                else:
-                    # Fallback to User model fields if no profile exists
-                    full_name = f"{user.first_name} {user.last_name}".strip()
-                    if full_name:
-                        self.fields['fullname'].initial = full_name
-            except Exception:
-                # If there's any error, just continue without auto-population
-                pass
+            profile = user.userprofile
+            self.fields['fullname'].initial = f"{profile.first_name} {profile.last_name}".strip()
+            self.fields['contact_number'].initial = profile.cellphone_number
+            self.fields['address'].initial = profile.address
     
     def clean_contact_number(self):
         contact_number = self.cleaned_data.get('contact_number')
@@ -266,21 +260,10 @@ class PurchaseForm(forms.ModelForm):
         
         # Auto-populate user profile data for new forms
         if user and not self.instance.pk:
-            try:
-                # Try to get user profile first
-                if hasattr(user, 'userprofile'):
-                    profile = user.userprofile
-                    self.fields['fullname'].initial = f"{profile.first_name} {profile.last_name}".strip()
-                    self.fields['contact_number'].initial = profile.cellphone_number
-                    self.fields['address'].initial = profile.address
-                else:
-                    # Fallback to User model fields if no profile exists
-                    full_name = f"{user.first_name} {user.last_name}".strip()
-                    if full_name:
-                        self.fields['fullname'].initial = full_name
-            except Exception:
-                # If there's any error, just continue without auto-population
-                pass
+            profile = user.userprofile
+            self.fields['fullname'].initial = f"{profile.first_name} {profile.last_name}".strip()
+            self.fields['contact_number'].initial = profile.cellphone_number
+            self.fields['address'].initial = profile.address
     
     def clean_contact_number(self):
         contact_number = self.cleaned_data.get('contact_number')
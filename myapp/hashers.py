@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2 with cost parameters sized for our small instance.
+
+    Keeps the 'argon2' algorithm name, so hashes are interchangeable with
+    Django's stock hasher. Changing ARGON2_* settings makes must_update()
+    true for older hashes, and Django re-hashes them on the next
+    successful login.
+    """
+    time_cost = settings.ARGON2_TIME_COST
+    memory_cost = settings.ARGON2_MEMORY_COST
+    parallelism = settings.ARGON2_PARALLELISM
@@ -0,0 +1,94 @@
+import hashlib
+import os
+from functools import lru_cache, wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.template.loader import get_template
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .models import Cart
+
+
+@lru_cache(maxsize=None)
+def template_mtime(name):
+    """Modification time of a template file; changes when a deploy edits it"""
+    return int(os.path.getmtime(get_template(name).origin.name))
+
+
+def user_fingerprint(request):
+    """Everything base.html personalises for the current user.
+
+    Covers the header name/photo/role, the cart badge and the CSRF cookie
+    (a cached page must carry a token for the browser's current secret).
+    """
+    user = request.user
+    parts = [request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')]
+    if user.is_authenticated:
+        parts += [user.pk, user.username, user.first_name, user.is_staff, user.is_superuser]
+        profile = user.userprofile
+        parts += [profile.first_name, profile.last_name, profile.profile_photo.name]
+        parts.append(Cart.objects.filter(user=user).count())
+    return parts
+
+
+def _has_pending_messages(request):
+    # len() doesn't mark the messages as read
+    return hasattr(request, '_messages') and len(get_messages(request)) > 0
+
+
+def cache_policy(max_age=0, public=False, per_user=True, templates=(), etag=None):
+    """Declarative HTTP caching for a read-mostly GET view.
+
+    Sets Cache-Control (public or private, with max_age) and answers
+    If-None-Match/If-Modified-Since with a 304 before the view runs. The
+    validator combines:
+      - etag(request, *args, **kwargs), for the data behind the page
+      - the modification time of each template in `templates`, which is
+        also used as Last-Modified
+      - user_fingerprint() and Vary: Cookie when per_user is set
+    Requests that have flash messages waiting skip the conditional check and
+    get no validator, so the message is rendered once and never replayed
+    from a browser cache.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or _has_pending_messages(request):
+                response = view_func(request, *args, **kwargs)
+                patch_cache_control(response, private=True, no_cache=True)
+                if per_user:
+                    patch_vary_headers(response, ['Cookie'])
+                return response
+
+            mtimes = [template_mtime(name) for name in templates]
+            last_modified = max(mtimes) if mtimes else None
+            parts = [mtimes, request.get_full_path()]
+            if etag is not None:
+                parts.append(etag(request, *args, **kwargs))
+            if per_user:
+                parts.append(user_fingerprint(request))
+            etag_value = '"%s"' % hashlib.md5(repr(parts).encode()).hexdigest()
+            if per_user:
+                # A per-user page must not be served to someone else on
+                # If-Modified-Since alone
+                last_modified = None
+
+            response = get_conditional_response(request, etag=etag_value, last_modified=last_modified)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag_value
+                if last_modified is not None:
+                    response['Last-Modified'] = http_date(last_modified)
+
+            if public:
+                patch_cache_control(response, public=True, max_age=max_age)
+            else:
+                patch_cache_control(response, private=True, max_age=max_age, must_revalidate=True)
+            if per_user:
+                patch_vary_headers(response, ['Cookie'])
+            return response
+        return _wrapped_view
+    return decorator
@@ -0,0 +1,135 @@
+import hashlib
+import operator
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from .catalog import catalog_version
+from .metrics import incr
+from .models import Pig
+
+FIELDS = ('id', 'breed', 'age_months', 'weight_kg', 'sex', 'price', 'description',
+          'picture', 'is_available', 'created_at')
+
+SEX_LABELS = dict(Pig.SEX_CHOICES)
+
+OPERATORS = {
+    'exact': operator.eq,
+    'gt': operator.gt,
+    'gte': operator.ge,
+    'lt': operator.lt,
+    'lte': operator.le,
+}
+
+
+class PigRecord:
+    """Compact read-only copy of an available Pig row"""
+    __slots__ = FIELDS
+
+    def __init__(self, values):
+        for name, value in zip(FIELDS, values):
+            setattr(self, name, value)
+
+    def __str__(self):
+        return f"{self.breed} - {self.get_sex_display()} - {self.get_age_display()}"
+
+    get_age_display = Pig.get_age_display
+
+    def get_sex_display(self):
+        return SEX_LABELS.get(self.sex, self.sex)
+
+    def to_pig(self):
+        """Unsaved-looking Pig instance (no query) for templates that need model fields"""
+        return Pig.from_db(DEFAULT_DB_ALIAS, FIELDS, [getattr(self, name) for name in FIELDS])
+
+
+class Snapshot:
+    __slots__ = ('version', 'loaded_at', 'records', 'fingerprint')
+
+    def __init__(self, version, loaded_at, rows):
+        self.version = version
+        self.loaded_at = loaded_at
+        self.records = tuple(PigRecord(row) for row in rows)
+        # Digest of the rows themselves: unlike the catalog version it is
+        # the same on every worker that loaded the same data
+        self.fingerprint = hashlib.md5(repr(rows).encode()).hexdigest()
+
+    def is_fresh(self, version):
+        # The age limit covers workers whose cache doesn't see other
+        # workers' version bumps (the per-process locmem default)
+        return (self.version == version
+                and time.monotonic() - self.loaded_at < settings.INVENTORY_SNAPSHOT_MAX_AGE)
+
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+def _current():
+    global _snapshot
+    version = catalog_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.is_fresh(version):
+        return snapshot
+
+    with _lock:
+        snapshot = _snapshot
+        if snapshot is None or not snapshot.is_fresh(version):
+            # Always load from the primary so replica lag can't be cached
+            rows = list(Pig.objects.using(DEFAULT_DB_ALIAS).filter(is_available=True)
+                        .order_by('id').values_list(*FIELDS))
+            snapshot = Snapshot(version, time.monotonic(), rows)
+            _snapshot = snapshot
+            incr('inventory.reloads')
+    return snapshot
+
+
+def records():
+    """Tuple of PigRecords for every available pig, ordered by id.
+
+    Served from a per-process snapshot that is reloaded (one query) when the
+    catalog version moves on or the snapshot is older than
+    INVENTORY_SNAPSHOT_MAX_AGE seconds.
+    """
+    return _current().records
+
+
+def fingerprint():
+    """Digest of the snapshot records() serves, for ETags of pages built from it"""
+    return _current().fingerprint
+
+
+def _matcher(lookups):
+    tests = []
+    for lookup, value in lookups.items():
+        field, _, op = lookup.partition('__')
+        if field not in FIELDS or (op or 'exact') not in OPERATORS:
+            raise ValueError(f'Unsupported inventory lookup: {lookup}')
+        tests.append((field, OPERATORS[op or 'exact'], value))
+    return lambda record: all(test(getattr(record, field), value) for field, test, value in tests)
+
+
+def available_pigs(order_by=(), **lookups):
+    """Available pigs matching ORM-style lookups, filtered and sorted in memory.
+
+    Supports exact/gt/gte/lt/lte lookups on the snapshot fields, e.g.
+    available_pigs(breed='Duroc', weight_kg__gte=30, order_by=['breed', '-price']).
+    """
+    if lookups:
+        match = _matcher(lookups)
+        matches = [record for record in records() if match(record)]
+    else:
+        matches = list(records())
+    # Stable sorts applied from the last key to the first
+    for key in reversed(order_by):
+        field = key.lstrip('-')
+        matches.sort(key=operator.attrgetter(field), reverse=key.startswith('-'))
+    return matches
+
+
+def reset():
+    """Drop the snapshot (tests and the benchmark command)"""
+    global _snapshot
+    _snapshot = None
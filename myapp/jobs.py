@@ -0,0 +1,136 @@
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .metrics import incr
+from .models import DeadLetter, Job
+
+logger = logging.getLogger(__name__)
+
+# task name -> callable(**payload), filled by @task in myapp.tasks
+TASKS = {}
+
+
+def task(name):
+    """Register a function as a background task under `name`"""
+    def decorator(func):
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(task_name, payload=None, delay=0, max_attempts=None):
+    """Queue a task and return the Job, or None when it ran inline.
+
+    The row is written in the caller's transaction, so the job only becomes
+    visible to workers if the request commits. Payloads must be JSON
+    serialisable (pass ids and strings, not model instances). With
+    JOBS_RUN_INLINE (the default, for deployments without a worker) the
+    task runs immediately instead and no Job is created.
+    """
+    if task_name not in TASKS:
+        raise KeyError(f'Unknown task: {task_name}')
+    payload = payload or {}
+    if settings.JOBS_RUN_INLINE:
+        TASKS[task_name](**payload)
+        return None
+    job = Job.objects.create(
+        task=task_name,
+        payload=payload,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+    incr(f'jobs.{task_name}.enqueued')
+    return job
+
+
+def _claimable(now):
+    # Queued jobs that are due, plus running jobs whose worker died
+    stale = now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    return Q(status='queued', run_at__lte=now) | Q(status='running', locked_at__lt=stale)
+
+
+def claim(worker_id, limit):
+    """Claim up to `limit` due jobs for this worker.
+
+    Each claim is a conditional UPDATE that only succeeds if the job is
+    still claimable, so concurrent workers never run the same job - on
+    every database backend, without SELECT ... FOR UPDATE.
+    """
+    now = timezone.now()
+    candidates = list(Job.objects.filter(_claimable(now)).order_by('run_at').values_list('pk', flat=True)[:limit * 2])
+    claimed = []
+    for pk in candidates:
+        if len(claimed) >= limit:
+            break
+        if Job.objects.filter(_claimable(now), pk=pk).update(status='running', locked_by=worker_id, locked_at=now):
+            claimed.append(pk)
+    return claimed
+
+
+def backoff_seconds(attempts):
+    """Exponential backoff with jitter: ~30s, 1m, 2m, 4m ... capped at JOBS_MAX_BACKOFF"""
+    delay = min(settings.JOBS_BACKOFF_BASE * 2 ** (attempts - 1), settings.JOBS_MAX_BACKOFF)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def run_job(pk, worker_id):
+    """Run one claimed job: delete it on success, retry or dead-letter it on failure"""
+    close_old_connections()
+    try:
+        job = Job.objects.filter(pk=pk, status='running', locked_by=worker_id).first()
+        if job is None:
+            # Reclaimed by another worker after our lock timed out
+            return False
+        try:
+            TASKS[job.task](**job.payload)
+        except Exception:
+            error = traceback.format_exc()
+            job.attempts += 1
+            if job.attempts >= job.max_attempts:
+                DeadLetter.objects.create(task=job.task, payload=job.payload, attempts=job.attempts,
+                                          error=error, enqueued_at=job.created_at)
+                job.delete()
+                incr(f'jobs.{job.task}.dead')
+                logger.error('Job %s (%s) moved to dead letters after %s attempts', pk, job.task, job.attempts)
+            else:
+                Job.objects.filter(pk=pk).update(
+                    status='queued', attempts=job.attempts, last_error=error, locked_by='', locked_at=None,
+                    run_at=timezone.now() + timedelta(seconds=backoff_seconds(job.attempts)),
+                )
+                incr(f'jobs.{job.task}.retried')
+                logger.warning('Job %s (%s) failed, attempt %s of %s', pk, job.task, job.attempts, job.max_attempts)
+            return False
+        job.delete()
+        incr(f'jobs.{job.task}.succeeded')
+        return True
+    finally:
+        close_old_connections()
+
+
+def requeue_dead_letter(dead_letter):
+    """Put a dead-lettered job back on the queue with a fresh attempt count"""
+    job = Job.objects.create(task=dead_letter.task, payload=dead_letter.payload,
+                             max_attempts=settings.JOBS_MAX_ATTEMPTS)
+    dead_letter.delete()
+    return job
+
+
+def queue_stats():
+    """Queue depth for metrics_api: jobs by status, due backlog, oldest wait and dead letters"""
+    now = timezone.now()
+    by_status = dict(Job.objects.values_list('status').annotate(count=Count('id')).order_by())
+    due = Job.objects.filter(status='queued', run_at__lte=now).aggregate(count=Count('id'), oldest=Min('run_at'))
+    return {
+        'queued': by_status.get('queued', 0),
+        'running': by_status.get('running', 0),
+        'due': due['count'],
+        'oldest_due_seconds': round((now - due['oldest']).total_seconds(), 1) if due['oldest'] else 0,
+        'dead_letters': DeadLetter.objects.count(),
+    }
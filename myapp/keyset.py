@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode_cursor(row):
+    micros = (row.created_at - _EPOCH) // timedelta(microseconds=1)
+    return f'{micros}-{row.pk}'
+
+
+def decode_cursor(cursor):
+    """(created_at, pk) from encode_cursor(); raises ValueError if malformed"""
+    micros, pk = cursor.split('-')
+    try:
+        return _EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except OverflowError:
+        raise ValueError(f'cursor out of range: {cursor!r}')
+
+
+def page(queryset, cursor=None, limit=20):
+    """One page of queryset, newest first, and the cursor of the next page.
+
+    Keyset pagination on (created_at, id): each page is a range scan of a
+    created_at index however deep the reader goes. The cursor is None on
+    the last page.
+    """
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+    rows = list(queryset.order_by('-created_at', '-pk')[:limit + 1])
+    return rows[:limit], encode_cursor(rows[limit - 1]) if len(rows) > limit else None
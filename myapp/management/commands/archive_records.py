@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from myapp.archive import KINDS, archive
+
+
+class Command(BaseCommand):
+    help = (
+        'Move completed/expired reservations and read messages older than '
+        'ARCHIVE_AFTER_MONTHS into the archive table. Undo with restore_archive.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=settings.ARCHIVE_AFTER_MONTHS,
+                            help=f'Archive rows older than this (default {settings.ARCHIVE_AFTER_MONTHS})')
+        parser.add_argument('--kind', action='append', choices=KINDS, help='Only archive this kind (repeatable)')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be archived')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows moved per transaction (default 500)')
+        parser.add_argument('--pause', type=float, default=0.1, help='Seconds to sleep between batches (default 0.1)')
+
+    def handle(self, *args, **options):
+        counts = archive(options['months'], options['kind'], options['dry_run'], options['batch_size'],
+                         options['pause'])
+        verb = 'Would archive' if options['dry_run'] else 'Archived'
+        summary = ', '.join(f'{count} {kind}(s)' for kind, count in counts.items())
+        self.stdout.write(f"{verb} {summary} older than {options['months']} months")
@@ -0,0 +1,65 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from myapp import compression
+
+DEFAULT_PATHS = ['/login/', '/', '/available-pigs/', '/description/', '/my-reservations/', '/sitemap.xml']
+
+
+class Command(BaseCommand):
+    help = 'Report bytes on the wire and compression CPU time per page for gzip, brotli and HTML minifying'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help=f'Pages to fetch (default: {" ".join(DEFAULT_PATHS)})')
+        parser.add_argument('--username', help='Log in as this user to fetch pages that need an account')
+        parser.add_argument('--rounds', type=int, default=20, help='Compressions timed per page (default 20)')
+
+    def _time(self, func, rounds):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            result = func()
+        return result, (time.perf_counter() - start) / rounds * 1000
+
+    def handle(self, *args, **options):
+        rounds = options['rounds']
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0], HTTP_ACCEPT_ENCODING='identity')
+        if options['username']:
+            try:
+                client.force_login(User.objects.get(username=options['username']))
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {options['username']!r}")
+
+        encodings = ['gzip'] + (['br'] if compression.brotli is not None else [])
+        header = f"{'page':<22} {'raw KB':>8} {'min KB':>8} {'min ms':>7}"
+        for encoding in encodings:
+            header += f" {encoding + ' KB':>8} {encoding + ' ms':>7}"
+        self.stdout.write(header)
+        if compression.brotli is None:
+            self.stdout.write('(Brotli not installed - gzip only)')
+
+        for path in options['paths'] or DEFAULT_PATHS:
+            try:
+                response = client.get(path)
+            except Exception as e:
+                self.stdout.write(f'{path:<22} skipped: {e.__class__.__name__}: {e}')
+                continue
+            if response.status_code != 200:
+                self.stdout.write(f'{path:<22} skipped: HTTP {response.status_code}')
+                continue
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+
+            row = f'{path:<22} {len(body) / 1024:>8.1f}'
+            if response.get('Content-Type', '').startswith('text/html'):
+                minified, minify_ms = self._time(lambda: compression.minify_html(body.decode()).encode(), rounds)
+                row += f' {len(minified) / 1024:>8.1f} {minify_ms:>7.2f}'
+            else:
+                minified = body
+                row += f" {'-':>8} {'-':>7}"
+            for encoding in encodings:
+                compressed, ms = self._time(lambda: compression.compress(minified, encoding), rounds)
+                row += f' {len(compressed) / 1024:>8.1f} {ms:>7.2f}'
+            self.stdout.write(row)
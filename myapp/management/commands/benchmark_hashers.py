@@ -0,0 +1,42 @@
+import time
+
+from django.contrib.auth.hashers import get_hashers
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Report password hash and verify time for each configured hasher on this host'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=5, help='Hashes timed per hasher (default 5)')
+        parser.add_argument('--password', default='correct horse battery staple')
+
+    def handle(self, *args, **options):
+        rounds = options['rounds']
+        password = options['password']
+
+        self.stdout.write(f"{'hasher':<55} {'hash ms':>10} {'verify ms':>10}")
+        for index, hasher in enumerate(get_hashers()):
+            name = f'{hasher.__class__.__module__}.{hasher.__class__.__name__}'
+            try:
+                hasher.encode(password, hasher.salt())
+            except ValueError as e:
+                # Optional library (bcrypt, argon2-cffi) not installed
+                self.stdout.write(f'{name:<55} skipped: {e}')
+                continue
+
+            hash_times = []
+            verify_times = []
+            for _ in range(rounds):
+                start = time.perf_counter()
+                encoded = hasher.encode(password, hasher.salt())
+                hash_times.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                hasher.verify(password, encoded)
+                verify_times.append(time.perf_counter() - start)
+
+            hash_ms = sum(hash_times) / rounds * 1000
+            verify_ms = sum(verify_times) / rounds * 1000
+            marker = ' (preferred)' if index == 0 else ''
+            self.stdout.write(f'{name:<55} {hash_ms:>10.1f} {verify_ms:>10.1f}{marker}')
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from myapp import inventory
+from myapp.models import Pig
+
+# (label, lookups, order_by) covering the catalog page and the admin dropdown
+CASES = [
+    ('all available', {}, []),
+    ('breed', {'breed': 'Yorkshire'}, []),
+    ('piglets 10kg+', {'age_months__lt': 6, 'weight_kg__gte': 10}, []),
+    ('breed + weight range', {'breed': 'Duroc', 'weight_kg__gte': 30, 'weight_kg__lte': 90}, []),
+    ('sorted by breed, age', {}, ['breed', 'age_months']),
+]
+
+
+class Command(BaseCommand):
+    help = 'Compare in-memory inventory snapshot filtering with the equivalent ORM queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=200, help='Calls timed per case (default 200)')
+
+    def _time(self, func, rounds):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            func()
+        return (time.perf_counter() - start) / rounds * 1000
+
+    def handle(self, *args, **options):
+        rounds = options['rounds']
+
+        inventory.reset()
+        start = time.perf_counter()
+        count = len(inventory.records())
+        load_ms = (time.perf_counter() - start) * 1000
+        self.stdout.write(f'snapshot: {count} available pigs loaded in {load_ms:.1f} ms')
+
+        self.stdout.write(f"{'case':<25} {'rows':>6} {'orm ms':>10} {'snapshot ms':>12} {'speedup':>8}")
+        for label, lookups, order_by in CASES:
+            queryset = Pig.objects.filter(is_available=True, **lookups).order_by(*order_by or ['id'])
+            rows = len(inventory.available_pigs(order_by=order_by, **lookups))
+            orm_ms = self._time(lambda: list(queryset.all()), rounds)
+            snapshot_ms = self._time(lambda: inventory.available_pigs(order_by=order_by, **lookups), rounds)
+            speedup = orm_ms / snapshot_ms if snapshot_ms else float('inf')
+            self.stdout.write(f'{label:<25} {rows:>6} {orm_ms:>10.3f} {snapshot_ms:>12.3f} {speedup:>7.1f}x')
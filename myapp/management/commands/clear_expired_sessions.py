@@ -0,0 +1,47 @@
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete expired sessions in small batches so no long lock is held on the '
+        'session table. Schedule it (e.g. an hourly cron job) or run with --interval.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows deleted per statement (default 1000)')
+        parser.add_argument('--pause', type=float, default=0.1, help='Seconds to sleep between batches (default 0.1)')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running and sweep every N seconds instead of exiting')
+        parser.add_argument('--dry-run', action='store_true', help='Report how many sessions have expired')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = Session.objects.filter(expire_date__lt=timezone.now()).count()
+            self.stdout.write(f'Would delete {count} expired session(s)')
+            return
+        while True:
+            deleted = self.sweep(options['batch_size'], options['pause'])
+            self.stdout.write(f'{timezone.now():%Y-%m-%d %H:%M:%S} deleted {deleted} expired session(s)')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def sweep(self, batch_size, pause):
+        cutoff = timezone.now()
+        total = 0
+        while True:
+            # Each batch is its own short autocommit statement
+            keys = list(
+                Session.objects.filter(expire_date__lt=cutoff)
+                .values_list('session_key', flat=True)[:batch_size]
+            )
+            if not keys:
+                return total
+            total += Session.objects.filter(session_key__in=keys).delete()[0]
+            if len(keys) < batch_size:
+                return total
+            time.sleep(pause)
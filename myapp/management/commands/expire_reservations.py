@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from myapp.expiry import expire_reservations, prune_carts
+
+
+class Command(BaseCommand):
+    help = (
+        'Expire reservations pending longer than RESERVATION_PENDING_TTL_HOURS (releasing '
+        'their pigs and notifying customers) and prune carts older than CART_TTL_DAYS. '
+        'Schedule it (e.g. an hourly cron job) or run with --interval.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without changing it')
+        parser.add_argument('--batch-size', type=int, default=200, help='Rows handled per transaction (default 200)')
+        parser.add_argument('--pause', type=float, default=0.1, help='Seconds to sleep between batches (default 0.1)')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running and sweep every N seconds instead of exiting')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        while True:
+            counts = expire_reservations(dry_run, options['batch_size'], options['pause'])
+            carts = prune_carts(dry_run, options['batch_size'] * 5, options['pause'])
+            verbs = ('would expire', 'release', 'send', 'prune') if dry_run else ('expired', 'released', 'sent', 'pruned')
+            self.stdout.write(
+                f"{timezone.now():%Y-%m-%d %H:%M:%S} {'[dry run] ' if dry_run else ''}"
+                f"{verbs[0]} {counts['reservations']} reservation(s) pending over "
+                f"{settings.RESERVATION_PENDING_TTL_HOURS}h, {verbs[1]} {counts['pigs']} pig(s), "
+                f"{verbs[2]} {counts['notifications']} notification(s), {verbs[3]} {carts} cart item(s)"
+            )
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
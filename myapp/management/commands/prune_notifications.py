@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from myapp.notifications import prune
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete notifications older than NOTIFICATION_RETENTION_DAYS, keeping unread '
+        'counts in step. Schedule it (e.g. a daily cron job).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.NOTIFICATION_RETENTION_DAYS,
+                            help=f'Delete notifications older than this (default {settings.NOTIFICATION_RETENTION_DAYS})')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows deleted per transaction (default 1000)')
+        parser.add_argument('--pause', type=float, default=0.1, help='Seconds to sleep between batches (default 0.1)')
+
+    def handle(self, *args, **options):
+        count = prune(options['days'], options['dry_run'], options['batch_size'], options['pause'])
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(f"{verb} {count} notification(s) older than {options['days']} days")
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from myapp.feedback_stats import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the per-day FeedbackRollup rows from Feedback. Run it once before '
+        'turning on FEEDBACK_STATS_FROM_ROLLUP; feedback saves keep it current after that.'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Rolled up feedback for {rebuild()} day(s)')
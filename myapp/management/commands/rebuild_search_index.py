@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from myapp import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the staff search index from pigs, customers, reservations and messages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kinds', nargs='*',
+                            help=f"Only rebuild these kinds, of {', '.join(search.SOURCE_QUERYSETS)} (default: all)")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        unknown = [kind for kind in options['kinds'] if kind not in search.SOURCE_QUERYSETS]
+        if unknown:
+            raise CommandError(f"Unknown kind(s): {', '.join(unknown)}")
+        counts = search.rebuild(options['kinds'] or None, batch_size=options['batch_size'])
+        for kind, count in counts.items():
+            self.stdout.write(f'{kind}: {count} document(s) indexed')
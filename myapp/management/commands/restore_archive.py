@@ -0,0 +1,35 @@
+from datetime import date, datetime, time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from myapp.archive import KINDS, restore
+
+
+class Command(BaseCommand):
+    help = 'Move archived rows back into their live tables under their original ids'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', action='append', choices=KINDS, help='Only restore this kind (repeatable)')
+        parser.add_argument('--user', help='Only restore rows belonging to this username')
+        parser.add_argument('--since', type=date.fromisoformat, help='Created on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--until', type=date.fromisoformat, help='Created before this date (YYYY-MM-DD)')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be restored')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {options['user']!r}")
+        since, until = (timezone.make_aware(datetime.combine(options[name], time.min)) if options[name] else None
+                        for name in ('since', 'until'))
+        counts = restore(options['kind'], user, since, until, options['dry_run'])
+        skipped = counts.pop('skipped', 0)
+        verb = 'Would restore' if options['dry_run'] else 'Restored'
+        summary = ', '.join(f'{count} {kind}(s)' for kind, count in counts.items()) or 'nothing'
+        self.stdout.write(f'{verb} {summary}')
+        if skipped:
+            self.stdout.write(f'Skipped {skipped} row(s) whose pig or conversation no longer exists')
@@ -0,0 +1,72 @@
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from myapp.jobs import claim, queue_stats, run_job
+
+logger = logging.getLogger('myapp.jobs')
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (see myapp.jobs) until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.JOBS_CONCURRENCY,
+                            help=f'Jobs run at the same time (default {settings.JOBS_CONCURRENCY})')
+        parser.add_argument('--executor', choices=['thread', 'process'], default='thread',
+                            help='thread for I/O-bound tasks (default), process for CPU-bound ones')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to wait when the queue is empty (default 2)')
+        parser.add_argument('--once', action='store_true', help='Exit once no jobs are due')
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        poll_interval = options['poll_interval']
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+
+        if options['executor'] == 'process':
+            # Spawned children set Django up from scratch instead of sharing
+            # this process's database sockets
+            executor = ProcessPoolExecutor(concurrency, mp_context=multiprocessing.get_context('spawn'),
+                                           initializer=django.setup)
+        else:
+            executor = ThreadPoolExecutor(concurrency, thread_name_prefix='job')
+
+        stopping = []
+        signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+
+        self.stdout.write(f"Worker {worker_id}: {concurrency} {options['executor']} slots, queue {queue_stats()}")
+        in_flight = set()
+        processed = 0
+        try:
+            while not stopping:
+                close_old_connections()
+                free = concurrency - len(in_flight)
+                if free > 0:
+                    in_flight |= {executor.submit(run_job, pk, worker_id) for pk in claim(worker_id, free)}
+                if not in_flight:
+                    if options['once']:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+                done, in_flight = wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    processed += 1
+                    if future.exception() is not None:
+                        logger.error('Worker error', exc_info=future.exception())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            # Let running jobs finish; unclaimed ones stay queued
+            processed += len(wait(in_flight).done)
+            executor.shutdown()
+        self.stdout.write(f'Worker {worker_id} stopped after {processed} job(s)')
@@ -0,0 +1,75 @@
+from django.core.cache import cache
+from django.db import connections
+
+COUNTER_PREFIX = 'metrics:'
+
+
+def incr(name, amount=1):
+    """Increment a named counter kept in the default cache"""
+    key = COUNTER_PREFIX + name
+    # add() only succeeds for the first writer, everyone else increments
+    if not cache.add(key, amount, timeout=None):
+        try:
+            cache.incr(key, amount)
+        except ValueError:
+            # Key expired or was evicted between add() and incr()
+            cache.set(key, amount, timeout=None)
+
+
+def get_counter(name):
+    return cache.get(COUNTER_PREFIX + name, 0)
+
+
+def get_counters(names):
+    """Return {name: value} for several counters in one cache round-trip"""
+    values = cache.get_many([COUNTER_PREFIX + name for name in names])
+    return {name: values.get(COUNTER_PREFIX + name, 0) for name in names}
+
+
+def on_connection_created(sender, connection, **kwargs):
+    """connection_created handler - counts connections Django set up.
+
+    Without the pool that is one per physical connection opened. With the
+    psycopg pool Django sends connection_created on every checkout, so the
+    counter then measures checkouts, not new server connections.
+    """
+    incr(f'db.{connection.alias}.connections_opened')
+
+
+def db_stats():
+    """Connection statistics for every configured database alias.
+
+    When the psycopg pool is enabled this includes the pool's own counters
+    (checkouts, total wait time, queued requests) and connections_opened
+    counts checkouts (see on_connection_created); otherwise it is the number
+    of physical connections opened.
+    """
+    stats = {}
+    for alias in connections:
+        settings_dict = connections.settings[alias]
+        pooled = bool(settings_dict.get('OPTIONS', {}).get('pool'))
+        alias_stats = {
+            'vendor': connections[alias].vendor,
+            'pooled': pooled,
+            'conn_max_age': settings_dict.get('CONN_MAX_AGE', 0),
+            'health_checks': settings_dict.get('CONN_HEALTH_CHECKS', False),
+            'connections_opened': get_counter(f'db.{alias}.connections_opened'),
+        }
+        if pooled:
+            pool_stats = connections[alias].pool.get_stats()
+            checkouts = pool_stats.get('requests_num', 0)
+            wait_ms = pool_stats.get('requests_wait_ms', 0)
+            alias_stats['pool'] = {
+                'size': pool_stats.get('pool_size', 0),
+                'available': pool_stats.get('pool_available', 0),
+                'min_size': pool_stats.get('pool_min', 0),
+                'max_size': pool_stats.get('pool_max', 0),
+                'checkouts': checkouts,
+                'queued': pool_stats.get('requests_queued', 0),
+                'waiting': pool_stats.get('requests_waiting', 0),
+                'errors': pool_stats.get('requests_errors', 0),
+                'wait_ms_total': wait_ms,
+                'wait_ms_avg': round(wait_ms / checkouts, 2) if checkouts else 0,
+            }
+        stats[alias] = alias_stats
+    return stats
@@ -0,0 +1,70 @@
+# Generated by Django 5.1.2 on 2026-10-18 23:09
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+POSTGRES_FORWARDS = [
+    "CREATE INDEX myapp_searchdocument_vector_gin ON myapp_searchdocument USING gin (search_vector)",
+]
+POSTGRES_BACKWARDS = [
+    "DROP INDEX IF EXISTS myapp_searchdocument_vector_gin",
+]
+
+# External-content FTS5 table kept in step with myapp_searchdocument by triggers
+SQLITE_FORWARDS = [
+    "CREATE VIRTUAL TABLE myapp_searchdocument_fts USING fts5("
+    "title, body, content='myapp_searchdocument', content_rowid='id', tokenize='unicode61')",
+    "CREATE TRIGGER myapp_searchdocument_ai AFTER INSERT ON myapp_searchdocument BEGIN "
+    "INSERT INTO myapp_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    "CREATE TRIGGER myapp_searchdocument_ad AFTER DELETE ON myapp_searchdocument BEGIN "
+    "INSERT INTO myapp_searchdocument_fts(myapp_searchdocument_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); END",
+    "CREATE TRIGGER myapp_searchdocument_au AFTER UPDATE ON myapp_searchdocument BEGIN "
+    "INSERT INTO myapp_searchdocument_fts(myapp_searchdocument_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); "
+    "INSERT INTO myapp_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+]
+SQLITE_BACKWARDS = [
+    "DROP TRIGGER IF EXISTS myapp_searchdocument_au",
+    "DROP TRIGGER IF EXISTS myapp_searchdocument_ad",
+    "DROP TRIGGER IF EXISTS myapp_searchdocument_ai",
+    "DROP TABLE IF EXISTS myapp_searchdocument_fts",
+]
+
+
+def run_vendor_sql(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0020_alter_userprofile_cellphone_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('pig', 'Pig'), ('customer', 'Customer'), ('reservation', 'Reservation'), ('message', 'Message')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('url', models.CharField(blank=True, max_length=255)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+        migrations.RunPython(
+            run_vendor_sql({'postgresql': POSTGRES_FORWARDS, 'sqlite': SQLITE_FORWARDS}),
+            run_vendor_sql({'postgresql': POSTGRES_BACKWARDS, 'sqlite': SQLITE_BACKWARDS}),
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# Trigram indexes on UPPER(column) serve Django's icontains lookups, which
+# the customer autocomplete uses. TrigramExtension is a no-op on SQLite.
+TRIGRAM_INDEXES = [
+    ('myapp_userprofile_first_name_trgm', 'myapp_userprofile', 'first_name'),
+    ('myapp_userprofile_last_name_trgm', 'myapp_userprofile', 'last_name'),
+    ('myapp_userprofile_email_trgm', 'myapp_userprofile', 'email'),
+    ('myapp_userprofile_cellphone_trgm', 'myapp_userprofile', 'cellphone_number'),
+    ('myapp_auth_user_username_trgm', 'auth_user', 'username'),
+    ('myapp_auth_user_email_trgm', 'auth_user', 'email'),
+    ('myapp_auth_user_first_name_trgm', 'auth_user', 'first_name'),
+    ('myapp_auth_user_last_name_trgm', 'auth_user', 'last_name'),
+]
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER("{column}") gin_trgm_ops)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('myapp', '0021_searchdocument'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
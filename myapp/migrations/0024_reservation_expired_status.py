@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 23:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0023_job_deadletter'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reservation',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Placed Order'), ('accepted', 'Placed Order'), ('completed', 'Completed'), ('expired', 'Expired')], default='pending', max_length=10),
+        ),
+    ]
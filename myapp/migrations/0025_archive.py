@@ -0,0 +1,57 @@
+# Generated by Django 5.1.2 on 2026-10-18 23:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0024_reservation_expired_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='feedback',
+            name='reservation',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='myapp.reservation'),
+        ),
+        migrations.AlterField(
+            model_name='revenue',
+            name='reservation',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='myapp.reservation'),
+        ),
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month, farm time')),
+                ('breed', models.CharField(max_length=50)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'ordering': ['month', 'breed'],
+                'unique_together': {('month', 'breed')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('reservation', 'Reservation'), ('message', 'Message'), ('notification', 'Decline notification')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField()),
+                ('data', models.JSONField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_records', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['kind', 'created_at'], name='myapp_archi_kind_b950f6_idx')],
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+    ]
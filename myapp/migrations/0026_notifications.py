@@ -0,0 +1,78 @@
+# Generated by Django 5.1.2 on 2026-10-18 23:45
+
+from collections import Counter
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_decline_notifications(apps, schema_editor):
+    """Move DeclineNotification rows, live and archived, into Notification"""
+    ArchivedRecord = apps.get_model('myapp', 'ArchivedRecord')
+    DeclineNotification = apps.get_model('myapp', 'DeclineNotification')
+    Notification = apps.get_model('myapp', 'Notification')
+    NotificationCounter = apps.get_model('myapp', 'NotificationCounter')
+
+    rows = [(n.user_id, n.message, n.is_read, n.created_at) for n in DeclineNotification.objects.all()]
+    archived = ArchivedRecord.objects.filter(kind='notification')
+    rows += [(record.user_id, record.data['rows'][0]['fields']['message'], True, record.created_at)
+             for record in archived if record.user_id is not None]
+    for user_id, message, is_read, created_at in rows:
+        notification = Notification.objects.create(user_id=user_id, kind='order_declined', message=message,
+                                                   is_read=is_read)
+        # created_at is auto_now_add
+        Notification.objects.filter(pk=notification.pk).update(created_at=created_at)
+    archived.delete()
+
+    unread = Counter(user_id for user_id, _, is_read, _ in rows if not is_read)
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=user_id, unread=count) for user_id, count in unread.items()]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('myapp', '0025_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('order_accepted', 'Order accepted'), ('order_declined', 'Order declined'), ('order_expired', 'Order expired'), ('payment_received', 'Payment received'), ('order_completed', 'Order completed')], max_length=20)),
+                ('message', models.TextField()),
+                ('is_read', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('reservation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notifications', to='myapp.reservation')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read', 'created_at'], name='myapp_notif_user_id_3e3941_idx'),
+        ),
+        migrations.RunPython(copy_decline_notifications, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='archivedrecord',
+            name='kind',
+            field=models.CharField(choices=[('reservation', 'Reservation'), ('message', 'Message')], max_length=20),
+        ),
+        migrations.DeleteModel(
+            name='DeclineNotification',
+        ),
+    ]
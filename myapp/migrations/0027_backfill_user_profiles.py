@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def create_missing_profiles(apps, schema_editor):
+    """Give every user without one a UserProfile built from the User's fields"""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    UserProfile = apps.get_model('myapp', 'UserProfile')
+    UserProfile.objects.bulk_create([
+        UserProfile(user_id=user.pk, first_name=user.first_name, last_name=user.last_name, email=user.email,
+                    address='')
+        for user in User.objects.filter(userprofile__isnull=True).only('first_name', 'last_name', 'email')
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0026_notifications'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_profiles, migrations.RunPython.noop),
+    ]
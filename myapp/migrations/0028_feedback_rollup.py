@@ -0,0 +1,29 @@
+# Generated by Django 5.1.2 on 2026-10-18 23:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0027_backfill_user_profiles'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedbackRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('feedback_count', models.PositiveIntegerField(default=0)),
+                ('recommend_count', models.PositiveIntegerField(default=0)),
+                ('histograms', models.JSONField(default=dict)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['created_at', 'id'], name='myapp_feedb_created_013e4b_idx'),
+        ),
+    ]
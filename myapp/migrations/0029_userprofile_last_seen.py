@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-19 00:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0028_feedback_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='last_seen',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-19 00:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0029_userprofile_last_seen'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='revenue',
+            name='reservation',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='myapp.reservation'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import RegexValidator
+from django.utils import timezone
 
 # Create your models here.
 
@@ -14,6 +16,8 @@ class UserProfile(models.Model):
     address = models.TextField()
     profile_photo = models.ImageField(upload_to='profile_photos/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Last presence heartbeat, when PRESENCE_IN_DB is set (myapp.presence)
+    last_seen = models.DateTimeField(null=True, blank=True, db_index=True)
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
@@ -75,6 +79,7 @@ class Reservation(models.Model):
         ('pending', 'Placed Order'),
         ('accepted', 'Placed Order'),
         ('completed', 'Completed'),
+        ('expired', 'Expired'),
     ]
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -109,24 +114,46 @@ class PaymentProof(models.Model):
     class Meta:
         ordering = ['-uploaded_at']
 
-class DeclineNotification(models.Model):
-    """Simple model to store decline notifications for customers"""
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='decline_notifications')
-    pig_breed = models.CharField(max_length=50)
-    pig_price = models.DecimalField(max_digits=10, decimal_places=2)
+class Notification(models.Model):
+    """An event shown in a customer's notification center (written by myapp.notifications)"""
+    KIND_CHOICES = [
+        ('order_accepted', 'Order accepted'),
+        ('order_declined', 'Order declined'),
+        ('order_expired', 'Order expired'),
+        ('payment_received', 'Payment received'),
+        ('order_completed', 'Order completed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # Declined orders are deleted, so their notifications keep no reservation
+    reservation = models.ForeignKey(Reservation, on_delete=models.SET_NULL, null=True, blank=True,
+                                    related_name='notifications')
     message = models.TextField()
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
-    
+
     def __str__(self):
-        return f"Decline notification for {self.user.username} - {self.pig_breed}"
-    
+        return f"{self.get_kind_display()} notification for {self.user.username}"
+
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [models.Index(fields=['user', 'is_read', 'created_at'])]
+
+class NotificationCounter(models.Model):
+    """Denormalized count of a user's unread notifications"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True,
+                                related_name='notification_counter')
+    unread = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user.username}: {self.unread} unread"
 
 class Revenue(models.Model):
     """Track completed sales for revenue reporting"""
-    reservation = models.OneToOneField(Reservation, on_delete=models.CASCADE)
+    # NULL while the reservation is archived (myapp.archive detaches the sale
+    # first); deleting a reservation outright deletes its sale
+    reservation = models.OneToOneField(Reservation, on_delete=models.CASCADE, null=True, blank=True)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     completed_date = models.DateTimeField(auto_now_add=True)
     pig_breed = models.CharField(max_length=50)  # Store for reporting even if pig is deleted
@@ -154,7 +181,7 @@ class Feedback(models.Model):
     ]
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    reservation = models.ForeignKey(Reservation, on_delete=models.CASCADE, null=True, blank=True)
+    reservation = models.ForeignKey(Reservation, on_delete=models.SET_NULL, null=True, blank=True)
     feedback_type = models.CharField(max_length=20, choices=FEEDBACK_TYPE_CHOICES)
     overall_rating = models.IntegerField(choices=RATING_CHOICES)
     service_quality = models.IntegerField(choices=RATING_CHOICES)
@@ -167,10 +194,26 @@ class Feedback(models.Model):
     def __str__(self):
         return f"Feedback by {self.user.username} - {self.overall_rating}/5 stars"
     
+    class Meta:
+        # admin_feedback_list pages newest first
+        indexes = [models.Index(fields=['created_at', 'id'])]
+
     def get_average_rating(self):
         """Calculate average rating across all categories"""
         return (self.overall_rating + self.service_quality + self.pig_quality + self.delivery_experience) / 4
 
+class FeedbackRollup(models.Model):
+    """One day's feedback totals, kept by myapp.feedback_stats so the statistics
+    don't have to scan every Feedback row (see FEEDBACK_STATS_FROM_ROLLUP)"""
+    day = models.DateField(unique=True)
+    feedback_count = models.PositiveIntegerField(default=0)
+    recommend_count = models.PositiveIntegerField(default=0)
+    # {rating field: [number of 1-star, 2-star, ..., 5-star ratings]}
+    histograms = models.JSONField(default=dict)
+
+    def __str__(self):
+        return f"Feedback on {self.day}: {self.feedback_count}"
+
 class Cart(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     pig = models.ForeignKey(Pig, on_delete=models.CASCADE)
@@ -238,3 +281,110 @@ class Message(models.Model):
     
     def __str__(self):
         return f"{self.sender} message in conversation {self.conversation.id}"
+
+class SearchDocument(models.Model):
+    """Denormalized text of a searchable record, kept in sync by myapp.search.
+
+    PostgreSQL searches search_vector through a GIN index; SQLite uses an
+    FTS5 table mirroring title/body (both created in migration 0021).
+    """
+    KIND_CHOICES = [
+        ('pig', 'Pig'),
+        ('customer', 'Customer'),
+        ('reservation', 'Reservation'),
+        ('message', 'Message'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    url = models.CharField(max_length=255, blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('kind', 'object_id')
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.title}"
+
+class Job(models.Model):
+    """A unit of background work, run by `manage.py run_worker` (see myapp.jobs)"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+    ]
+
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['run_at']
+        indexes = [models.Index(fields=['status', 'run_at'])]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
+
+class DeadLetter(models.Model):
+    """A job that failed max_attempts times, kept for inspection and requeueing"""
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    attempts = models.PositiveIntegerField()
+    error = models.TextField(blank=True)
+    enqueued_at = models.DateTimeField()
+    failed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-failed_at']
+
+    def __str__(self):
+        return f"{self.task} failed at {self.failed_at:%Y-%m-%d %H:%M}"
+
+class ArchivedRecord(models.Model):
+    """A row moved out of a live table by myapp.archive.
+
+    `data` holds the serialized row (and rows that depend on it) so
+    `manage.py restore_archive` can put it back under its original id.
+    """
+    KIND_CHOICES = [
+        ('reservation', 'Reservation'),
+        ('message', 'Message'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='archived_records')
+    created_at = models.DateTimeField()
+    data = models.JSONField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        unique_together = ('kind', 'object_id')
+        indexes = [models.Index(fields=['kind', 'created_at'])]
+
+    def __str__(self):
+        return f"Archived {self.get_kind_display().lower()} #{self.object_id}"
+
+class SalesRollup(models.Model):
+    """Completed orders and revenue per month and breed for archived reservations"""
+    month = models.DateField(help_text="First day of the month, farm time")
+    breed = models.CharField(max_length=50)
+    orders = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['month', 'breed']
+        unique_together = ('month', 'breed')
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.breed}: {self.orders} orders, ₱{self.revenue}"
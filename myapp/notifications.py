@@ -0,0 +1,125 @@
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import keyset
+from .models import Notification, NotificationCounter
+
+PAGE_SIZE = 20
+
+# Notification written for each reservation a transition moves
+TRANSITION_KINDS = {
+    'accept': 'order_accepted',
+    'expire': 'order_expired',
+    'mark_paid': 'payment_received',
+    'complete': 'order_completed',
+}
+
+
+def message_for(kind, breed, price):
+    """Customer-facing text of a notification about an order for a `breed` pig"""
+    return {
+        'order_accepted': f'Your order for {breed} pig (₱{price}) has been accepted. '
+                          f'Please settle the remaining balance by the pickup date.',
+        'order_declined': f"We're sorry, but your order for {breed} pig (₱{price}) has been declined by the "
+                          f'admin. You can place a new order if you wish.',
+        'order_expired': f'Your order for {breed} pig (₱{price}) was not confirmed within '
+                         f'{settings.RESERVATION_PENDING_TTL_HOURS} hours and has expired. You can place a '
+                         f'new order if the pig is still available.',
+        'payment_received': f'We have received your payment for {breed} pig (₱{price}). Thank you!',
+        'order_completed': f'Your order for {breed} pig (₱{price}) is complete. Tell us how it went!',
+    }[kind]
+
+
+def _adjust_unread(deltas):
+    """Add {user_id: delta} to the users' NotificationCounter rows"""
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=user_id) for user_id in deltas], ignore_conflicts=True
+    )
+    for user_id, delta in deltas.items():
+        NotificationCounter.objects.filter(user_id=user_id).update(unread=F('unread') + delta)
+
+
+def notify(notifications):
+    """Save unsaved Notification objects and count them as unread"""
+    with transaction.atomic():
+        Notification.objects.bulk_create(notifications)
+        _adjust_unread(Counter(n.user_id for n in notifications))
+    return len(notifications)
+
+
+def notify_reservations(kind, reservations):
+    """Notify each reservation's customer; reservations need pig loaded"""
+    return notify([
+        Notification(user_id=r.user_id, kind=kind, reservation_id=r.pk,
+                     message=message_for(kind, r.pig.breed, r.pig.price))
+        for r in reservations
+    ])
+
+
+def unread_count(user):
+    return NotificationCounter.objects.filter(user=user).values_list('unread', flat=True).first() or 0
+
+
+def mark_read(user, ids=None):
+    """Mark user's unread notifications (all, or those in ids) read; returns how many changed"""
+    with transaction.atomic():
+        unread = Notification.objects.filter(user=user, is_read=False)
+        if ids is not None:
+            unread = unread.filter(pk__in=ids)
+        # Only rows still unread change, so concurrent calls can't count one twice
+        count = unread.update(is_read=True)
+        _adjust_unread({user.pk: -count})
+    return count
+
+
+def page(user, cursor=None, unread_only=False, limit=PAGE_SIZE):
+    """One page of user's notifications, newest first, and the cursor of the next page.
+
+    The keyset pages are range scans of the (user, is_read, created_at) index.
+    """
+    notifications = Notification.objects.filter(user=user)
+    if unread_only:
+        notifications = notifications.filter(is_read=False)
+    return keyset.page(notifications, cursor, limit)
+
+
+def as_dict(notification):
+    return {
+        'id': notification.id,
+        'kind': notification.kind,
+        'title': notification.get_kind_display(),
+        'message': notification.message,
+        'reservation_id': notification.reservation_id,
+        'is_read': notification.is_read,
+        'created_at': notification.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def prune(days=None, dry_run=False, batch_size=1000, pause=0.1):
+    """Delete notifications older than NOTIFICATION_RETENTION_DAYS; returns how many"""
+    days = settings.NOTIFICATION_RETENTION_DAYS if days is None else days
+    old = Notification.objects.filter(created_at__lt=timezone.now() - timedelta(days=days)).order_by('pk')
+    if dry_run:
+        return old.count()
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            # Locked so a concurrent mark_read can't decrement the same rows
+            batch = list(old.select_for_update().values_list('pk', 'user_id', 'is_read')[:batch_size])
+            if not batch:
+                break
+            Notification.objects.filter(pk__in=[pk for pk, _, _ in batch]).delete()
+            _adjust_unread({user_id: -count for user_id, count in
+                            Counter(user_id for _, user_id, is_read in batch if not is_read).items()})
+        deleted += len(batch)
+        if len(batch) < batch_size:
+            break
+        time.sleep(pause)
+    return deleted
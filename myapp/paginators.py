@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimated_count(queryset):
+    """The Postgres planner's row estimate for queryset's table, or None.
+
+    Only meaningful for an unfiltered queryset; None on other databases and
+    for tables that were never analyzed.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                       [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that skips COUNT(*) on large unfiltered tables.
+
+    For a changelist with no filters or search, a table the planner
+    estimates at ADMIN_ESTIMATED_COUNT_MIN_ROWS or more reports that
+    estimate as its count. Smaller tables and filtered lists are counted
+    exactly.
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimated_count(self.object_list)
+            if estimate is not None and estimate >= settings.ADMIN_ESTIMATED_COUNT_MIN_ROWS:
+                return estimate
+        return super().count
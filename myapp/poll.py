@@ -0,0 +1,123 @@
+from decimal import Decimal
+
+from django.db.models import Count, Max, Q
+
+from . import notifications
+from .models import Notification, Reservation
+from .transitions import DELIVERY_FEE
+
+
+def _stamp(queryset):
+    """Version of a queryset's rows: changes whenever one is added, removed or saved.
+
+    Reservation.updated_at is auto_now and transition() sets it too, so any
+    write moves Max('updated_at') and any removal moves the count. Cheap
+    enough to run on every poll, and unlike a cache counter it stays right
+    across workers with a per-process cache.
+    """
+    row = queryset.aggregate(count=Count('pk'), last=Max('updated_at'))
+    return f"{row['count']}.{row['last'].timestamp() if row['last'] else 0:.6f}"
+
+
+def pending_orders():
+    """Pending reservations as the admin notification panel shows them"""
+    orders = []
+    for order in Reservation.objects.filter(status='pending').select_related('pig', 'user').order_by('-created_at'):
+        total_price = order.pig.price
+        if order.delivery_option == 'home':
+            total_price += DELIVERY_FEE
+        # Reservations need a 50% down payment; checkout orders pay on delivery
+        required_payment = total_price * Decimal('0.5') if order.down_payment > 0 else 0
+        orders.append({
+            'id': order.id,
+            'fullname': order.fullname,
+            'email': order.user.email if order.user and order.user.email else 'Not provided',
+            'contact_number': order.contact_number,
+            'address': order.address,
+            'pig_breed': order.pig.breed,
+            'pig_id': order.pig.id,
+            'pig_price': int(order.pig.price),
+            'down_payment': float(order.down_payment) if order.down_payment else 0,
+            'required_payment': float(required_payment),
+            'has_proof_of_payment': bool(order.proof_of_payment),
+            'delivery_option': order.get_delivery_option_display(),
+            'payment_method': order.get_payment_method_display(),
+            'pickup_time': order.pickup_time.strftime('%H:%M') if order.pickup_time else 'Not specified',
+            'created_at': order.created_at.strftime('%Y-%m-%d %H:%M'),
+        })
+    return orders
+
+
+def _total(order):
+    return float(order.pig.price) + (float(DELIVERY_FEE) if order.delivery_option == 'home' else 0)
+
+
+def payment_details(user):
+    """The customer's accepted, unpaid orders with the balance still due"""
+    orders = []
+    for order in Reservation.objects.filter(user=user, status='accepted', is_paid=False).select_related('pig'):
+        total_amount = _total(order)
+        downpayment_amount = float(order.down_payment) if order.down_payment else 0
+        orders.append({
+            'id': order.id,
+            'pig_breed': order.pig.breed,
+            'customer_name': order.fullname,
+            'pig_price': float(order.pig.price),
+            'delivery_fee': total_amount - float(order.pig.price),
+            'total_amount': total_amount,
+            'downpayment_amount': downpayment_amount,
+            'remaining_balance': total_amount - downpayment_amount,
+            'delivery_option': order.get_delivery_option_display(),
+            'payment_method': order.payment_method,
+            'payment_method_display': order.get_payment_method_display(),
+            'pickup_date': order.pickup_date.strftime('%Y-%m-%d') if order.pickup_date else None,
+            'pickup_time': order.pickup_time.strftime('%H:%M') if order.pickup_time else None
+        })
+    return orders
+
+
+def _notifications_stamp(user):
+    # New notifications raise the max id; marking read or pruning changes the counts
+    row = Notification.objects.filter(user=user).aggregate(
+        count=Count('pk'), unread=Count('pk', filter=Q(is_read=False)), last=Max('pk')
+    )
+    return f"{row['count']}.{row['unread']}.{row['last'] or 0}"
+
+
+def latest_notifications(user):
+    """First page of the customer's notification center"""
+    rows, next_cursor = notifications.page(user)
+    return {
+        'notifications': [notifications.as_dict(n) for n in rows],
+        'next_cursor': next_cursor,
+        'unread_count': notifications.unread_count(user),
+    }
+
+
+def _sections(user):
+    """name -> (version function, data function) for the sections user's role sees"""
+    if user.is_superuser or user.is_staff:
+        def pending():
+            orders = pending_orders()
+            return {'count': len(orders), 'orders': orders}
+        return {'pending': (lambda: _stamp(Reservation.objects.filter(status='pending')), pending)}
+    return {
+        'orders': (lambda: _stamp(Reservation.objects.filter(user=user)),
+                   lambda: {'payments': payment_details(user)}),
+        'notifications': (lambda: _notifications_stamp(user), lambda: latest_notifications(user)),
+    }
+
+
+def poll(user, versions):
+    """Badge and notification data for user's role, as {section: {'version': ..., **data}}.
+
+    `versions` maps section names to the version the client already has;
+    those sections are left out unless their version has changed, so an
+    idle poll costs one aggregate query per section.
+    """
+    sections = {}
+    for name, (version, data) in _sections(user).items():
+        current = version()
+        if versions.get(name) != current:
+            sections[name] = {'version': current, **data()}
+    return sections
@@ -0,0 +1,82 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import UserProfile
+
+# Heartbeat of any staff account, for customers asking "is the farm online?"
+STAFF_KEY = 'presence:staff'
+
+
+def _key(user_id):
+    return f'presence:{user_id}'
+
+
+def _cutoff():
+    return timezone.now() - timedelta(seconds=settings.PRESENCE_TIMEOUT_SECONDS)
+
+
+def heartbeat(user):
+    """Record that user is active now, at most once per PRESENCE_HEARTBEAT_SECONDS.
+
+    The throttle is a cache.add(), so on most requests this is one cache
+    round trip and no write. Heartbeats older than PRESENCE_TIMEOUT_SECONDS
+    read as offline. With PRESENCE_IN_DB the heartbeat is an UPDATE of
+    UserProfile.last_seen, which every worker sees; the throttle then only
+    bounds how often each worker writes.
+    """
+    if not cache.add(f'presence:throttle:{user.pk}', 1, timeout=settings.PRESENCE_HEARTBEAT_SECONDS):
+        return
+    if settings.PRESENCE_IN_DB:
+        UserProfile.objects.filter(user_id=user.pk).update(last_seen=timezone.now())
+        return
+    now = time.time()
+    beats = {_key(user.pk): now}
+    if user.is_staff or user.is_superuser:
+        beats[STAFF_KEY] = now
+    cache.set_many(beats, timeout=settings.PRESENCE_TIMEOUT_SECONDS)
+
+
+def clear(user):
+    """Mark user offline straight away (on logout)"""
+    cache.delete_many([_key(user.pk), f'presence:throttle:{user.pk}'])
+    if settings.PRESENCE_IN_DB:
+        UserProfile.objects.filter(user_id=user.pk).update(last_seen=None)
+
+
+def last_seen(user_ids):
+    """{user_id: timestamp of the last heartbeat, or None if offline} in one cache call or query"""
+    if settings.PRESENCE_IN_DB:
+        beats = {pk: seen.timestamp() for pk, seen in UserProfile.objects.filter(
+            user_id__in=user_ids, last_seen__gte=_cutoff()
+        ).values_list('user_id', 'last_seen')}
+        return {pk: beats.get(pk) for pk in user_ids}
+    beats = cache.get_many([_key(pk) for pk in user_ids])
+    return {pk: beats.get(_key(pk)) for pk in user_ids}
+
+
+def staff_online():
+    if settings.PRESENCE_IN_DB:
+        return UserProfile.objects.filter(
+            Q(user__is_staff=True) | Q(user__is_superuser=True), last_seen__gte=_cutoff()
+        ).exists()
+    return cache.get(STAFF_KEY) is not None
+
+
+class PresenceMiddleware:
+    """Refresh the logged-in user's heartbeat on each request (throttled)"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        # Without a session cookie there is no user to look up, so anonymous
+        # requests cost nothing
+        if settings.SESSION_COOKIE_NAME in request.COOKIES and request.user.is_authenticated:
+            heartbeat(request.user)
+        return response
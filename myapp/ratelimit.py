@@ -0,0 +1,117 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+
+from .metrics import incr
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """Parse '10/m' into (10, 60)"""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0].lower()]
+
+
+def client_ip(request):
+    """Client address, taking the last X-Forwarded-For hop added by our proxy"""
+    if settings.RATE_LIMIT_TRUST_X_FORWARDED_FOR:
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if forwarded:
+            return forwarded.split(',')[-1].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def client_user(request, route_name):
+    """Identify the account without touching the database.
+
+    Login attempts are keyed by the submitted username (so one account can't
+    be brute-forced from many addresses); everything else by the session
+    cookie, which identifies the logged-in user without a session lookup.
+    """
+    if route_name == 'login':
+        username = request.POST.get('username', '').strip().lower()
+        return f'name:{username}' if username else None
+    session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if session_key:
+        return 'session:' + hashlib.sha256(session_key.encode()).hexdigest()[:32]
+    return None
+
+
+def hit(bucket, rate):
+    """Take one token from a fixed-window bucket.
+
+    Returns the number of seconds to wait when the bucket is empty, or 0.
+    The counter lives in the cache, and add()/incr() are atomic there, so
+    concurrent workers share one bucket.
+    """
+    limit, period = parse_rate(rate)
+    now = time.time()
+    window = int(now // period)
+    key = f'ratelimit:{bucket}:{window}'
+    cache.add(key, 0, timeout=period)
+    try:
+        count = cache.incr(key)
+    except ValueError:
+        # Window expired between add() and incr()
+        cache.set(key, 1, timeout=period)
+        count = 1
+    if count > limit:
+        return int((window + 1) * period - now) + 1
+    return 0
+
+
+def check_rate_limit(request, route_name, rule):
+    """Apply a RATE_LIMITS rule; returns seconds until retry, or 0 if allowed"""
+    retry_after = 0
+    if rule.get('ip'):
+        retry_after = hit(f'{route_name}:ip:{client_ip(request)}', rule['ip'])
+    if not retry_after and rule.get('user'):
+        user_key = client_user(request, route_name)
+        if user_key:
+            retry_after = hit(f'{route_name}:{user_key}', rule['user'])
+    return retry_after
+
+
+def too_many_requests(request, retry_after):
+    message = 'Too many requests. Please wait a moment and try again.'
+    if request.path.startswith('/api/'):
+        response = JsonResponse({'success': False, 'error': message}, status=429)
+    else:
+        response = HttpResponse(message, status=429, content_type='text/plain')
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+class RateLimitMiddleware:
+    """Throttle the routes listed in settings.RATE_LIMITS by URL name.
+
+    Runs in process_view, so throttled requests get a 429 before the view
+    does any password hashing or database work.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.RATE_LIMIT_ENABLED or request.resolver_match is None:
+            return None
+        route_name = request.resolver_match.url_name
+        rule = settings.RATE_LIMITS.get(route_name)
+        if not rule:
+            return None
+        methods = rule.get('methods')
+        if methods and request.method not in methods:
+            return None
+
+        retry_after = check_rate_limit(request, route_name, rule)
+        if retry_after:
+            incr(f'ratelimit.{route_name}.throttled')
+            return too_many_requests(request, retry_after)
+        return None
@@ -0,0 +1,249 @@
+import re
+
+from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.urls import reverse
+
+from .models import Message, Pig, Reservation, SearchDocument, UserProfile
+
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+MAX_TERMS = 8
+# Set once every customer has a search document; see customers_indexed()
+CUSTOMERS_INDEXED_KEY = 'search:customers_indexed'
+
+
+def _words(*values):
+    """Join values into one string, splitting emails/phones into words too"""
+    parts = []
+    for value in values:
+        if value:
+            value = str(value)
+            parts.append(value)
+            split = ' '.join(TERM_RE.findall(value))
+            if split != value:
+                parts.append(split)
+    return ' '.join(parts)
+
+
+# Document builders: instance -> (object_id, title, body, url), or None when
+# the record should not be searchable
+
+def _pig_document(pig):
+    return (
+        pig.id,
+        f"{pig.breed} - {pig.get_sex_display()} - {pig.get_age_display()}",
+        _words(pig.breed, pig.description, f"{pig.weight_kg}kg", pig.price,
+               'available' if pig.is_available else 'sold'),
+        reverse('admin_pig_edit', args=[pig.id]),
+    )
+
+
+def _customer_document(user):
+    if user.is_staff or user.is_superuser:
+        return None
+    try:
+        profile = user.userprofile
+    except UserProfile.DoesNotExist:
+        profile = None
+    first_name = profile.first_name if profile and profile.first_name else user.first_name
+    last_name = profile.last_name if profile and profile.last_name else user.last_name
+    return (
+        user.id,
+        f"{first_name} {last_name}".strip() or user.username,
+        _words(user.username, user.email, user.first_name, user.last_name,
+               profile.email if profile else '',
+               profile.cellphone_number if profile else '',
+               profile.address if profile else ''),
+        reverse('admin_user_edit', args=[user.id]),
+    )
+
+
+def _reservation_document(reservation):
+    return (
+        reservation.id,
+        f"{reservation.fullname} - {reservation.pig.breed}",
+        _words(reservation.fullname, reservation.address, reservation.contact_number,
+               reservation.get_status_display(), reservation.status),
+        reverse('admin_reservation_view', args=[reservation.id]),
+    )
+
+
+def _message_document(message):
+    if message.conversation_id is None:
+        return None
+    return (
+        message.id,
+        message.conversation.subject,
+        _words(message.message, message.conversation.user.username),
+        reverse('admin_conversation', args=[message.conversation_id]),
+    )
+
+
+BUILDERS = {
+    Pig: ('pig', _pig_document),
+    User: ('customer', _customer_document),
+    Reservation: ('reservation', _reservation_document),
+    Message: ('message', _message_document),
+}
+
+SOURCE_QUERYSETS = {
+    'pig': lambda: Pig.objects.all(),
+    'customer': lambda: User.objects.filter(is_staff=False, is_superuser=False).select_related('userprofile'),
+    'reservation': lambda: Reservation.objects.select_related('pig'),
+    'message': lambda: Message.objects.select_related('conversation__user'),
+}
+
+
+def _update_vectors(queryset):
+    if connection.vendor == 'postgresql':
+        queryset.update(
+            search_vector=SearchVector('title', weight='A', config='simple')
+            + SearchVector('body', weight='B', config='simple')
+        )
+
+
+def index_instance(instance):
+    """Create, refresh or drop the search document for a saved instance"""
+    kind, builder = BUILDERS[type(instance)]
+    document = builder(instance)
+    if document is None:
+        remove_instance(instance)
+        return
+    object_id, title, body, url = document
+    doc, _ = SearchDocument.objects.update_or_create(
+        kind=kind, object_id=object_id,
+        defaults={'title': title[:255], 'body': body, 'url': url},
+    )
+    _update_vectors(SearchDocument.objects.filter(pk=doc.pk))
+
+
+def index_many(instances):
+    """index_instance for many saved instances of one model, in a few queries"""
+    instances = list(instances)
+    if not instances:
+        return
+    kind, builder = BUILDERS[type(instances[0])]
+    documents = [document for document in map(builder, instances) if document is not None]
+    SearchDocument.objects.filter(kind=kind, object_id__in=[instance.pk for instance in instances]).delete()
+    SearchDocument.objects.bulk_create([
+        SearchDocument(kind=kind, object_id=object_id, title=title[:255], body=body, url=url)
+        for object_id, title, body, url in documents
+    ])
+    _update_vectors(SearchDocument.objects.filter(kind=kind, object_id__in=[document[0] for document in documents]))
+
+
+def remove_instance(instance):
+    kind, _ = BUILDERS[type(instance)]
+    SearchDocument.objects.filter(kind=kind, object_id=instance.pk).delete()
+
+
+def rebuild(kinds=None, batch_size=500):
+    """Re-index every record of the given kinds; returns {kind: count}"""
+    counts = {}
+    builders = {kind: builder for kind, builder in BUILDERS.values()}
+    for kind in kinds or SOURCE_QUERYSETS:
+        SearchDocument.objects.filter(kind=kind).delete()
+        batch = []
+        count = 0
+        for instance in SOURCE_QUERYSETS[kind]().iterator(chunk_size=batch_size):
+            document = builders[kind](instance)
+            if document is None:
+                continue
+            object_id, title, body, url = document
+            batch.append(SearchDocument(kind=kind, object_id=object_id, title=title[:255], body=body, url=url))
+            if len(batch) >= batch_size:
+                SearchDocument.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            SearchDocument.objects.bulk_create(batch)
+            count += len(batch)
+        _update_vectors(SearchDocument.objects.filter(kind=kind))
+        counts[kind] = count
+    if 'customer' in counts:
+        cache.set(CUSTOMERS_INDEXED_KEY, True, timeout=None)
+    return counts
+
+
+def customers_indexed():
+    """Whether every customer has a search document, so matching_ids() can replace substring search.
+
+    rebuild() records it; otherwise it is counted once and remembered, for a
+    minute when the index is still incomplete. Saves keep a complete index
+    complete, so a True answer never needs rechecking.
+    """
+    indexed = cache.get(CUSTOMERS_INDEXED_KEY)
+    if indexed is None:
+        indexed = (SearchDocument.objects.filter(kind='customer').count()
+                   >= SOURCE_QUERYSETS['customer']().count())
+        cache.set(CUSTOMERS_INDEXED_KEY, indexed, timeout=None if indexed else 60)
+    return indexed
+
+
+def _terms(query):
+    return [term.lower() for term in TERM_RE.findall(query)][:MAX_TERMS]
+
+
+def search(query, kinds=None, limit=20, offset=0):
+    """Ranked prefix search over SearchDocument.
+
+    Every term must match the start of a word ("yorks" finds "Yorkshire").
+    Returns a list of SearchDocument objects with a `rank` attribute (higher
+    is better).
+    """
+    terms = _terms(query)
+    if not terms:
+        return []
+
+    if connection.vendor == 'postgresql':
+        ts_query = SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config='simple')
+        documents = SearchDocument.objects.filter(search_vector=ts_query).annotate(
+            rank=SearchRank('search_vector', ts_query)
+        ).order_by('-rank', '-updated_at')
+        if kinds:
+            documents = documents.filter(kind__in=kinds)
+        return list(documents.defer('search_vector')[offset:offset + limit])
+
+    if connection.vendor == 'sqlite':
+        match = ' AND '.join(f'"{term}"*' for term in terms)
+        sql = (
+            "SELECT d.id, -bm25(myapp_searchdocument_fts, 4.0, 1.0) AS rank "
+            "FROM myapp_searchdocument_fts JOIN myapp_searchdocument d ON d.id = myapp_searchdocument_fts.rowid "
+            "WHERE myapp_searchdocument_fts MATCH %s"
+        )
+        params = [match]
+        if kinds:
+            sql += f" AND d.kind IN ({', '.join(['%s'] * len(kinds))})"
+            params.extend(kinds)
+        sql += " ORDER BY rank DESC, d.updated_at DESC LIMIT %s OFFSET %s"
+        params.extend([limit, offset])
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            ranks = dict(cursor.fetchall())
+        documents = SearchDocument.objects.defer('search_vector').in_bulk(list(ranks))
+        results = []
+        for doc_id, rank in ranks.items():
+            document = documents[doc_id]
+            document.rank = rank
+            results.append(document)
+        return results
+
+    # Other backends: unranked substring match
+    condition = Q()
+    for term in terms:
+        condition &= Q(title__icontains=term) | Q(body__icontains=term)
+    documents = SearchDocument.objects.filter(condition).order_by('-updated_at')
+    if kinds:
+        documents = documents.filter(kind__in=kinds)
+    results = list(documents.defer('search_vector')[offset:offset + limit])
+    for document in results:
+        document.rank = 0
+    return results
+
+
+def matching_ids(query, kind, limit=1000):
+    """Object ids of the given kind matching query, best first"""
+    return [document.object_id for document in search(query, kinds=[kind], limit=limit)]
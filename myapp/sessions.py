@@ -0,0 +1,27 @@
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+from .metrics import get_counters, incr
+
+
+class SessionStore(CachedDBStore):
+    """cached_db sessions that count cache hits for the metrics endpoint"""
+
+    def load(self):
+        incr('sessions.loads')
+        return super().load()
+
+    def _get_session_from_db(self):
+        # Only reached when the session wasn't in the cache
+        incr('sessions.cache_misses')
+        return super()._get_session_from_db()
+
+
+def session_stats():
+    counters = get_counters(['sessions.loads', 'sessions.cache_misses'])
+    loads = counters['sessions.loads']
+    misses = counters['sessions.cache_misses']
+    return {
+        'loads': loads,
+        'cache_misses': misses,
+        'cache_hit_rate': round((loads - misses) / loads, 4) if loads else None,
+    }
@@ -0,0 +1,108 @@
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_out
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import account_summary, auth_backends, feedback_stats, notifications, presence, search
+from .catalog import bump_catalog_version
+from .metrics import incr
+from .models import Feedback, Message, Pig, Reservation, UserProfile
+from .transitions import reservation_transitioned
+
+# User saves that don't change anything we index (login, password rehash)
+UNINDEXED_USER_FIELDS = {'last_login', 'password'}
+
+
+@receiver(post_save, sender=Pig)
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Reservation)
+@receiver(post_save, sender=Message)
+def update_search_document(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Keep the search index in step with saved records"""
+    if raw:
+        return
+    if sender is User and update_fields and set(update_fields) <= UNINDEXED_USER_FIELDS:
+        return
+    search.index_instance(instance)
+
+
+@receiver(post_save, sender=UserProfile)
+def update_customer_search_document(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_instance(instance.user)
+
+
+@receiver(post_delete, sender=Pig)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Reservation)
+@receiver(post_delete, sender=Message)
+def delete_search_document(sender, instance, **kwargs):
+    search.remove_instance(instance)
+
+
+@receiver(post_save, sender=User)
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
+    """Every user has a profile, so request.user.userprofile never raises"""
+    if created and not raw:
+        auth_backends.ensure_profile(instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drop the user ProfileBackend cached for request.user"""
+    user_id = instance.pk if sender is User else instance.user_id
+    auth_backends.invalidate(user_id)
+    # Again once committed, as for the catalog caches below
+    transaction.on_commit(lambda: auth_backends.invalidate(user_id))
+
+
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+def invalidate_account_summary(sender, instance, **kwargs):
+    account_summary.invalidate([instance.user_id])
+    transaction.on_commit(lambda: account_summary.invalidate([instance.user_id]))
+
+
+@receiver(post_save, sender=Feedback)
+@receiver(post_delete, sender=Feedback)
+def refresh_feedback_rollup(sender, instance, raw=False, **kwargs):
+    """Recount the feedback's day once committed, so the refresh sees the row"""
+    if not raw:
+        day = timezone.localdate(instance.created_at)
+        transaction.on_commit(lambda: feedback_stats.refresh_days([day]))
+
+
+@receiver(post_save, sender=Pig)
+@receiver(post_delete, sender=Pig)
+def invalidate_catalog_caches(sender, **kwargs):
+    """Drop cached facet counts and inventory snapshots whenever a pig changes"""
+    bump_catalog_version()
+    # Again once committed, so a reader that reloaded inside the
+    # transaction window doesn't keep the old rows under the new version
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(reservation_transitioned)
+def record_transition(sender, transition, ids, count, **kwargs):
+    """Count transitions for metrics_api, refresh the changed orders' search
+    documents and account summaries and notify their customers"""
+    incr(f'reservations.{transition}', count)
+    reservations = list(Reservation.objects.filter(pk__in=ids).select_related('pig'))
+    search.index_many(reservations)
+    user_ids = {r.user_id for r in reservations}
+    account_summary.invalidate(user_ids)
+    transaction.on_commit(lambda: account_summary.invalidate(user_ids))
+    if transition in notifications.TRANSITION_KINDS:
+        notifications.notify_reservations(notifications.TRANSITION_KINDS[transition], reservations)
+
+
+@receiver(user_logged_out)
+def clear_presence(sender, user, **kwargs):
+    """Show the user offline as soon as they log out"""
+    if user is not None:
+        presence.clear(user)
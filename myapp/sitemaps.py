@@ -1,42 +1,67 @@
+import hashlib
+from datetime import datetime, time as datetime_time, timezone as datetime_timezone
+from xml.sax.saxutils import escape
+
 from django.contrib.sitemaps import Sitemap
+from django.core.cache import cache
+from django.db.models import Count, Max, QuerySet, Sum
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.urls import reverse
-from .models import Pig, UserProfile, Feedback
-
-
-class PigSitemap(Sitemap):
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from . import inventory
+
+SITEMAP_CACHE_TIMEOUT = 60 * 60
+ITERATOR_CHUNK_SIZE = 2000
+
+
+class StreamingSitemap(Sitemap):
+    """Sitemap section that can be written row by row and fingerprinted cheaply.
+
+    Database-backed sections return an ordered queryset restricted with
+    only(); pages are streamed with iterator() so memory stays flat however
+    many rows there are. lastmod_field names the column behind lastmod().
+    """
+    lastmod_field = 'created_at'
+
+    def page_items(self, page):
+        items = self.items()
+        start = (page - 1) * self.limit
+        page_items = items[start:start + self.limit]
+        if isinstance(page_items, QuerySet):
+            return page_items.iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+        return page_items
+
+    def state(self):
+        """(url count, fingerprint, latest lastmod) without loading the rows"""
+        items = self.items()
+        if isinstance(items, QuerySet):
+            totals = items.order_by().aggregate(count=Count('pk'), pk_sum=Sum('pk'), latest=Max(self.lastmod_field))
+            count, latest = totals['count'], totals['latest']
+            fingerprint = f"{count}:{totals['pk_sum']}:{latest}"
+        else:
+            count = len(items)
+            latest = max(filter(None, (self.lastmod(item) for item in items)), default=None)
+            fingerprint = f"{count}:{[self.location(item) for item in items]}:{latest}"
+        return count, fingerprint, latest
+
+
+class PigSitemap(StreamingSitemap):
     changefreq = "weekly"
     priority = 0.8
 
     def items(self):
-        return Pig.objects.filter(is_available=True)
-
-    def lastmod(self, obj):
-        return getattr(obj, "updated_at", obj.created_at)
-
-
-class UserProfileSitemap(Sitemap):
-    changefreq = "weekly"
-    priority = 0.8
+        return inventory.available_pigs()
 
-    def items(self):
-        return UserProfile.objects.all()
+    def location(self, obj):
+        return reverse('reservation_with_pig', args=[obj.id])
 
     def lastmod(self, obj):
         return getattr(obj, "updated_at", obj.created_at)
 
 
-class FeedbackSitemap(Sitemap):
-    changefreq = "weekly"
-    priority = 0.8
-
-    def items(self):
-        return Feedback.objects.all()
-
-    def lastmod(self, obj):
-        return obj.created_at
-
-
-class StaticViewSitemap(Sitemap):
+class StaticViewSitemap(StreamingSitemap):
     changefreq = "weekly"
     priority = 0.8
 
@@ -45,3 +70,115 @@ class StaticViewSitemap(Sitemap):
 
     def location(self, item):
         return reverse(item)
+
+    def lastmod(self, item):
+        return None
+
+
+def _num_pages(count, limit):
+    return max(1, -(-count // limit))
+
+
+def _as_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.combine(value, datetime_time.min, tzinfo=datetime_timezone.utc)
+
+
+def _url_entry(sitemap, item, base_url):
+    parts = [f'<url><loc>{escape(base_url + sitemap.location(item))}</loc>']
+    lastmod = sitemap.lastmod(item)
+    if lastmod:
+        parts.append(f'<lastmod>{lastmod:%Y-%m-%d}</lastmod>')
+    if sitemap.changefreq:
+        parts.append(f'<changefreq>{sitemap.changefreq}</changefreq>')
+    if sitemap.priority is not None:
+        parts.append(f'<priority>{sitemap.priority}</priority>')
+    parts.append('</url>\n')
+    return ''.join(parts)
+
+
+def _urlset(sections, base_url):
+    yield ('<?xml version="1.0" encoding="UTF-8"?>\n'
+           '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+    for sitemap, page in sections:
+        for item in sitemap.page_items(page):
+            yield _url_entry(sitemap, item, base_url)
+    yield '</urlset>\n'
+
+
+def _index(pages, base_url):
+    yield ('<?xml version="1.0" encoding="UTF-8"?>\n'
+           '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+    for name, page, latest in pages:
+        loc = base_url + reverse('sitemap_section', args=[name]) + (f'?p={page}' if page > 1 else '')
+        lastmod = f'<lastmod>{latest:%Y-%m-%d}</lastmod>' if latest else ''
+        yield f'<sitemap><loc>{escape(loc)}</loc>{lastmod}</sitemap>\n'
+    yield '</sitemapindex>\n'
+
+
+def _cached_stream(key, chunks):
+    """Yield chunks to the client and cache the whole body once it is complete"""
+    body = []
+    for chunk in chunks:
+        body.append(chunk)
+        yield chunk
+    cache.set(key, ''.join(body), SITEMAP_CACHE_TIMEOUT)
+
+
+def sitemap_response(request, sitemaps, section=None):
+    """Serve /sitemap.xml or one paged section with ETag/Last-Modified.
+
+    Each section's count and latest lastmod come from one aggregate query;
+    they make up the ETag and cache key, so crawlers get 304s and unchanged
+    sitemaps are served from the cache. Above one section page (50,000
+    URLs) /sitemap.xml becomes a sitemap index of paged sections.
+    """
+    instances = {name: cls() for name, cls in sitemaps.items()}
+    if section is not None and section not in instances:
+        raise Http404(f'No sitemap available for section: {section!r}')
+
+    states = {name: sitemap.state() for name, sitemap in instances.items()}
+    total = sum(count for count, _, _ in states.values())
+    use_index = total > Sitemap.limit
+    if section is not None:
+        selected = {section: instances[section]}
+    else:
+        selected = instances
+
+    try:
+        page = int(request.GET.get('p', 1))
+    except ValueError:
+        raise Http404('Page is not an integer')
+    last_page = _num_pages(states[section][0], instances[section].limit) if section is not None else 1
+    if not 1 <= page <= last_page:
+        raise Http404(f'Page {page} empty')
+
+    fingerprint = '|'.join(f'{name}={states[name][1]}' for name in selected)
+    digest = hashlib.md5(f'{use_index}:{page}:{fingerprint}'.encode()).hexdigest()
+    etag = f'"{digest}"'
+    latest = max((_as_datetime(states[name][2]) for name in selected if states[name][2]), default=None)
+    last_modified = latest.timestamp() if latest else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        base_url = f'{request.scheme}://{request.get_host()}'
+        key = f'sitemap:{section or "all"}:{digest}:{base_url}'
+        body = cache.get(key)
+        if body is not None:
+            response = HttpResponse(body, content_type='application/xml')
+        else:
+            if section is None and use_index:
+                pages = [
+                    (name, number, states[name][2])
+                    for name, sitemap in instances.items()
+                    for number in range(1, _num_pages(states[name][0], sitemap.limit) + 1)
+                ]
+                chunks = _index(pages, base_url)
+            else:
+                chunks = _urlset([(sitemap, page) for sitemap in selected.values()], base_url)
+            response = StreamingHttpResponse(_cached_stream(key, chunks), content_type='application/xml')
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
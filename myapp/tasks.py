@@ -0,0 +1,36 @@
+from decimal import Decimal
+
+from . import notifications
+from .jobs import task
+from .models import Notification, Reservation, Revenue
+
+
+@task('send_decline_notification')
+def send_decline_notification(user_id, pig_breed, pig_price):
+    notifications.notify([Notification(
+        user_id=user_id,
+        kind='order_declined',
+        message=notifications.message_for('order_declined', pig_breed, Decimal(pig_price)),
+    )])
+
+
+@task('sync_revenue')
+def sync_revenue(reservation_id):
+    """Create or remove the Revenue row to match the reservation's paid flag.
+
+    Reads the current state instead of trusting the enqueuer, so repeated
+    or out-of-order jobs for one reservation all converge.
+    """
+    reservation = Reservation.objects.select_related('pig').filter(pk=reservation_id).first()
+    if reservation is None or not reservation.is_paid:
+        Revenue.objects.filter(reservation_id=reservation_id).delete()
+        return
+    Revenue.objects.get_or_create(
+        reservation=reservation,
+        defaults={
+            'amount': reservation.pig.price,
+            'pig_breed': reservation.pig.breed,
+            'customer_name': reservation.fullname,
+            'payment_method': reservation.payment_method,
+        }
+    )
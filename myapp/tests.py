@@ -1,3 +1,1155 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from . import db_routers, inventory
+from .catalog import catalog_version
+from .db_routers import PIN_COOKIE, PrimaryReplicaRouter, ReplicaPinningMiddleware, use_replica
+from .models import Pig, UserProfile
+from .search import search
+
+# The manifest storage needs collectstatic; tests render templates without it
+TEST_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+@mock.patch('myapp.db_routers.replica_configured', return_value=True)
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        # Writes made by earlier tests outside a request leave the thread pinned
+        token = db_routers._wrote_to_primary.set(False)
+        self.addCleanup(db_routers._wrote_to_primary.reset, token)
+
+    def test_reads_default_to_primary(self, _):
+        self.assertEqual(self.router.db_for_read(Pig), 'default')
+
+    def test_replica_views_read_from_replica(self, _):
+        with use_replica():
+            self.assertEqual(self.router.db_for_read(Pig), 'replica')
+            self.assertEqual(self.router.db_for_read(Session), 'default')
+
+    def test_no_replica_configured(self, replica_configured):
+        replica_configured.return_value = False
+        with use_replica():
+            self.assertEqual(self.router.db_for_read(Pig), 'default')
+
+    def test_writes_go_to_primary_and_stick(self, _):
+        def view(request):
+            with use_replica():
+                before = self.router.db_for_read(Pig)
+                self.assertEqual(self.router.db_for_write(Pig), 'default')
+                after = self.router.db_for_read(Pig)
+            return HttpResponse(f'{before},{after}')
+
+        response = ReplicaPinningMiddleware(view)(RequestFactory().get('/'))
+        self.assertEqual(response.content, b'replica,default')
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_pinned_browser_reads_primary(self, _):
+        def view(request):
+            with use_replica():
+                return HttpResponse(self.router.db_for_read(Pig))
+
+        request = RequestFactory().get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        response = ReplicaPinningMiddleware(view)(request)
+        self.assertEqual(response.content, b'default')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+
+class ReplicaTransactionTests(TestCase):
+    @mock.patch('myapp.db_routers.replica_configured', return_value=True)
+    def test_reads_inside_transaction_use_primary(self, _):
+        # TestCase wraps each test in a transaction
+        with use_replica():
+            self.assertEqual(PrimaryReplicaRouter().db_for_read(Pig), 'default')
+
+
+@override_settings(STORAGES=TEST_STORAGES, RATE_LIMITS={
+    'login': {'methods': ['POST'], 'ip': '100/m', 'user': '2/m'},
+    'pending_count_api': {'ip': '1/m'},
+})
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @mock.patch('myapp.views.authenticate', return_value=None)
+    def test_login_throttled_before_password_check(self, authenticate):
+        for _ in range(2):
+            self.client.post(reverse('login'), {'username': 'farmer', 'password': 'wrong'})
+        response = self.client.post(reverse('login'), {'username': 'Farmer', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(authenticate.call_count, 2)
+
+        # Other accounts from the same address are unaffected
+        response = self.client.post(reverse('login'), {'username': 'other', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_login_page_get_not_throttled(self):
+        for _ in range(5):
+            self.assertEqual(self.client.get(reverse('login')).status_code, 200)
+
+    def test_api_throttle_returns_json(self):
+        self.client.get(reverse('pending_count_api'))
+        response = self.client.get(reverse('pending_count_api'))
+        self.assertEqual(response.status_code, 429)
+        self.assertFalse(response.json()['success'])
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class PasswordHashingTests(TestCase):
+    def test_new_passwords_use_argon2(self):
+        user = User.objects.create_user('farmer', password='s3cret-pass')
+        self.assertTrue(user.password.startswith('argon2$'))
+
+    def test_legacy_hash_upgraded_on_login(self):
+        user = User.objects.create(username='farmer', password=make_password('s3cret-pass', hasher='pbkdf2_sha256'))
+        response = self.client.post(reverse('login'), {'username': 'farmer', 'password': 's3cret-pass'})
+        self.assertEqual(response.status_code, 302)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('argon2$'))
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class SearchTests(TestCase):
+    def setUp(self):
+        self.pig = Pig.objects.create(breed='Yorkshire', age_months=4, weight_kg=30, sex='F', price=8000,
+                                      description='Healthy piglet from litter 12')
+        self.customer = User.objects.create_user('jdelacruz', email='juan.delacruz@example.com')
+        UserProfile.objects.update_or_create(user=self.customer, defaults=dict(
+            first_name='Juan', last_name='Dela Cruz', email='juan.delacruz@example.com',
+            cellphone_number='09171234567', address='Purok 3, Tagum'))
+        cache.clear()
+
+    def test_prefix_search_is_kept_in_sync(self):
+        self.assertEqual([d.object_id for d in search('yorks', kinds=['pig'])], [self.pig.id])
+        self.assertEqual([d.object_id for d in search('delacr', kinds=['customer'])], [self.customer.id])
+
+        self.pig.breed = 'Duroc'
+        self.pig.save()
+        self.assertEqual(search('yorks', kinds=['pig']), [])
+        self.pig.delete()
+        self.assertEqual(search('duroc'), [])
+
+    def test_staff_search_api(self):
+        admin = User.objects.create_user('staff', password='pw', is_staff=True)
+        self.client.force_login(admin)
+        response = self.client.get(reverse('search_api'), {'q': 'juan 0917'})
+        data = response.json()
+        self.assertEqual([r['id'] for r in data['results']], [self.customer.id])
+        self.assertFalse(data['has_next'])
+
+        response = self.client.get(reverse('admin_user_list'), {'search': 'tagum'})
+        self.assertEqual(list(response.context['users']), [self.customer])
+
+        # Not yet backfilled: substring match on names, username and email
+        from .models import SearchDocument
+        SearchDocument.objects.all().delete()
+        cache.clear()
+        response = self.client.get(reverse('admin_user_list'), {'search': 'delacruz'})
+        self.assertEqual(list(response.context['users']), [self.customer])
+
+    def test_rebuild_command_indexes_every_kind_by_default(self):
+        from django.core.management import CommandError, call_command
+        from .models import SearchDocument
+        from io import StringIO
+        from .search import customers_indexed
+        SearchDocument.objects.all().delete()
+        self.assertFalse(customers_indexed())
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('customer: 1 document(s) indexed', out.getvalue())
+        self.assertTrue(customers_indexed())
+        with self.assertRaises(CommandError):
+            call_command('rebuild_search_index', 'cows')
+
+
+class CustomerLookupTests(TestCase):
+    def test_allocate_username(self):
+        from .customers import allocate_username
+        self.assertEqual(allocate_username('juan'), 'juan')
+        for username in ['juan', 'juan1', 'juan2', 'juan4', 'juanita']:
+            User.objects.create_user(username)
+        with self.assertNumQueries(1):
+            self.assertEqual(allocate_username('juan'), 'juan3')
+
+    def test_autocomplete_api(self):
+        customer = User.objects.create_user('jdelacruz', email='juan@example.com')
+        UserProfile.objects.update_or_create(user=customer, defaults=dict(
+            first_name='Juan', last_name='Dela Cruz', email='juan@example.com',
+            cellphone_number='09171234567', address='Tagum'))
+        User.objects.create_user('maria', email='maria@example.com')
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+
+        data = self.client.get(reverse('customer_autocomplete_api'), {'q': 'dela 0917'}).json()
+        self.assertEqual([c['id'] for c in data['customers']], [customer.id])
+        self.assertEqual(data['customers'][0]['address'], 'Tagum')
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class FacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for breed, age, weight, sex, price in [
+            ('Yorkshire', 2, 15, 'F', 4000),
+            ('Yorkshire', 8, 70, 'M', 12000),
+            ('Duroc', 4, 25, 'M', 6000),
+            ('Duroc', 14, 110, 'F', 25000),
+        ]:
+            Pig.objects.create(breed=breed, age_months=age, weight_kg=weight, sex=sex, price=price)
+        self.client.force_login(User.objects.create_user('buyer'))
+
+    def test_counts_exclude_own_selection(self):
+        response = self.client.get(reverse('available_pigs'), {'breed': 'Duroc', 'age_filter': 'piglets'})
+        facets = response.context['facets']
+        self.assertEqual(len(response.context['pigs']), 1)
+        self.assertEqual(facets['total'], 1)
+        breeds = {option['value']: option['count'] for option in facets['breeds']}
+        self.assertEqual((breeds['Yorkshire'], breeds['Duroc']), (1, 1))
+        self.assertEqual(facets['age_groups'], {'all': 2, 'pigs': 1, 'piglets': 1})
+        self.assertContains(response, 'Yorkshire (1)')
+
+    def test_cached_until_pigs_change(self):
+        from .facets import facet_counts
+        pigs = Pig.objects.filter(is_available=True)
+        with self.assertNumQueries(1), mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            facets = facet_counts(pigs)
+        # With the per-process cache the counts expire with the inventory snapshot
+        self.assertEqual(cache_set.call_args.args[2], settings.INVENTORY_SNAPSHOT_MAX_AGE)
+        with self.assertNumQueries(0):
+            self.assertEqual(facet_counts(pigs), facets)
+        self.assertEqual(facets['age_groups'], {'all': 4, 'pigs': 2, 'piglets': 2})
+
+        version = catalog_version()
+        Pig.objects.create(breed='Landrace', age_months=3, weight_kg=20, sex='F', price=5000)
+        self.assertGreater(catalog_version(), version)
+        self.assertEqual(facet_counts(pigs)['age_groups']['all'], 5)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class InventorySnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        inventory.reset()
+        self.duroc = Pig.objects.create(breed='Duroc', age_months=8, weight_kg=70, sex='M', price=12000)
+        self.piglet = Pig.objects.create(breed='Yorkshire', age_months=2, weight_kg=15, sex='F', price=4000)
+        Pig.objects.create(breed='Duroc', age_months=3, weight_kg=20, sex='F', price=5000, is_available=False)
+
+    def test_filters_and_sorts_in_memory(self):
+        inventory.records()
+        with self.assertNumQueries(0):
+            self.assertEqual([p.id for p in inventory.available_pigs(breed='Duroc')], [self.duroc.id])
+            self.assertEqual([p.id for p in inventory.available_pigs(age_months__lt=6, weight_kg__gte=10)],
+                             [self.piglet.id])
+            self.assertEqual([p.id for p in inventory.available_pigs(order_by=['-price'])],
+                             [self.duroc.id, self.piglet.id])
+            self.assertEqual(str(inventory.available_pigs(breed='Yorkshire')[0]), str(self.piglet))
+
+    def test_reloads_after_pig_writes(self):
+        self.assertEqual(len(inventory.records()), 2)
+        self.piglet.is_available = False
+        self.piglet.save()
+        self.assertEqual([p.id for p in inventory.records()], [self.duroc.id])
+
+    def test_catalog_page_uses_snapshot(self):
+        self.client.force_login(User.objects.create_user('buyer'))
+        response = self.client.get(reverse('available_pigs'), {'age_filter': 'pigs', 'min_weight': '50'})
+        self.assertEqual([p.id for p in response.context['pigs']], [self.duroc.id])
+        self.assertContains(response, '8 months')
+
+
+class SitemapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        inventory.reset()
+        self.pig = Pig.objects.create(breed='Duroc', age_months=8, weight_kg=70, sex='M', price=12000)
+
+    def test_conditional_and_cached(self):
+        response = self.client.get(reverse('sitemap'))
+        body = b''.join(response.streaming_content)
+        self.assertIn(reverse('reservation_with_pig', args=[self.pig.id]).encode(), body)
+        self.assertIn('Last-Modified', response)
+        # Staff-only pages stay out of the public sitemap
+        self.assertNotIn(b'/manage/', body)
+        self.assertEqual(self.client.get(reverse('sitemap_section', args=['feedback'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('sitemap_section', args=['users'])).status_code, 404)
+
+        response = self.client.get(reverse('sitemap'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        # Unchanged sitemap comes back from the cache, not regenerated
+        response = self.client.get(reverse('sitemap'))
+        self.assertEqual(response.content, body)
+
+        Pig.objects.create(breed='Yorkshire', age_months=2, weight_kg=15, sex='F', price=4000)
+        response = self.client.get(reverse('sitemap'))
+        self.assertEqual(body.count(b'<url>') + 1, b''.join(response.streaming_content).count(b'<url>'))
+
+    def test_index_above_limit(self):
+        from .sitemaps import PigSitemap
+        with mock.patch.object(PigSitemap, 'limit', 1):
+            Pig.objects.create(breed='Yorkshire', age_months=2, weight_kg=15, sex='F', price=4000)
+            with mock.patch('django.contrib.sitemaps.Sitemap.limit', 3):
+                body = b''.join(self.client.get(reverse('sitemap')).streaming_content)
+            self.assertIn(b'<sitemapindex', body)
+            self.assertIn(reverse('sitemap_section', args=['pigs']).encode() + b'?p=2', body)
+            page = self.client.get(reverse('sitemap_section', args=['pigs']), {'p': 2})
+            self.assertEqual(b''.join(page.streaming_content).count(b'<url>'), 1)
+            self.assertEqual(self.client.get(reverse('sitemap_section', args=['pigs']), {'p': 3}).status_code, 404)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class HttpCachingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        inventory.reset()
+        Pig.objects.create(breed='Duroc', age_months=8, weight_kg=70, sex='M', price=12000)
+        self.user = User.objects.create_user('buyer')
+        self.client.force_login(self.user)
+        # The first page view sets the CSRF cookie that later ETags include
+        self.client.get(reverse('description'))
+
+    def test_private_page_headers_and_304(self):
+        response = self.client.get(reverse('description'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+        self.assertNotIn('Last-Modified', response)
+
+        response = self.client.get(reverse('description'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.templates, [])
+
+    def test_etag_changes_with_data_and_user(self):
+        etag = self.client.get(reverse('available_pigs'))['ETag']
+        self.assertEqual(self.client.get(reverse('available_pigs'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertNotEqual(self.client.get(reverse('available_pigs'), {'breed': 'Duroc'})['ETag'], etag)
+
+        Pig.objects.create(breed='Yorkshire', age_months=2, weight_kg=15, sex='F', price=4000)
+        response = self.client.get(reverse('available_pigs'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        self.client.force_login(User.objects.create_user('other'))
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = self.client.cookies[settings.CSRF_COOKIE_NAME].value
+        self.assertEqual(self.client.get(reverse('available_pigs'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_follows_the_rows_not_the_per_worker_version(self):
+        etag = self.client.get(reverse('available_pigs'))['ETag']
+        # Another worker: its own catalog version, same rows, same ETag
+        cache.delete('catalog:version')
+        inventory.reset()
+        self.assertEqual(self.client.get(reverse('available_pigs'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # A change this worker's version never heard of shows once the snapshot expires
+        Pig.objects.update(price=13000)
+        with self.settings(INVENTORY_SNAPSHOT_MAX_AGE=0):
+            self.assertEqual(self.client.get(reverse('available_pigs'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_pending_messages_skip_validators(self):
+        from django.contrib.messages import constants
+        from django.contrib.messages.storage.base import Message
+        from django.contrib.messages.storage.cookie import CookieStorage
+        etag = self.client.get(reverse('description'))['ETag']
+        storage = CookieStorage(RequestFactory().get('/'))
+        self.client.cookies[CookieStorage.cookie_name] = storage._encode([Message(constants.SUCCESS, 'Saved')])
+        response = self.client.get(reverse('description'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_public_text_files(self):
+        self.client.logout()
+        response = self.client.get('/robots.txt')
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=86400', response['Cache-Control'])
+        response = self.client.get('/robots.txt', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class CompressionTests(TestCase):
+    def setUp(self):
+        # The sitemap streams only on a cache miss
+        cache.clear()
+
+    def test_negotiates_encoding(self):
+        import gzip
+        import brotli
+        response = self.client.get(reverse('sitemap'), HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn(b'<urlset', brotli.decompress(b''.join(response.streaming_content)))
+
+        response = self.client.get(reverse('login'), HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'<html', gzip.decompress(response.content))
+
+        response = self.client.get(reverse('login'), HTTP_ACCEPT_ENCODING='identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_pages_with_a_csrf_token_get_padded_gzip(self):
+        import gzip
+        lengths = set()
+        for _ in range(5):
+            response = self.client.get(reverse('login'), HTTP_ACCEPT_ENCODING='gzip, br')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertIn(b'csrfmiddlewaretoken', gzip.decompress(response.content))
+            # The random filename sets the FNAME flag
+            self.assertTrue(response.content[3] & gzip.FNAME)
+            lengths.add(len(response.content))
+        self.assertGreater(len(lengths), 1)
+
+    def test_streaming_response_and_weak_etag(self):
+        import gzip
+        response = self.client.get(reverse('sitemap'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertIn(b'<urlset', gzip.decompress(b''.join(response.streaming_content)))
+
+        response = self.client.get(reverse('sitemap'), HTTP_ACCEPT_ENCODING='gzip',
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_minify_keeps_preformatted_blocks(self):
+        from .compression import minify_html
+        html = '<div>\n    <p>  a  </p>\n\n</div>\n<pre>  x\n\n  y</pre>\n  <script>\n  let a = 1\n  let b = 2\n</script>'
+        self.assertEqual(
+            minify_html(html),
+            '<div>\n<p> a </p>\n</div>\n<pre>  x\n\n  y</pre>\n<script>\n  let a = 1\n  let b = 2\n</script>',
+        )
+
+
+@override_settings(JOBS_RUN_INLINE=False)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        from . import jobs
+        self.jobs = jobs
+        self.calls = []
+        jobs.TASKS['test_task'] = lambda **payload: self.calls.append(payload)
+        self.addCleanup(jobs.TASKS.pop, 'test_task')
+
+    def test_claim_is_exclusive_and_success_deletes(self):
+        from .models import Job
+        job = self.jobs.enqueue('test_task', {'n': 1})
+        self.assertEqual(self.jobs.claim('a', 5), [job.pk])
+        self.assertEqual(self.jobs.claim('b', 5), [])
+        self.assertFalse(self.jobs.run_job(job.pk, 'b'))
+        self.assertTrue(self.jobs.run_job(job.pk, 'a'))
+        self.assertEqual(self.calls, [{'n': 1}])
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(JOBS_MAX_ATTEMPTS=2)
+    def test_retry_with_backoff_then_dead_letter(self):
+        from django.utils import timezone
+        from .models import DeadLetter, Job
+
+        def fail(**payload):
+            raise RuntimeError('boom')
+        self.jobs.TASKS['test_task'] = fail
+
+        job = self.jobs.enqueue('test_task', {'n': 1})
+        self.jobs.claim('a', 1)
+        self.jobs.run_job(job.pk, 'a')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertEqual(self.jobs.claim('a', 1), [])
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.jobs.claim('a', 1)
+        self.jobs.run_job(job.pk, 'a')
+        self.assertFalse(Job.objects.exists())
+        dead = DeadLetter.objects.get()
+        self.assertIn('boom', dead.error)
+        self.assertEqual(self.jobs.queue_stats()['dead_letters'], 1)
+
+
+
+@override_settings(STORAGES=TEST_STORAGES, JOBS_RUN_INLINE=False)
+class JobWorkerTests(TransactionTestCase):
+    # Worker threads use their own connections, so the data must be committed
+
+    def test_decline_and_revenue_run_in_worker(self):
+        from django.core.management import call_command
+        from io import StringIO
+        from .models import Notification, Reservation, Revenue
+        customer = User.objects.create_user('buyer')
+        pig = Pig.objects.create(breed='Duroc', age_months=8, weight_kg=70, sex='M', price=12000, is_available=False)
+        reservation = Reservation.objects.create(user=customer, pig=pig, fullname='Juan', contact_number='09171234567',
+                                                 address='Tagum', delivery_option='pickup', payment_method='cash')
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+
+        self.client.post(reverse('toggle_payment_status', args=[reservation.id]), '{"is_paid": true}',
+                         content_type='application/json')
+        self.assertFalse(Revenue.objects.exists())
+        call_command('run_worker', once=True, stdout=StringIO())
+        self.assertEqual(Revenue.objects.get().amount, 12000)
+
+        self.client.post(reverse('admin_reservation_delete', args=[reservation.id]))
+        self.assertFalse(Notification.objects.filter(kind='order_declined').exists())
+        call_command('run_worker', once=True, stdout=StringIO())
+        self.assertEqual(Notification.objects.get(kind='order_declined').user, customer)
+
+
+class ExpiryTests(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .models import Cart, PaymentProof, Reservation
+        self.customer = User.objects.create_user('buyer')
+        old = timezone.now() - timedelta(days=10)
+
+        def reserve(pig, status='pending', age=old):
+            reservation = Reservation.objects.create(user=self.customer, pig=pig, fullname='Juan', status=status,
+                                                     contact_number='09171234567', address='Tagum',
+                                                     delivery_option='pickup', payment_method='cash')
+            Reservation.objects.filter(pk=reservation.pk).update(created_at=age)
+            return reservation
+
+        self.stale_pig = Pig.objects.create(breed='Duroc', age_months=8, weight_kg=70, sex='M', price=12000,
+                                            is_available=False)
+        self.stale = reserve(self.stale_pig)
+        self.fresh_pig = Pig.objects.create(breed='Duroc', age_months=8, weight_kg=70, sex='M', price=12000,
+                                            is_available=False)
+        self.fresh = reserve(self.fresh_pig, age=timezone.now())
+        # Expired order whose pig was meanwhile accepted for someone else
+        self.held_pig = Pig.objects.create(breed='Yorkshire', age_months=3, weight_kg=20, sex='F', price=5000,
+                                           is_available=False)
+        self.stale_held = reserve(self.held_pig)
+        reserve(self.held_pig, status='accepted')
+        # Stale, but already paid something: waits for the admin
+        self.paid_pig = Pig.objects.create(breed='Landrace', age_months=3, weight_kg=20, sex='F', price=5000,
+                                           is_available=False)
+        self.paid = reserve(self.paid_pig)
+        Reservation.objects.filter(pk=self.paid.pk).update(down_payment=2500)
+        self.proof_pig = Pig.objects.create(breed='Landrace', age_months=3, weight_kg=20, sex='F', price=5000,
+                                            is_available=False)
+        self.proof = reserve(self.proof_pig)
+        PaymentProof.objects.create(reservation=self.proof, proof_image='payment_proofs/proof.jpg')
+
+        Cart.objects.create(user=self.customer, pig=self.fresh_pig)
+        Cart.objects.filter(pk=Cart.objects.create(user=self.customer, pig=Pig.objects.create(
+            breed='Duroc', age_months=8, weight_kg=70, sex='M', price=1)).pk).update(created_at=old - timedelta(days=10))
+
+    def test_dry_run_changes_nothing(self):
+        from io import StringIO
+        from django.core.management import call_command
+        out = StringIO()
+        call_command('expire_reservations', dry_run=True, stdout=out)
+        self.assertIn('would expire 2 reservation(s)', out.getvalue())
+        self.assertIn('release 1 pig(s)', out.getvalue())
+        self.assertIn('prune 2 cart item(s)', out.getvalue())
+        self.stale.refresh_from_db()
+        self.assertEqual(self.stale.status, 'pending')
+
+    def test_expires_releases_and_notifies(self):
+        from .expiry import expire_reservations, prune_carts
+        from .models import Cart, Notification, Reservation
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(expire_reservations(), {'reservations': 2, 'pigs': 1, 'notifications': 2})
+        self.stale.refresh_from_db()
+        self.fresh.refresh_from_db()
+        self.assertEqual((self.stale.status, self.fresh.status), ('expired', 'pending'))
+        reserved_pigs = [self.stale_pig.pk, self.fresh_pig.pk, self.held_pig.pk, self.paid_pig.pk, self.proof_pig.pk]
+        self.assertEqual(set(Pig.objects.filter(pk__in=reserved_pigs, is_available=True).values_list('pk', flat=True)),
+                         {self.stale_pig.pk})
+        self.assertEqual(set(Reservation.objects.filter(pk__in=[self.paid.pk, self.proof.pk])
+                             .values_list('status', flat=True)), {'pending'})
+        self.held_pig.refresh_from_db()
+        self.assertFalse(self.held_pig.is_available)
+        self.assertEqual(Notification.objects.filter(user=self.customer, kind='order_expired').count(), 2)
+        self.assertEqual(prune_carts(), 2)
+        self.assertFalse(Cart.objects.exists())
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class ArchiveTests(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .models import Conversation, Feedback, Message, PaymentProof, Reservation, Revenue
+        self.admin = User.objects.create_superuser('farmer', password='pw')
+        customer = User.objects.create_user('buyer')
+        self.old = old = timezone.now() - timedelta(days=500)
+        self.pig = Pig.objects.create(breed='Duroc', age_months=8, weight_kg=70, sex='M', price=12000,
+                                      is_available=False)
+        self.reservation = Reservation.objects.create(user=customer, pig=self.pig, fullname='Juan',
+                                                      contact_number='09171234567', address='Tagum',
+                                                      delivery_option='pickup', payment_method='cash',
+                                                      status='completed')
+        PaymentProof.objects.create(reservation=self.reservation, proof_image='payment_proofs/a.jpg')
+        self.revenue = Revenue.objects.create(reservation=self.reservation, amount=12000, pig_breed='Duroc',
+                                              customer_name='Juan', payment_method='cash')
+        self.feedback = Feedback.objects.create(user=customer, reservation=self.reservation, feedback_type='purchase',
+                                                overall_rating=5, service_quality=5, pig_quality=5,
+                                                delivery_experience=5)
+        Reservation.objects.filter(pk=self.reservation.pk).update(created_at=old, updated_at=old)
+        conversation = Conversation.objects.create(user=customer)
+        Message.objects.filter(pk=Message.objects.create(conversation=conversation, message='hi',
+                                                         is_read=True).pk).update(created_at=old)
+        Message.objects.create(conversation=conversation, message='still unread')
+
+    def tracking_totals(self):
+        self.client.force_login(self.admin)
+        context = self.client.get(reverse('tracking_records')).context
+        return context['total_completed_orders'], context['total_revenue'], list(context['breed_sales'])
+
+    def test_archive_keeps_analytics_and_restore_undoes_it(self):
+        from .archive import archive, restore
+        from .models import ArchivedRecord, Message, PaymentProof, Reservation
+        before = self.tracking_totals()
+
+        self.assertEqual(archive(dry_run=True), {'reservation': 1, 'message': 1})
+        self.assertEqual(archive(), {'reservation': 1, 'message': 1})
+        self.assertFalse(Reservation.objects.exists())
+        self.assertFalse(PaymentProof.objects.exists())
+        self.assertEqual(Message.objects.count(), 1)
+        self.revenue.refresh_from_db()
+        self.assertIsNone(self.revenue.reservation_id)
+        self.assertEqual(self.tracking_totals(), before)
+
+        self.assertEqual(restore(), {'reservation': 1, 'message': 1})
+        self.assertFalse(ArchivedRecord.objects.exists())
+        reservation = Reservation.objects.get(pk=self.reservation.pk)
+        self.assertEqual((reservation.status, reservation.created_at), ('completed', self.old))
+        self.assertEqual(reservation.payment_proofs.count(), 1)
+        self.revenue.refresh_from_db()
+        self.feedback.refresh_from_db()
+        self.assertEqual((self.revenue.reservation_id, self.feedback.reservation_id), (reservation.pk, reservation.pk))
+        self.assertEqual(self.tracking_totals(), before)
+        self.assertEqual(Message.objects.count(), 2)
+
+    def test_deleting_a_completed_reservation_deletes_its_sale(self):
+        from .models import Revenue
+        self.reservation.delete()
+        self.assertFalse(Revenue.objects.exists())
+        self.assertEqual(self.tracking_totals()[:2], (0, 0))
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class CustomerReservationListTests(TestCase):
+    def setUp(self):
+        from .models import Reservation
+        self.customer = User.objects.create_user('buyer')
+        pig = Pig.objects.create(breed='Duroc', age_months=8, weight_kg=70, sex='M', price=12000)
+        Reservation.objects.bulk_create([
+            Reservation(user=self.customer, pig=pig, fullname='Juan', contact_number='09171234567', address='Tagum',
+                        delivery_option='pickup', payment_method='cash', status=status)
+            for status in ['pending'] * 12 + ['accepted'] * 3 + ['completed'] * 4 + ['expired'] * 2
+        ])
+        self.client.force_login(self.customer)
+        cache.clear()
+
+    def test_orders_are_split_paged_and_counted_in_one_query(self):
+        url = reverse('customer_reservation_list')
+        # session, user, aggregate, then each page and its proofs, cart badge,
+        # presence heartbeat
+        with self.assertNumQueries(9):
+            response = self.client.get(url)
+        context = response.context
+        self.assertEqual((context['pending_count'], context['accepted_count'], context['completed_count']), (12, 3, 4))
+        self.assertEqual(len(context['active_orders']), 10)
+        self.assertEqual(context['active_orders'].paginator.num_pages, 2)
+        self.assertEqual({r.status for r in context['completed_orders']}, {'completed'})
+        active = list(context['active_orders'])
+
+        context = self.client.get(url, {'active_orders_page': 2}).context
+        self.assertEqual(len(context['active_orders']), 5)
+        active += context['active_orders']
+        self.assertEqual({r.status for r in active}, {'pending', 'accepted'})
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class BulkOrderTests(TestCase):
+    def setUp(self):
+        from .models import Reservation
+        self.admin = User.objects.create_superuser('farmer', password='pw')
+        customer = User.objects.create_user('buyer')
+
+        def order(price, down_payment=0, delivery='pickup', status='pending'):
+            pig = Pig.objects.create(breed='Duroc', age_months=8, weight_kg=70, sex='M', price=price,
+                                     is_available=False)
+            return Reservation.objects.create(user=customer, pig=pig, fullname='Juan', contact_number='09171234567',
+                                              address='Tagum', delivery_option=delivery, payment_method='gcash',
+                                              down_payment=down_payment, status=status)
+        self.checkout = order(10000)
+        self.enough = order(10000, down_payment=5063, delivery='home')
+        self.short = order(10000, down_payment=5000, delivery='home')
+        self.accepted = order(8000, status='accepted')
+        self.client.force_login(self.admin)
+
+    def post(self, action, ids):
+        import json
+        return self.client.post(reverse('admin_reservation_bulk'), json.dumps({'action': action, 'ids': ids}),
+                                content_type='application/json').json()
+
+    def test_accept_validates_down_payment_in_sql(self):
+        data = self.post('accept', [self.checkout.pk, self.enough.pk, self.short.pk, self.accepted.pk, 999])
+        self.assertEqual([r['ok'] for r in data['results']], [True, True, False, False, False])
+        self.assertIn('minimum 50% down payment is ₱5,062.50', data['results'][2]['message'])
+        self.assertEqual(data['summary'], {'succeeded': 2, 'failed': 3})
+        self.short.refresh_from_db()
+        self.enough.refresh_from_db()
+        self.assertEqual((self.enough.status, self.short.status), ('accepted', 'pending'))
+
+    def test_decline_and_mark_paid(self):
+        from .models import Notification, Reservation, Revenue
+        data = self.post('mark_paid', [self.accepted.pk])
+        self.assertEqual(data['summary']['succeeded'], 1)
+        self.accepted.refresh_from_db()
+        self.assertEqual((self.accepted.status, self.accepted.is_paid), ('completed', True))
+        self.assertEqual(Revenue.objects.get().amount, 8000)
+        self.assertIn('already paid', self.post('mark_paid', [self.accepted.pk])['results'][0]['message'])
+
+        data = self.post('decline', [self.checkout.pk, self.short.pk, self.accepted.pk])
+        self.assertEqual([r['ok'] for r in data['results']], [True, True, False])
+        self.assertFalse(Reservation.objects.filter(pk__in=[self.checkout.pk, self.short.pk]).exists())
+        self.assertEqual(Notification.objects.filter(kind='order_declined').count(), 2)
+        self.assertEqual(Pig.objects.filter(is_available=True).count(), 2)
+
+    def test_mark_paid_pays_completed_unpaid_orders(self):
+        from . import bulk_orders
+        from .models import Revenue
+        self.checkout.status = 'completed'
+        self.checkout.save()
+        self.assertTrue(bulk_orders.run('mark_paid', [self.checkout.pk])[0]['ok'])
+        self.checkout.refresh_from_db()
+        self.assertEqual((self.checkout.status, self.checkout.is_paid), ('completed', True))
+        self.assertEqual(Revenue.objects.get().reservation, self.checkout)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class TransitionTests(TestCase):
+    def setUp(self):
+        from .models import Reservation
+        self.admin = User.objects.create_superuser('farmer', password='pw')
+        pig = Pig.objects.create(breed='Duroc', age_months=8, weight_kg=70, sex='M', price=10000)
+        self.reservation = Reservation.objects.create(user=self.admin, pig=pig, fullname='Juan',
+                                                      contact_number='09171234567', address='Tagum',
+                                                      delivery_option='pickup', payment_method='cash')
+        self.client.force_login(self.admin)
+        cache.clear()
+
+    def test_transition_only_moves_allowed_sources_and_emits_one_event(self):
+        from .metrics import get_counter
+        from .transitions import reservation_transitioned, transition
+        events = []
+        reservation_transitioned.connect(lambda **kwargs: events.append(kwargs), weak=False, dispatch_uid='test')
+        self.addCleanup(reservation_transitioned.disconnect, dispatch_uid='test')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(transition('complete', self.reservation.pk), 1)
+            self.assertEqual(transition('accept', self.reservation.pk), 0)
+        self.reservation.refresh_from_db()
+        self.assertEqual(self.reservation.status, 'completed')
+        self.assertEqual([(e['transition'], e['count']) for e in events], [('complete', 1)])
+        self.assertEqual(get_counter('reservations.complete'), 1)
+
+    def test_signal_names_only_the_rows_the_update_changed(self):
+        from .models import Reservation
+        from .transitions import reservation_transitioned, transition
+        paid = Reservation.objects.create(user=self.admin, pig=self.reservation.pig, fullname='Maria',
+                                          contact_number='09171234567', address='Tagum', delivery_option='pickup',
+                                          payment_method='cash', status='completed', is_paid=True)
+        events = []
+        reservation_transitioned.connect(lambda **kwargs: events.append(kwargs), weak=False, dispatch_uid='test')
+        self.addCleanup(reservation_transitioned.disconnect, dispatch_uid='test')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(transition('mark_paid', [self.reservation.pk, paid.pk]), 1)
+        self.assertEqual([(e['ids'], e['count']) for e in events], [([self.reservation.pk], 1)])
+
+    def test_completed_unpaid_order_can_be_marked_paid_once(self):
+        import json
+        from .models import Revenue
+        from .transitions import transition
+        with self.captureOnCommitCallbacks(execute=True):
+            transition('complete', self.reservation.pk)
+
+        toggle = reverse('toggle_payment_status', args=[self.reservation.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            data = self.client.post(toggle, json.dumps({'is_paid': True}), content_type='application/json').json()
+        self.assertEqual((data['success'], data['status']), (True, 'completed'))
+        self.reservation.refresh_from_db()
+        self.assertTrue(self.reservation.is_paid)
+        self.assertTrue(Revenue.objects.filter(reservation=self.reservation).exists())
+        self.assertEqual(transition('mark_paid', self.reservation.pk), 0)
+
+    def test_views_go_through_transitions(self):
+        import json
+        url = reverse('admin_reservation_update_status', args=[self.reservation.pk])
+        for status in ['confirmed', 'cancelled']:
+            response = self.client.post(url, json.dumps({'status': status}), content_type='application/json')
+            self.assertEqual(response.json()['error'], 'Invalid status')
+        self.assertTrue(self.client.post(url, json.dumps({'status': 'accepted'}),
+                                         content_type='application/json').json()['success'])
+
+        toggle = reverse('toggle_payment_status', args=[self.reservation.pk])
+        data = self.client.post(toggle, json.dumps({'is_paid': True}), content_type='application/json').json()
+        self.assertEqual((data['success'], data['status']), (True, 'completed'))
+        self.client.post(toggle, json.dumps({'is_paid': False}), content_type='application/json')
+        self.reservation.refresh_from_db()
+        self.assertEqual((self.reservation.status, self.reservation.is_paid), ('accepted', False))
+
+        self.client.get(reverse('admin_reservation_complete', args=[self.reservation.pk]))
+        self.client.get(reverse('admin_reservation_confirm', args=[self.reservation.pk]))
+        self.reservation.refresh_from_db()
+        self.assertEqual(self.reservation.status, 'completed')
+
+
+class PollTests(TestCase):
+    def setUp(self):
+        from .models import Reservation
+        self.admin = User.objects.create_superuser('farmer', password='pw')
+        self.customer = User.objects.create_user('buyer', password='pw')
+        pig = Pig.objects.create(breed='Duroc', age_months=8, weight_kg=70, sex='M', price=10000)
+        self.reservation = Reservation.objects.create(user=self.customer, pig=pig, fullname='Juan',
+                                                      contact_number='09171234567', address='Tagum',
+                                                      delivery_option='home', payment_method='cash')
+
+    def test_sections_are_omitted_until_their_version_changes(self):
+        from .transitions import transition
+        self.client.force_login(self.admin)
+        url = reverse('poll_api')
+        pending = self.client.get(url).json()['sections']['pending']
+        self.assertEqual((pending['count'], pending['orders'][0]['id']), (1, self.reservation.pk))
+        with self.assertNumQueries(3):  # session, user, version
+            self.assertEqual(self.client.get(url, {'pending': pending['version']}).json()['sections'], {})
+
+        transition('accept', self.reservation.pk)
+        self.assertEqual(self.client.get(url, {'pending': pending['version']}).json()['sections']['pending']['count'], 0)
+
+    def test_customer_sections(self):
+        from .transitions import transition
+        self.client.force_login(self.customer)
+        url = reverse('poll_api')
+        with self.captureOnCommitCallbacks(execute=True):
+            transition('accept', self.reservation.pk)
+        sections = self.client.get(url).json()['sections']
+        self.assertEqual(sections['orders']['payments'][0]['remaining_balance'], 10125)
+        self.assertEqual([n['kind'] for n in sections['notifications']['notifications']], ['order_accepted'])
+        self.assertEqual(sections['notifications']['unread_count'], 1)
+
+        versions = {name: section['version'] for name, section in sections.items()}
+        self.client.post(reverse('notifications_read_api'), '{}', content_type='application/json')
+        sections = self.client.get(url, versions).json()['sections']
+        self.assertEqual(list(sections), ['notifications'])
+        self.assertEqual(sections['notifications']['unread_count'], 0)
+
+
+class PresenceTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('farmer', password='pw')
+        self.customer = User.objects.create_user('buyer', password='pw')
+        cache.clear()
+
+    @override_settings(PRESENCE_IN_DB=False)
+    def test_heartbeat_is_throttled_and_batch_lookup_reads_it(self):
+        from . import presence
+        with mock.patch.object(cache, 'set_many', wraps=cache.set_many) as set_many:
+            self.client.force_login(self.customer)
+            self.client.get(reverse('poll_api'))
+            self.client.get(reverse('poll_api'))
+        self.assertEqual(set_many.call_count, 1)
+        self.assertFalse(presence.staff_online())
+
+        self.client.force_login(self.admin)
+        with self.assertNumQueries(2):  # session, user
+            data = self.client.get(reverse('presence_api'), {'ids': f'{self.customer.pk},999'}).json()
+        self.assertTrue(data['presence'][str(self.customer.pk)]['is_online'])
+        self.assertFalse(data['presence']['999']['is_online'])
+        self.assertTrue(presence.staff_online())
+
+    @override_settings(PRESENCE_IN_DB=True)
+    def test_db_heartbeat_is_seen_by_every_worker(self):
+        from . import presence
+        self.client.force_login(self.customer)
+        self.client.get(reverse('poll_api'))
+        with self.assertNumQueries(0):  # throttled
+            presence.heartbeat(self.customer)
+        # Another worker has its own cache, but reads the same row
+        cache.clear()
+        self.assertIsNotNone(presence.last_seen([self.customer.pk])[self.customer.pk])
+        self.assertFalse(presence.staff_online())
+
+        self.client.force_login(self.admin)
+        self.client.get(reverse('poll_api'))
+        cache.clear()
+        self.assertTrue(presence.staff_online())
+        with override_settings(PRESENCE_TIMEOUT_SECONDS=0):
+            self.assertFalse(presence.staff_online())
+
+    @override_settings(PRESENCE_IN_DB=True)
+    @mock.patch('myapp.db_routers.replica_configured', return_value=True)
+    def test_db_heartbeat_does_not_pin_to_primary(self, _):
+        self.client.force_login(self.customer)
+        response = self.client.get(reverse('check_accepted_orders_api'))
+        self.assertIsNotNone(UserProfile.objects.get(user=self.customer).last_seen)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_logout_clears_presence(self):
+        from . import presence
+        for in_db in (False, True):
+            with self.subTest(in_db=in_db), override_settings(PRESENCE_IN_DB=in_db):
+                self.client.force_login(self.customer)
+                self.client.get(reverse('poll_api'))
+                self.client.logout()
+                self.assertEqual(presence.last_seen([self.customer.pk]), {self.customer.pk: None})
+
+
+class NotificationTests(TestCase):
+    def setUp(self):
+        from . import notifications
+        from .models import Notification
+        self.customer = User.objects.create_user('buyer', password='pw')
+        notifications.notify([Notification(user=self.customer, kind='order_declined', message=f'sorry {i}')
+                              for i in range(5)])
+        self.client.force_login(self.customer)
+
+    def test_cursor_pages_and_mark_read_keep_the_unread_count(self):
+        from . import notifications
+        url = reverse('notifications_api')
+        first = self.client.get(url, {'limit': 2}).json()
+        second = self.client.get(url, {'limit': 2, 'cursor': first['next_cursor']}).json()
+        last = self.client.get(url, {'limit': 2, 'cursor': second['next_cursor']}).json()
+        pages = [[n['message'] for n in page['notifications']] for page in (first, second, last)]
+        self.assertEqual(pages, [['sorry 4', 'sorry 3'], ['sorry 2', 'sorry 1'], ['sorry 0']])
+        self.assertIsNone(last['next_cursor'])
+        for cursor in ['bogus', '99999999999999999999-1']:
+            self.assertEqual(self.client.get(url, {'cursor': cursor}).status_code, 400)
+
+        read = self.client.post(reverse('notifications_read_api'), {'ids': [first['notifications'][0]['id']]},
+                                content_type='application/json').json()
+        self.assertEqual((read['marked'], read['unread_count']), (1, 4))
+        self.assertEqual(notifications.mark_read(self.customer, [first['notifications'][0]['id']]), 0)
+        self.assertEqual(len(self.client.get(url, {'unread': '1'}).json()['notifications']), 4)
+
+    def test_prune_drops_old_rows_and_their_unread_count(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from . import notifications
+        from .models import Notification
+        Notification.objects.filter(message__in=['sorry 0', 'sorry 1']).update(
+            created_at=timezone.now() - timedelta(days=400))
+        self.assertEqual(notifications.prune(dry_run=True), 2)
+        self.assertEqual(notifications.prune(), 2)
+        self.assertEqual(notifications.unread_count(self.customer), 3)
+
+
+class ProfileBackendTests(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user('buyer', password='pw', first_name='Juan')
+        cache.clear()
+
+    def test_new_users_get_a_profile_loaded_with_the_user(self):
+        from .auth_backends import ProfileBackend
+        self.assertEqual(self.customer.userprofile.first_name, 'Juan')
+        with self.assertNumQueries(1):
+            user = ProfileBackend().get_user(self.customer.pk)
+            self.assertEqual(user.userprofile.first_name, 'Juan')
+
+    @override_settings(AUTH_USER_CACHE_SECONDS=60)
+    def test_cached_user_is_dropped_on_profile_save(self):
+        from .auth_backends import ProfileBackend
+        backend = ProfileBackend()
+        backend.get_user(self.customer.pk)
+        with self.assertNumQueries(0):
+            backend.get_user(self.customer.pk)
+
+        profile = self.customer.userprofile
+        profile.first_name = 'Juanito'
+        profile.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(backend.get_user(self.customer.pk).userprofile.first_name, 'Juanito')
+
+
+class AccountSummaryTests(TestCase):
+    def setUp(self):
+        from .models import Reservation
+        self.customer = User.objects.create_user('buyer', password='pw')
+        self.orders = [
+            Reservation.objects.create(user=self.customer, fullname='Juan', status=status, contact_number='09171234567',
+                                       address='Tagum', delivery_option='pickup', payment_method='cash',
+                                       pig=Pig.objects.create(breed='Duroc', age_months=8, weight_kg=70, sex='M',
+                                                              price=10000))
+            for status in ['pending', 'accepted', 'completed']
+        ]
+        cache.clear()
+
+    @override_settings(ACCOUNT_SUMMARY_CACHE_SECONDS=60)
+    def test_one_query_cached_until_a_transition(self):
+        from .account_summary import summary
+        from .transitions import transition
+        with self.assertNumQueries(1):
+            counts = summary(self.customer)
+        self.assertEqual((counts['reservation_count'], counts['pending_count'], counts['unpaid_accepted_count']),
+                         (3, 1, 1))
+        with self.assertNumQueries(0):
+            summary(self.customer)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            transition('accept', [self.orders[0].pk])
+        self.client.force_login(self.customer)
+        data = self.client.get(reverse('check_accepted_orders_api')).json()
+        self.assertEqual(data, {'has_accepted_orders': True, 'count': 2})
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class FeedbackStatsTests(TestCase):
+    def setUp(self):
+        from .models import Feedback
+        customer = User.objects.create_user('buyer')
+        for overall, service, recommend in [(5, 4, True), (4, 4, True), (2, 3, False)]:
+            Feedback.objects.create(user=customer, feedback_type='purchase', overall_rating=overall,
+                                    service_quality=service, pig_quality=4, delivery_experience=5,
+                                    would_recommend=recommend)
+        self.admin = User.objects.create_superuser('farmer', password='pw')
+
+    def test_aggregate_and_rollup_agree_with_the_rows(self):
+        from . import feedback_stats
+        from .models import Feedback
+        with self.assertNumQueries(1):
+            stats = feedback_stats.stats()
+        expected = round(sum(f.get_average_rating() for f in Feedback.objects.all()) / 3, 1)
+        self.assertEqual((stats['total_feedbacks'], stats['average_rating'], stats['recommendation_rate']),
+                         (3, expected, 66.7))
+        overall = stats['dimensions'][0]
+        self.assertEqual([bar['count'] for bar in overall['histogram']], [0, 1, 0, 1, 1])
+        self.assertEqual(feedback_stats.trend()[-1]['total_feedbacks'], 3)
+
+        feedback_stats.rebuild()
+        with self.settings(FEEDBACK_STATS_FROM_ROLLUP=True):
+            self.assertEqual(feedback_stats.stats(), stats)
+            with self.captureOnCommitCallbacks(execute=True):
+                Feedback.objects.filter(overall_rating=2).delete()
+            self.assertEqual(feedback_stats.stats()['recommendation_rate'], 100.0)
+
+    def test_list_is_keyset_paginated(self):
+        from . import feedback_stats
+        self.client.force_login(self.admin)
+        with mock.patch.object(feedback_stats, 'PAGE_SIZE', 2):
+            first = self.client.get(reverse('admin_feedback_list'))
+            second = self.client.get(reverse('admin_feedback_list'), {'cursor': first.context['next_cursor']})
+        self.assertEqual(len(first.context['feedbacks']), 2)
+        self.assertEqual(len(second.context['feedbacks']), 1)
+        self.assertIsNone(second.context['next_cursor'])
+        # An out-of-range cursor falls back to the first page
+        response = self.client.get(reverse('admin_feedback_list'), {'cursor': '99999999999999999999-1'})
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class AdminTuningTests(TestCase):
+    def setUp(self):
+        self.pigs = [Pig.objects.create(breed=breed, age_months=3, weight_kg=20, sex='F', price=5000)
+                     for breed in ['Duroc', 'Landrace']]
+        self.client.force_login(User.objects.create_superuser('farmer', password='pw'))
+        self.url = reverse('admin:myapp_pig_changelist')
+
+    def test_list_edits_are_saved_in_bulk(self):
+        version = catalog_version()
+        data = {'form-TOTAL_FORMS': 2, 'form-INITIAL_FORMS': 2, '_save': 'Save'}
+        for i, pig in enumerate(Pig.objects.order_by('-id')):
+            data.update({f'form-{i}-id': pig.pk, f'form-{i}-price': 6000, f'form-{i}-is_available': 'on'})
+        with mock.patch.object(Pig, 'save') as save:
+            self.assertEqual(self.client.post(self.url, data).status_code, 302)
+        save.assert_not_called()
+        self.assertEqual(list(Pig.objects.values_list('price', flat=True).distinct()), [6000])
+        self.assertGreater(catalog_version(), version)
+
+    def test_unfiltered_changelist_uses_the_estimate(self):
+        with mock.patch('myapp.paginators.estimated_count', return_value=50000):
+            self.assertEqual(self.client.get(self.url).context['cl'].result_count, 50000)
+            self.assertEqual(self.client.get(self.url, {'q': 'duroc'}).context['cl'].result_count, 1)
+
+
+class DatabaseSettingsTests(SimpleTestCase):
+    def load_settings(self, **env):
+        import os
+        import runpy
+        with mock.patch.dict(os.environ, env):
+            return runpy.run_path(str(settings.BASE_DIR / 'myproject' / 'settings.py'))
+
+    def test_database_url_and_pool_options(self):
+        loaded = self.load_settings(DATABASE_URL='postgres://farm:pw@db.example.com:5432/farm', DB_POOL='True',
+                                    DB_POOL_MAX_SIZE='4', DB_CONN_MAX_AGE='60')
+        default = loaded['DATABASES']['default']
+        self.assertEqual((default['ENGINE'], default['HOST'], default['NAME']),
+                         ('django.db.backends.postgresql', 'db.example.com', 'farm'))
+        # Persistent connections are off when the pool is on
+        self.assertEqual(default['CONN_MAX_AGE'], 0)
+        self.assertEqual(default['OPTIONS']['pool']['max_size'], 4)
+
+        default = self.load_settings(DATABASE_URL='sqlite:///local.sqlite3', DB_POOL='True',
+                                     DB_CONN_MAX_AGE='60')['DATABASES']['default']
+        self.assertEqual(default['CONN_MAX_AGE'], 60)
+        self.assertNotIn('pool', default.get('OPTIONS', {}))
+
+
+class DbStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_counts_connections_and_reports_pool_counters(self):
+        from django.db import connections
+        from .metrics import db_stats, on_connection_created
+        on_connection_created(sender=None, connection=connections['default'])
+        stats = db_stats()['default']
+        self.assertEqual((stats['pooled'], stats['connections_opened']), (False, 1))
+
+        pool = mock.Mock(**{'get_stats.return_value': {'pool_size': 3, 'requests_num': 4, 'requests_wait_ms': 10}})
+        with mock.patch.dict(connections.settings['default'], {'OPTIONS': {'pool': {'max_size': 4}}}), \
+                mock.patch.object(connections['default'], 'pool', pool, create=True):
+            stats = db_stats()['default']
+        self.assertEqual((stats['pool']['size'], stats['pool']['checkouts'], stats['pool']['wait_ms_avg']),
+                         (3, 4, 2.5))
+
+
+class SessionTests(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        Session.objects.bulk_create(
+            [Session(session_key=f'expired{i}', session_data='', expire_date=timezone.now() - timedelta(days=1))
+             for i in range(5)]
+            + [Session(session_key='live', session_data='', expire_date=timezone.now() + timedelta(days=1))]
+        )
+        cache.clear()
+
+    def test_sweep_deletes_expired_sessions_in_batches(self):
+        from io import StringIO
+        from django.core.management import call_command
+        out = StringIO()
+        call_command('clear_expired_sessions', dry_run=True, stdout=out)
+        self.assertIn('Would delete 5', out.getvalue())
+        self.assertEqual(Session.objects.count(), 6)
+
+        with mock.patch('myapp.management.commands.clear_expired_sessions.time.sleep') as sleep, \
+                mock.patch.object(Session.objects, 'filter', wraps=Session.objects.filter) as filter_:
+            call_command('clear_expired_sessions', batch_size=2, pause=0, stdout=StringIO())
+        # Three batches of at most two keys (2, 2, 1), each a select plus a delete
+        self.assertEqual(filter_.call_count, 6)
+        self.assertEqual(sleep.call_count, 2)
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+
+    def test_cached_sessions_count_hits_and_misses(self):
+        from .sessions import SessionStore, session_stats
+        store = SessionStore()
+        store['cart'] = 1
+        store.save()
+        self.assertEqual(SessionStore(store.session_key)['cart'], 1)
+        cache.delete(SessionStore.cache_key_prefix + store.session_key)
+        self.assertEqual(SessionStore(store.session_key)['cart'], 1)
+        self.assertEqual(session_stats(), {'loads': 2, 'cache_misses': 1, 'cache_hit_rate': 0.5})
@@ -0,0 +1,77 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Q, Value, When
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Reservation
+
+# name -> (statuses it may start from, status it ends in, other fields it sets)
+TRANSITIONS = {
+    'accept': (['pending'], 'accepted', {}),
+    'reopen': (['accepted'], 'pending', {}),
+    'complete': (['pending', 'accepted'], 'completed', {}),
+    'mark_paid': (['pending', 'accepted', 'completed'], 'completed', {'is_paid': True}),
+    'mark_unpaid': (['accepted', 'completed'], 'accepted', {'is_paid': False}),
+    'expire': (['pending'], 'expired', {}),
+}
+
+# Extra condition a transition always applies, besides its source statuses
+GUARDS = {
+    # Completed orders can still be marked paid, but only once
+    'mark_paid': ~Q(status='completed') | Q(is_paid=False),
+}
+
+# Transition that reaches each status, for endpoints that take a target status
+BY_TARGET = {'pending': 'reopen', 'accepted': 'accept', 'completed': 'complete', 'expired': 'expire'}
+
+# Sent once per transition() call that changed rows, after the transaction
+# commits, with transition=name, target=status, ids=the changed ids and
+# count=len(ids)
+reservation_transitioned = Signal()
+
+DELIVERY_FEE = Decimal('125')
+
+# Half of the pig's price plus the delivery fee, as admin_reservation_confirm requires
+MINIMUM_DOWN_PAYMENT = (F('pig__price') + Case(
+    When(delivery_option='home', then=Value(DELIVERY_FEE)),
+    default=Value(Decimal('0')),
+    output_field=DecimalField(max_digits=10, decimal_places=2),
+)) * Value(Decimal('0.5'))
+
+# Guard for 'accept': checkout orders have no down payment to check
+ENOUGH_DOWN_PAYMENT = Q(down_payment=0) | Q(down_payment__gte=MINIMUM_DOWN_PAYMENT)
+
+
+def transition(name, ids, condition=None):
+    """Move reservations through transition `name` with one conditional UPDATE.
+
+    `ids` is a reservation id or a list of them. Only rows currently in one
+    of the transition's source statuses (and matching its GUARDS entry and
+    `condition`, a Q) change, checked by the UPDATE itself, so there is no
+    read-modify-save race. The signal names exactly the rows that moved:
+    those now carrying this UPDATE's updated_at. Returns the number of rows
+    changed; 0 means the order is missing, in another status or failed the
+    condition.
+    """
+    sources, target, fields = TRANSITIONS[name]
+    ids = [ids] if isinstance(ids, int) else list(ids)
+    queryset = Reservation.objects.filter(pk__in=ids, status__in=sources)
+    if name in GUARDS:
+        queryset = queryset.filter(GUARDS[name])
+    if condition is not None:
+        queryset = queryset.filter(condition)
+    now = timezone.now()
+    with transaction.atomic():
+        count = queryset.update(status=target, updated_at=now, **fields)
+        if count:
+            # The changed rows stay locked until commit, so this reads back
+            # exactly what the UPDATE wrote
+            changed = list(Reservation.objects.filter(pk__in=ids, status=target, updated_at=now).values_list(
+                'pk', flat=True
+            ))
+            transaction.on_commit(lambda: reservation_transitioned.send(
+                sender=Reservation, transition=name, target=target, ids=changed, count=len(changed)
+            ))
+    return count
@@ -50,6 +50,7 @@ urlpatterns = [
     path('manage/reservations/view/<int:reservation_id>/', views.admin_reservation_view, name='admin_reservation_view'),
     path('manage/reservations/edit/<int:reservation_id>/', views.admin_reservation_edit, name='admin_reservation_edit'),
     path('manage/reservations/delete/<int:reservation_id>/', views.admin_reservation_delete, name='admin_reservation_delete'),
+    path('manage/reservations/bulk/', views.admin_reservation_bulk, name='admin_reservation_bulk'),
     path('manage/reservations/confirm/<int:reservation_id>/', views.admin_reservation_confirm, name='admin_reservation_confirm'),
     path('manage/reservations/complete/<int:reservation_id>/', views.admin_reservation_complete, name='admin_reservation_complete'),
     path('manage/reservations/mark-complete/<int:reservation_id>/', views.complete_order, name='complete_order'),
@@ -78,12 +79,18 @@ urlpatterns = [
     # API endpoints
     path('api/pending-orders-count/', views.pending_count_api, name='pending_count_api'),
     path('api/pending-orders/', views.pending_orders_api, name='pending_orders_api'),
-    path('api/decline-notifications/', views.decline_notifications_api, name='decline_notifications_api'),
+    path('api/notifications/', views.notifications_api, name='notifications_api'),
+    path('api/notifications/read/', views.notifications_read_api, name='notifications_read_api'),
     path('api/toggle-payment-status/<int:reservation_id>/', views.toggle_payment_status, name='toggle_payment_status'),
     path('api/admin-status/', views.admin_status_api, name='admin_status_api'),
     path('api/user-status/<int:user_id>/', views.user_status_api, name='user_status_api'),
+    path('api/presence/', views.presence_api, name='presence_api'),
     path('api/check-accepted-orders/', views.check_accepted_orders_api, name='check_accepted_orders_api'),
     path('api/get-payment-details/', views.get_payment_details_api, name='get_payment_details_api'),
+    path('api/poll/', views.poll_api, name='poll_api'),
     path('api/upload-payment-proof/<int:reservation_id>/', views.upload_payment_proof_api, name='upload_payment_proof_api'),
     path('api/check-message-status/<int:conversation_id>/', views.check_message_status_api, name='check_message_status_api'),
+    path('api/metrics/', views.metrics_api, name='metrics_api'),
+    path('api/search/', views.search_api, name='search_api'),
+    path('api/customer-autocomplete/', views.customer_autocomplete_api, name='customer_autocomplete_api'),
 ]
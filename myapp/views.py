@@ -12,6 +12,11 @@ from decimal import Decimal
 from datetime import date, timedelta
 from .models import UserProfile, Pig, Reservation, Feedback, Cart
 from .forms import SignUpForm, ReservationForm, PigForm, AdminUserCreateForm, AdminUserForm, FeedbackForm, PurchaseForm
+from .db_routers import read_from_replica
+from .facets import facet_counts
+from . import inventory
+from .http_cache import cache_policy
+from .search import customers_indexed, matching_ids
 
 @csrf_exempt
 def login_view(request):
@@ -53,14 +58,11 @@ def signup_view(request):
                     first_name=form.cleaned_data['first_name'],
                     last_name=form.cleaned_data['last_name']
                 )
-                UserProfile.objects.create(
-                    user=user,
-                    first_name=form.cleaned_data['first_name'],
-                    last_name=form.cleaned_data['last_name'],
-                    email=form.cleaned_data['email'],
-                    cellphone_number=form.cleaned_data['cellphone_number'],
-                    address=form.cleaned_data['address']
-                )
+                # create_user() made the profile (signals.create_user_profile)
+                profile = user.userprofile
+                profile.cellphone_number = form.cleaned_data['cellphone_number']
+                profile.address = form.cleaned_data['address']
+                profile.save()
             messages.success(request, 'Account created successfully! Please log in.')
             return redirect('login')
     else:
@@ -76,6 +78,7 @@ def home_view(request):
     from datetime import date
     from django.db.models import Sum, Count
     from django.db import models
+    from .archive import archived_sales
     
     # Basic statistics
     available_pigs = Pig.objects.filter(is_available=True).count()
@@ -103,12 +106,12 @@ def home_view(request):
         total=Sum('pig__price')
     )['total'] or 0
     
-    # Total revenue (all-time from completed reservations)
-    total_revenue = Reservation.objects.filter(
+    # Total revenue (all-time from completed reservations, archived ones included)
+    total_revenue = (Reservation.objects.filter(
         status='completed'
     ).aggregate(
         total=Sum('pig__price')
-    )['total'] or 0
+    )['total'] or 0) + archived_sales()[None]['revenue']
     
     # Pending reservations that need admin approval
     pending_reservations = Reservation.objects.filter(
@@ -154,9 +157,9 @@ def home_view(request):
     return render(request, 'myapp/home.html', context)
 
 @login_required
+@cache_policy(templates=['myapp/available_pigs.html', 'base.html'], etag=lambda request: inventory.fingerprint())
+@read_from_replica
 def available_pigs_view(request):
-    pigs = Pig.objects.filter(is_available=True)
-    
     # Get search parameters
     breed = request.GET.get('breed', '')
     min_weight = request.GET.get('min_weight', '')
@@ -165,54 +168,47 @@ def available_pigs_view(request):
     max_age = request.GET.get('max_age', '')
     age_filter = request.GET.get('age_filter', '')
     
+    # Range filters as ORM-style lookups, applied both to the facet query
+    # and to the in-memory inventory snapshot
+    lookups = {}
+    for value, lookup, cast in (
+        (min_weight, 'weight_kg__gte', float),
+        (max_weight, 'weight_kg__lte', float),
+        (min_age, 'age_months__gte', int),
+        (max_age, 'age_months__lte', int),
+    ):
+        if value:
+            try:
+                lookups[lookup] = cast(value)
+            except ValueError:
+                pass
+    
+    search_params = {
+        'breed': breed,
+        'min_weight': min_weight,
+        'max_weight': max_weight,
+        'min_age': min_age,
+        'max_age': max_age,
+        'age_filter': age_filter,
+    }
+    
+    # Match counts for every filter option, before breed/age group narrow the list
+    facets = facet_counts(Pig.objects.filter(is_available=True, **lookups),
+                          breed=breed, age_filter=age_filter, params=search_params)
+    
     # Apply age filter (pigs vs piglets)
     if age_filter == 'pigs':
-        pigs = pigs.filter(age_months__gte=6)  # 6 months or older = pigs
+        lookups['age_months__gte'] = max(6, lookups.get('age_months__gte', 6))  # 6 months or older = pigs
     elif age_filter == 'piglets':
-        pigs = pigs.filter(age_months__lt=6)   # Under 6 months = piglets
+        lookups['age_months__lt'] = 6   # Under 6 months = piglets
     
-    # Apply other filters
     if breed:
-        pigs = pigs.filter(breed=breed)
-    
-    if min_weight:
-        try:
-            pigs = pigs.filter(weight_kg__gte=float(min_weight))
-        except ValueError:
-            pass
-    
-    if max_weight:
-        try:
-            pigs = pigs.filter(weight_kg__lte=float(max_weight))
-        except ValueError:
-            pass
-    
-    if min_age:
-        try:
-            pigs = pigs.filter(age_months__gte=int(min_age))
-        except ValueError:
-            pass
-    
-    if max_age:
-        try:
-            pigs = pigs.filter(age_months__lte=int(max_age))
-        except ValueError:
-            pass
-    
-    # Get all available breeds for the dropdown
-    available_breeds = Pig.objects.filter(is_available=True).values_list('breed', flat=True).distinct().order_by('breed')
+        lookups['breed'] = breed
     
     context = {
-        'pigs': pigs,
-        'available_breeds': available_breeds,
-        'search_params': {
-            'breed': breed,
-            'min_weight': min_weight,
-            'max_weight': max_weight,
-            'min_age': min_age,
-            'max_age': max_age,
-            'age_filter': age_filter,
-        }
+        'pigs': [record.to_pig() for record in inventory.available_pigs(**lookups)],
+        'facets': facets,
+        'search_params': search_params,
     }
     
     return render(request, 'myapp/available_pigs.html', context)
@@ -254,6 +250,7 @@ def reservation_view(request, pig_id=None):
     return render(request, 'myapp/reservation.html', {'form': form, 'pig': pig})
 
 @login_required
+@cache_policy(templates=['myapp/description.html', 'base.html'])
 def description_view(request):
     return render(request, 'myapp/description.html')
 
@@ -274,21 +271,32 @@ def logout_confirm_view(request):
 @login_required
 def customer_reservation_list(request):
     from datetime import date
-    reservations = Reservation.objects.filter(user=request.user).order_by('-created_at')
-    
-    # Calculate counts for statistics
-    pending_count = reservations.filter(status='pending').count()
-    accepted_count = reservations.filter(status='accepted').count()
-    
-    # Add can_delete flag to each reservation
+    from django.core.paginator import Paginator
+    from .account_summary import summary
+    reservations = Reservation.objects.filter(user=request.user)
+    
+    # All the statistics in one query
+    counts = summary(request.user)
+    
+    # Active and completed orders are paged separately; expired ones are left out
+    rows = reservations.select_related('pig').prefetch_related('payment_proofs').order_by('-created_at', '-id')
+    pages = {}
+    for name, queryset, count in (
+        ('active_orders', rows.filter(status__in=['pending', 'accepted']), counts['pending_count'] + counts['accepted_count']),
+        ('completed_orders', rows.filter(status='completed'), counts['completed_count']),
+    ):
+        paginator = Paginator(queryset, 10)
+        paginator.count = count  # already known, saves a COUNT query
+        pages[name] = paginator.get_page(request.GET.get(f'{name}_page'))
+    
+    # Add can_delete flag to each reservation shown
     today = date.today()
-    for reservation in reservations:
+    for reservation in pages['active_orders']:
         reservation.can_delete = not (reservation.pickup_date and reservation.pickup_date <= today)
     
     context = {
-        'reservations': reservations,
-        'pending_count': pending_count,
-        'accepted_count': accepted_count,
+        **counts,
+        **pages,
     }
     return render(request, 'myapp/customer_reservation_list.html', context)
 
@@ -438,17 +446,22 @@ def admin_user_list(request):
         accepted_reservations_count=Count('reservation', filter=Q(reservation__status='accepted'))
     )
     
-    # Apply search filter
+    # Apply search filter (full-text index over names, username, email and
+    # phone). The index matches word prefixes, not substrings, and returns
+    # at most the best 1000 customers. Until `manage.py rebuild_search_index`
+    # has indexed every customer, fall back to the substring match.
     if search_query:
-        from django.db.models import Q
-        users = users.filter(
-            Q(username__icontains=search_query) |
-            Q(email__icontains=search_query) |
-            Q(first_name__icontains=search_query) |
-            Q(last_name__icontains=search_query) |
-            Q(userprofile__first_name__icontains=search_query) |
-            Q(userprofile__last_name__icontains=search_query)
-        ).distinct()
+        if customers_indexed():
+            users = users.filter(id__in=matching_ids(search_query, 'customer'))
+        else:
+            users = users.filter(
+                Q(username__icontains=search_query) |
+                Q(email__icontains=search_query) |
+                Q(first_name__icontains=search_query) |
+                Q(last_name__icontains=search_query) |
+                Q(userprofile__first_name__icontains=search_query) |
+                Q(userprofile__last_name__icontains=search_query)
+            ).distinct()
     
     # Apply status filter
     if status_filter == 'active':
@@ -505,23 +518,12 @@ def admin_user_edit(request, user_id):
         if form.is_valid():
             user = form.save()
             
-            # Also update the UserProfile if it exists
-            try:
-                profile = user.userprofile
-                profile.first_name = user.first_name
-                profile.last_name = user.last_name
-                profile.email = user.email
-                profile.save()
-            except UserProfile.DoesNotExist:
-                # Create UserProfile if it doesn't exist
-                UserProfile.objects.create(
-                    user=user,
-                    first_name=user.first_name,
-                    last_name=user.last_name,
-                    email=user.email,
-                    cellphone_number='',
-                    address=''
-                )
+            # Keep the UserProfile in step
+            profile = user.userprofile
+            profile.first_name = user.first_name
+            profile.last_name = user.last_name
+            profile.email = user.email
+            profile.save()
             
             messages.success(request, f'User "{user.username}" has been updated successfully!')
             return redirect('admin_user_list')
@@ -581,7 +583,7 @@ def admin_reservation_list(request):
     # Only show accepted reservations in order management
     # Pending reservations are handled through notification system
     # Completed reservations are shown in tracking records
-    reservations = Reservation.objects.filter(status='accepted').order_by('-created_at')
+    reservations = Reservation.objects.filter(status='accepted').select_related('pig', 'user').order_by('-created_at')
     return render(request, 'myapp/admin_reservation_list.html', {'reservations': reservations})
 
 @login_required
@@ -618,7 +620,7 @@ def admin_reservation_view(request, reservation_id):
 @login_required
 @user_passes_test(is_admin)
 def admin_reservation_delete(request, reservation_id):
-    from .models import DeclineNotification
+    from .jobs import enqueue
     reservation = get_object_or_404(Reservation, id=reservation_id)
     if request.method == 'POST':
         # Store reservation details before deletion
@@ -631,13 +633,12 @@ def admin_reservation_delete(request, reservation_id):
         pig.is_available = True
         pig.save()
         
-        # Create decline notification for customer
-        DeclineNotification.objects.create(
-            user=customer_user,
-            pig_breed=pig_breed,
-            pig_price=pig_price,
-            message=f'We\'re sorry, but your order for {pig_breed} pig (₱{pig_price}) has been declined by the admin. You can place a new order if you wish.'
-        )
+        # Notify the customer in the background
+        enqueue('send_decline_notification', {
+            'user_id': customer_user.id,
+            'pig_breed': pig_breed,
+            'pig_price': str(pig_price),
+        })
         
         # Delete the reservation
         reservation.delete()
@@ -648,41 +649,69 @@ def admin_reservation_delete(request, reservation_id):
 @login_required
 @user_passes_test(is_admin)
 def admin_reservation_confirm(request, reservation_id):
-    reservation = get_object_or_404(Reservation, id=reservation_id)
-    
-    # Calculate total price including delivery fee
-    total_price = reservation.pig.price
-    if reservation.delivery_option == 'home':
-        total_price += 125  # Add delivery fee for home delivery
-    
-    # Check if this is a reservation (requires downpayment) or checkout order (no downpayment required)
-    if reservation.down_payment > 0:
-        # This is a reservation - validate downpayment
-        minimum_payment = total_price * Decimal('0.5')
-        if reservation.down_payment < minimum_payment:
-            delivery_info = f" (including ₱125 delivery fee)" if reservation.delivery_option == 'home' else ""
-            messages.error(request, f'Cannot accept reservation for {reservation.fullname}: Payment of ₱{reservation.down_payment:,.2f} is insufficient. Minimum 50% down payment required: ₱{minimum_payment:,.2f}{delivery_info}.')
-            return redirect('home')
-        
-        # All validations passed for reservation
-        reservation.status = 'accepted'
-        reservation.save()
-        messages.success(request, f'Reservation for {reservation.fullname} has been accepted! Down payment of ₱{reservation.down_payment:,.2f} confirmed.')
+    from .transitions import DELIVERY_FEE, ENOUGH_DOWN_PAYMENT, transition
+    reservation = get_object_or_404(Reservation.objects.select_related('pig'), id=reservation_id)
+    
+    # Reservations (with a down payment) need 50% down; checkout orders need no validation.
+    # The check runs in the UPDATE itself, so a concurrent change can't slip past it
+    if transition('accept', reservation.id, condition=ENOUGH_DOWN_PAYMENT):
+        if reservation.down_payment > 0:
+            messages.success(request, f'Reservation for {reservation.fullname} has been accepted! Down payment of ₱{reservation.down_payment:,.2f} confirmed.')
+        else:
+            messages.success(request, f'Order for {reservation.fullname} has been accepted! Full payment will be collected during delivery/pickup.')
+    elif reservation.status != 'pending':
+        messages.warning(request, f'Order for {reservation.fullname} is already {reservation.get_status_display().lower()}.')
     else:
-        # This is a checkout order - no downpayment validation needed
-        reservation.status = 'accepted'
-        reservation.save()
-        messages.success(request, f'Order for {reservation.fullname} has been accepted! Full payment will be collected during delivery/pickup.')
+        # Calculate total price including delivery fee
+        total_price = reservation.pig.price
+        if reservation.delivery_option == 'home':
+            total_price += DELIVERY_FEE
+        minimum_payment = total_price * Decimal('0.5')
+        delivery_info = f" (including ₱125 delivery fee)" if reservation.delivery_option == 'home' else ""
+        messages.error(request, f'Cannot accept reservation for {reservation.fullname}: Payment of ₱{reservation.down_payment:,.2f} is insufficient. Minimum 50% down payment required: ₱{minimum_payment:,.2f}{delivery_info}.')
     
     return redirect('home')
 
+@login_required
+@user_passes_test(is_admin)
+def admin_reservation_bulk(request):
+    """Accept, decline or mark paid several orders in one request.
+
+    Expects JSON {"action": "accept" | "decline" | "mark_paid", "ids": [...]}
+    and returns a result per order, so one bad order doesn't fail the rest.
+    """
+    from django.http import JsonResponse
+    import json
+    from . import bulk_orders
+    
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Invalid request method. Please use POST.'}, status=405)
+    try:
+        data = json.loads(request.body)
+        action = data.get('action')
+        ids = list(dict.fromkeys(int(pk) for pk in data.get('ids', [])))
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'success': False, 'message': 'Invalid JSON data'}, status=400)
+    if action not in bulk_orders.ACTIONS or not ids:
+        return JsonResponse({'success': False, 'message': 'Choose an action and at least one order'}, status=400)
+    
+    results = bulk_orders.run(action, ids)
+    succeeded = sum(result['ok'] for result in results)
+    return JsonResponse({
+        'success': True,
+        'results': results,
+        'summary': {'succeeded': succeeded, 'failed': len(results) - succeeded},
+    })
+
 @login_required
 @user_passes_test(is_admin)
 def admin_reservation_complete(request, reservation_id):
-    reservation = get_object_or_404(Reservation, id=reservation_id)
-    reservation.status = 'completed'
-    reservation.save()
-    messages.success(request, f'Reservation for {reservation.fullname} has been completed! Income recorded: ₱{reservation.pig.price}')
+    from .transitions import transition
+    reservation = get_object_or_404(Reservation.objects.select_related('pig'), id=reservation_id)
+    if transition('complete', reservation.id):
+        messages.success(request, f'Reservation for {reservation.fullname} has been completed! Income recorded: ₱{reservation.pig.price}')
+    else:
+        messages.warning(request, f'Reservation for {reservation.fullname} is already {reservation.get_status_display().lower()}.')
     return redirect('home')
 
 @login_required
@@ -693,35 +722,33 @@ def admin_reservation_update_status(request, reservation_id):
         try:
             import json
             from django.http import JsonResponse
+            from .transitions import BY_TARGET, transition
             
             reservation = get_object_or_404(Reservation, id=reservation_id)
             data = json.loads(request.body)
             new_status = data.get('status')
             
-            # Validate status
-            valid_statuses = ['pending', 'confirmed', 'completed', 'cancelled']
-            if new_status not in valid_statuses:
+            # Only statuses in Reservation.STATUS_CHOICES, via their transition
+            if new_status not in BY_TARGET:
                 return JsonResponse({'success': False, 'error': 'Invalid status'})
-            
-            # Update status
-            reservation.status = new_status
-            reservation.save()
+            if not transition(BY_TARGET[new_status], reservation.id):
+                return JsonResponse({'success': False, 'error': f'Cannot change a {reservation.get_status_display().lower()} order to {new_status}'})
             
             # Create success message
             status_messages = {
-                'confirmed': f'Reservation for {reservation.fullname} has been confirmed!',
+                'accepted': f'Reservation for {reservation.fullname} has been accepted!',
                 'completed': f'Reservation for {reservation.fullname} has been completed!',
-                'cancelled': f'Reservation for {reservation.fullname} has been cancelled.',
+                'expired': f'Reservation for {reservation.fullname} has expired.',
                 'pending': f'Reservation for {reservation.fullname} is now pending.'
             }
             
-            messages.success(request, status_messages.get(new_status, 'Status updated successfully!'))
+            messages.success(request, status_messages[new_status])
             
             return JsonResponse({
                 'success': True, 
-                'message': status_messages.get(new_status, 'Status updated successfully!'),
+                'message': status_messages[new_status],
                 'new_status': new_status,
-                'status_display': reservation.get_status_display()
+                'status_display': dict(Reservation.STATUS_CHOICES)[new_status]
             })
             
         except Exception as e:
@@ -733,29 +760,21 @@ def admin_reservation_update_status(request, reservation_id):
 @login_required
 def user_profile(request):
     """Display user profile information"""
-    try:
-        profile = request.user.userprofile
-    except UserProfile.DoesNotExist:
-        # Create profile if it doesn't exist
-        profile = UserProfile.objects.create(
-            user=request.user,
-            first_name=request.user.first_name or '',
-            last_name=request.user.last_name or '',
-            email=request.user.email or '',
-            cellphone_number='',
-            address=''
-        )
+    from .account_summary import summary
+    profile = request.user.userprofile
     
     # Get user's reservations
     reservations = Reservation.objects.filter(user=request.user).order_by('-created_at')
+    counts = summary(request.user)
     
     context = {
         'profile': profile,
         'reservations': reservations,
-        'total_reservations': reservations.count(),
-        'pending_reservations': reservations.filter(status='pending').count(),
-        'confirmed_reservations': reservations.filter(status='confirmed').count(),
-        'completed_reservations': reservations.filter(status='completed').count(),
+        'total_reservations': counts['reservation_count'],
+        'pending_reservations': counts['pending_count'],
+        # Accepted is this farm's confirmed state
+        'confirmed_reservations': counts['accepted_count'],
+        'completed_reservations': counts['completed_count'],
     }
     
     return render(request, 'myapp/user_profile.html', context)
@@ -763,17 +782,7 @@ def user_profile(request):
 @login_required
 def edit_profile(request):
     """Edit user profile information"""
-    try:
-        profile = request.user.userprofile
-    except UserProfile.DoesNotExist:
-        profile = UserProfile.objects.create(
-            user=request.user,
-            first_name=request.user.first_name or '',
-            last_name=request.user.last_name or '',
-            email=request.user.email or '',
-            cellphone_number='',
-            address=''
-        )
+    profile = request.user.userprofile
     
     if request.method == 'POST':
         # Update profile data
@@ -870,20 +879,15 @@ def feedback_form(request, reservation_id):
 # Admin Feedback Management Views
 @login_required
 @user_passes_test(is_admin)
+@read_from_replica
 def admin_feedback_list(request):
-    """Display all customer feedback for admin review"""
-    feedbacks = Feedback.objects.all().order_by('-created_at').select_related('user', 'reservation', 'reservation__pig')
-    
-    # Calculate statistics
-    total_feedbacks = feedbacks.count()
-    average_rating = 0
-    recommendation_rate = 0
-    
-    if total_feedbacks > 0:
-        total_rating = sum(feedback.get_average_rating() for feedback in feedbacks)
-        average_rating = total_rating / total_feedbacks
-        recommendations = feedbacks.filter(would_recommend=True).count()
-        recommendation_rate = (recommendations / total_feedbacks) * 100
+    """Display all customer feedback for admin review, newest first.
+
+    ?cursor= pages through the list (see myapp.keyset); the statistics
+    cover all feedback whatever the filters.
+    """
+    from . import feedback_stats, keyset
+    feedbacks = Feedback.objects.select_related('user__userprofile', 'reservation__pig')
     
     # Filter by rating if requested
     rating_filter = request.GET.get('rating')
@@ -899,11 +903,19 @@ def admin_feedback_list(request):
     if type_filter:
         feedbacks = feedbacks.filter(feedback_type=type_filter)
     
+    cursor = request.GET.get('cursor')
+    try:
+        page, next_cursor = keyset.page(feedbacks, cursor, feedback_stats.PAGE_SIZE)
+    except ValueError:
+        cursor = None
+        page, next_cursor = keyset.page(feedbacks, None, feedback_stats.PAGE_SIZE)
+    
     context = {
-        'feedbacks': feedbacks,
-        'total_feedbacks': total_feedbacks,
-        'average_rating': round(average_rating, 1),
-        'recommendation_rate': round(recommendation_rate, 1),
+        **feedback_stats.stats(),
+        'trend': feedback_stats.trend(),
+        'feedbacks': page,
+        'cursor': cursor,
+        'next_cursor': next_cursor,
         'rating_filter': rating_filter,
         'type_filter': type_filter,
     }
@@ -1094,52 +1106,31 @@ def checkout_cart(request):
     # If GET request, redirect back to cart
     return redirect('view_cart')
 
-# API endpoint for notification count
 @login_required
-def admin_status_api(request):
-    """API endpoint to check if admin is online"""
+@user_passes_test(is_admin)
+def user_status_api(request, user_id):
+    """API endpoint to check if a specific user is online"""
     from django.http import JsonResponse
+    from .presence import last_seen
     
-    # Simple check - if admin is making this request, they're online
-    if request.user.is_superuser or request.user.is_staff:
-        return JsonResponse({'is_online': True})
-    else:
-        return JsonResponse({'is_online': False})
+    return JsonResponse({'is_online': last_seen([user_id])[user_id] is not None})
 
 @login_required
 @user_passes_test(is_admin)
-def user_status_api(request, user_id):
-    """API endpoint to check if a specific user is online"""
+def presence_api(request):
+    """API endpoint returning presence for many users at once (?ids=1,2,3)"""
     from django.http import JsonResponse
-    from django.contrib.auth.models import User
-    from django.utils import timezone
-    from datetime import timedelta
+    from .presence import last_seen
     
     try:
-        user = User.objects.get(id=user_id)
-        
-        # Check if user has been active in the last 5 minutes
-        # You can implement more sophisticated logic here
-        # For now, we'll check if they have recent activity
-        
-        # Simple implementation: check if user has recent messages or login activity
-        recent_activity = False
-        
-        # Check for recent messages (within last 5 minutes)
-        from .models import Message
-        recent_messages = Message.objects.filter(
-            conversation__user=user,
-            sender='customer',
-            created_at__gte=timezone.now() - timedelta(minutes=5)
-        ).exists()
-        
-        if recent_messages:
-            recent_activity = True
-        
-        return JsonResponse({'is_online': recent_activity})
-        
-    except User.DoesNotExist:
-        return JsonResponse({'is_online': False})
+        user_ids = [int(pk) for pk in request.GET.get('ids', '').split(',') if pk][:200]
+    except ValueError:
+        return JsonResponse({'error': 'ids must be a comma-separated list of user ids'}, status=400)
+    
+    return JsonResponse({'presence': {
+        pk: {'is_online': seen is not None, 'last_seen': seen}
+        for pk, seen in last_seen(user_ids).items()
+    }})
 
 # API endpoint for notification count
 @login_required
@@ -1153,91 +1144,71 @@ def pending_count_api(request):
     pending_count = Reservation.objects.filter(status='pending').count()
     return JsonResponse({'count': pending_count})
 
-# API endpoint for pending orders details
 @login_required
-def decline_notifications_api(request):
-    """API endpoint to get decline notifications for customers"""
+def notifications_api(request):
+    """API endpoint for the customer's notification center, newest first.
+
+    ?cursor= takes the next_cursor of the previous page; ?unread=1 lists
+    only unread notifications.
+    """
     from django.http import JsonResponse
-    from .models import DeclineNotification
-    
-    # Get decline notifications for the current user
-    notifications = DeclineNotification.objects.filter(user=request.user).order_by('-created_at')
-    
-    notifications_data = []
-    for notification in notifications:
-        notifications_data.append({
-            'id': notification.id,
-            'pig_breed': notification.pig_breed,
-            'pig_price': float(notification.pig_price),
-            'message': notification.message,
-            'is_read': notification.is_read,
-            'created_at': notification.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-        })
+    from . import notifications
+    
+    try:
+        limit = min(int(request.GET.get('limit', notifications.PAGE_SIZE)), 50)
+        rows, next_cursor = notifications.page(request.user, request.GET.get('cursor'),
+                                               request.GET.get('unread') == '1', limit)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor or limit'}, status=400)
     
-    return JsonResponse({'notifications': notifications_data})
+    return JsonResponse({
+        'notifications': [notifications.as_dict(n) for n in rows],
+        'next_cursor': next_cursor,
+        'unread_count': notifications.unread_count(request.user),
+    })
+
+@login_required
+def notifications_read_api(request):
+    """Mark notifications read: JSON {"ids": [...]}, or {} for all of them"""
+    from django.http import JsonResponse
+    import json
+    from . import notifications
+    
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Invalid request method. Please use POST.'}, status=405)
+    try:
+        ids = json.loads(request.body or '{}').get('ids')
+        ids = None if ids is None else [int(pk) for pk in ids]
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'success': False, 'message': 'Invalid JSON data'}, status=400)
+    
+    marked = notifications.mark_read(request.user, ids)
+    return JsonResponse({'success': True, 'marked': marked,
+                         'unread_count': notifications.unread_count(request.user)})
 
 @login_required
 def pending_orders_api(request):
     """API endpoint to get pending reservations details for admin notifications"""
     from django.http import JsonResponse
+    from .poll import pending_orders
     
     if not (request.user.is_superuser or request.user.is_staff):
         return JsonResponse({'orders': []})
     
-    pending_orders = Reservation.objects.filter(status='pending').select_related('pig', 'user').order_by('-created_at')
-    
-    orders_data = []
-    for order in pending_orders:
-        # Calculate total price including delivery fee
-        total_price = order.pig.price
-        if order.delivery_option == 'home':
-            total_price += 125  # Add delivery fee for home delivery
-        
-        # Calculate required payment based on order type
-        if order.down_payment > 0:
-            # This is a reservation - 50% minimum downpayment required
-            required_payment = total_price * Decimal('0.5')
-        else:
-            # This is a checkout order - full payment required during delivery
-            required_payment = 0  # No upfront payment required for checkout orders
-        
-        orders_data.append({
-            'id': order.id,
-            'fullname': order.fullname,
-            'email': order.user.email if order.user and order.user.email else 'Not provided',
-            'contact_number': order.contact_number,
-            'address': order.address,
-            'pig_breed': order.pig.breed,
-            'pig_id': order.pig.id,
-            'pig_price': int(order.pig.price),
-            'down_payment': float(order.down_payment) if order.down_payment else 0,
-            'required_payment': float(required_payment),
-            'has_proof_of_payment': bool(order.proof_of_payment),
-            'delivery_option': order.get_delivery_option_display(),
-            'payment_method': order.get_payment_method_display(),
-            'pickup_time': order.pickup_time.strftime('%H:%M') if order.pickup_time else 'Not specified',
-            'created_at': order.created_at.strftime('%Y-%m-%d %H:%M'),
-        })
-    
-    return JsonResponse({'orders': orders_data})
+    return JsonResponse({'orders': pending_orders()})
 
 @login_required
 def check_accepted_orders_api(request):
     """API endpoint to check if customer has accepted orders"""
     from django.http import JsonResponse
+    from .account_summary import summary
     
     # Only for customers (non-admin)
     if request.user.is_superuser or request.user.is_staff:
         return JsonResponse({'has_accepted_orders': False, 'count': 0})
     
-    # Check for accepted orders that haven't been paid
-    accepted_orders = Reservation.objects.filter(
-        user=request.user,
-        status='accepted',
-        is_paid=False
-    )
-    
-    count = accepted_orders.count()
+    # Accepted orders that haven't been paid
+    count = summary(request.user)['unpaid_accepted_count']
     
     return JsonResponse({
         'has_accepted_orders': count > 0,
@@ -1248,45 +1219,25 @@ def check_accepted_orders_api(request):
 def get_payment_details_api(request):
     """API endpoint to get payment details for accepted orders"""
     from django.http import JsonResponse
+    from .poll import payment_details
     
     # Only for customers (non-admin)
     if request.user.is_superuser or request.user.is_staff:
         return JsonResponse({'orders': []})
     
-    # Get accepted orders that haven't been paid
-    accepted_orders = Reservation.objects.filter(
-        user=request.user,
-        status='accepted',
-        is_paid=False
-    ).select_related('pig')
-    
-    orders_data = []
-    for order in accepted_orders:
-        # Calculate delivery fee based on delivery option
-        delivery_fee = 125 if order.delivery_option == 'home' else 0
-        total_amount = float(order.pig.price) + delivery_fee
-        
-        # Calculate remaining balance (total - downpayment)
-        downpayment_amount = float(order.down_payment) if order.down_payment else 0
-        remaining_balance = total_amount - downpayment_amount
-        
-        orders_data.append({
-            'id': order.id,
-            'pig_breed': order.pig.breed,
-            'customer_name': order.fullname,
-            'pig_price': float(order.pig.price),
-            'delivery_fee': delivery_fee,
-            'total_amount': total_amount,
-            'downpayment_amount': downpayment_amount,
-            'remaining_balance': remaining_balance,
-            'delivery_option': order.get_delivery_option_display(),
-            'payment_method': order.payment_method,
-            'payment_method_display': order.get_payment_method_display(),
-            'pickup_date': order.pickup_date.strftime('%Y-%m-%d') if order.pickup_date else None,
-            'pickup_time': order.pickup_time.strftime('%H:%M') if order.pickup_time else None
-        })
-    
-    return JsonResponse({'orders': orders_data})
+    return JsonResponse({'orders': payment_details(request.user)})
+
+@login_required
+def poll_api(request):
+    """API endpoint base.html polls for every badge count and notification list.
+
+    Query parameters name the section versions the page already has
+    (e.g. ?pending=<version>); sections that haven't changed are omitted.
+    """
+    from django.http import JsonResponse
+    from .poll import poll
+
+    return JsonResponse({'sections': poll(request.user, request.GET)})
 
 @login_required
 @csrf_exempt
@@ -1373,125 +1324,46 @@ def toggle_payment_status(request, reservation_id):
     """Toggle payment status for a reservation (admin only)"""
     from django.http import JsonResponse
     import json
-    
-    print(f"toggle_payment_status called with reservation_id: {reservation_id}")
-    print(f"Request method: {request.method}")
-    print(f"Request body: {request.body}")
-    print(f"User: {request.user}")
-    print(f"Is admin: {is_admin(request.user)}")
+    from .jobs import enqueue
+    from .transitions import transition
     
     if request.method == 'POST':
         try:
             reservation = get_object_or_404(Reservation, id=reservation_id)
-            print(f"Found reservation: {reservation}")
-            print(f"Current is_paid status: {reservation.is_paid}")
             
-            # Try to get is_paid value from JSON body
+            # Use is_paid from the JSON body if given, otherwise toggle
+            is_paid = not reservation.is_paid
             if request.body:
                 try:
-                    data = json.loads(request.body)
-                    print(f"Parsed JSON data: {data}")
-                    new_status = data.get('is_paid', not reservation.is_paid)
-                    print(f"New status will be: {new_status}")
-                    reservation.is_paid = new_status
-                    
-                    # If marking as paid, complete the order and move to tracking records
-                    if new_status:
-                        reservation.status = 'completed'
-                        print(f"Order marked as completed and will move to tracking records")
-                        
-                        # Create revenue record if it doesn't exist
-                        from .models import Revenue
-                        revenue, created = Revenue.objects.get_or_create(
-                            reservation=reservation,
-                            defaults={
-                                'amount': reservation.pig.price,
-                                'pig_breed': reservation.pig.breed,
-                                'customer_name': reservation.fullname,
-                                'payment_method': reservation.payment_method,
-                            }
-                        )
-                        if created:
-                            print(f"Created revenue record: {revenue.amount}")
-                    else:
-                        # If unchecking, revert back to accepted status
-                        reservation.status = 'accepted'
-                        print(f"Order reverted back to accepted status")
-                        
-                        # Remove revenue record if it exists
-                        from .models import Revenue
-                        try:
-                            revenue = Revenue.objects.get(reservation=reservation)
-                            revenue.delete()
-                            print(f"Removed revenue record")
-                        except Revenue.DoesNotExist:
-                            pass
+                    is_paid = bool(json.loads(request.body).get('is_paid', is_paid))
                 except json.JSONDecodeError as e:
-                    print(f"JSON decode error: {e}")
                     return JsonResponse({'success': False, 'message': f'Invalid JSON data: {str(e)}'})
-            else:
-                # If no body, just toggle
-                print("No request body, toggling status")
-                old_paid_status = reservation.is_paid
-                reservation.is_paid = not reservation.is_paid
-                
-                # Apply the same completion logic
-                if reservation.is_paid:
-                    reservation.status = 'completed'
-                    print(f"Order marked as completed and will move to tracking records")
-                    
-                    # Create revenue record if it doesn't exist
-                    from .models import Revenue
-                    revenue, created = Revenue.objects.get_or_create(
-                        reservation=reservation,
-                        defaults={
-                            'amount': reservation.pig.price,
-                            'pig_breed': reservation.pig.breed,
-                            'customer_name': reservation.fullname,
-                            'payment_method': reservation.payment_method,
-                        }
-                    )
-                    if created:
-                        print(f"Created revenue record: {revenue.amount}")
-                else:
-                    # If unchecking, revert back to accepted status
-                    reservation.status = 'accepted'
-                    print(f"Order reverted back to accepted status")
-                    
-                    # Remove revenue record if it exists
-                    from .models import Revenue
-                    try:
-                        revenue = Revenue.objects.get(reservation=reservation)
-                        revenue.delete()
-                        print(f"Removed revenue record")
-                    except Revenue.DoesNotExist:
-                        pass
             
-            reservation.save()
-            print(f"Saved reservation with is_paid: {reservation.is_paid}")
+            # Paid orders are completed and move to tracking records;
+            # unchecking moves them back to accepted
+            if not transition('mark_paid' if is_paid else 'mark_unpaid', reservation.id):
+                return JsonResponse({'success': False, 'message': f'Order is {reservation.get_status_display().lower()} and cannot be changed'})
+            
+            # Revenue bookkeeping (inline unless a worker runs the job queue)
+            enqueue('sync_revenue', {'reservation_id': reservation.id})
             
             # Create appropriate success message
-            if reservation.is_paid:
+            if is_paid:
                 message = f'Order marked as paid and moved to Tracking Records'
             else:
                 message = f'Order unmarked and moved back to Order Management'
             
             return JsonResponse({
                 'success': True, 
-                'is_paid': reservation.is_paid,
-                'status': reservation.status,
+                'is_paid': is_paid,
+                'status': 'completed' if is_paid else 'accepted',
                 'message': message
             })
-        except Reservation.DoesNotExist:
-            print(f"Reservation {reservation_id} not found")
-            return JsonResponse({'success': False, 'message': 'Reservation not found'})
         except Exception as e:
             import traceback
-            error_trace = traceback.format_exc()
-            print(f"Error in toggle_payment_status: {error_trace}")
+            print(f"Error in toggle_payment_status: {traceback.format_exc()}")
             return JsonResponse({'success': False, 'message': f'Server error: {str(e)}'})
     
-    print(f"Invalid request method: {request.method}")
     return JsonResponse({'success': False, 'message': 'Invalid request method'})
 
 @login_required
@@ -1501,11 +1373,12 @@ def complete_order(request, reservation_id):
         messages.error(request, "Access denied.")
         return redirect('home')
     
+    from .transitions import transition
     try:
-        reservation = get_object_or_404(Reservation, id=reservation_id)
+        reservation = get_object_or_404(Reservation.objects.select_related('pig'), id=reservation_id)
         
-        # Check if already completed
-        if reservation.status == 'completed':
+        # Complete it unless it's already completed
+        if not transition('complete', reservation.id):
             messages.warning(request, "This order is already completed.")
             return redirect('admin_reservation_list')
         
@@ -1521,10 +1394,6 @@ def complete_order(request, reservation_id):
             }
         )
         
-        # Update reservation status
-        reservation.status = 'completed'
-        reservation.save()
-        
         messages.success(request, f"Order completed! ₱{reservation.pig.price} added to revenue.")
         
     except Exception as e:
@@ -1533,6 +1402,7 @@ def complete_order(request, reservation_id):
     return redirect('home')
 
 @login_required
+@read_from_replica
 def revenue_dashboard(request):
     """Revenue dashboard for admin"""
     if not (request.user.is_superuser or request.user.is_staff):
@@ -1572,12 +1442,17 @@ def revenue_dashboard(request):
 
 @login_required
 @user_passes_test(is_admin)
+@read_from_replica
 def tracking_records(request):
     """View for tracking completed orders and sales analytics"""
     from django.db.models import Count, Sum, Q
     from django.db.models.functions import TruncMonth, TruncYear
-    from datetime import datetime, timedelta
+    from datetime import date, datetime, timedelta
     import calendar
+    from .archive import archived_sales
+    
+    # Completed orders moved to the archive only survive as SalesRollup
+    # rows, which are added to each aggregate below
     
     # Get all completed orders
     completed_orders = Reservation.objects.filter(
@@ -1597,21 +1472,23 @@ def tracking_records(request):
     ).order_by('month')
     
     # Prepare monthly data for chart
+    archived_monthly = archived_sales(lambda rollup: rollup.month.month, month__year=current_year)
     monthly_data = []
     for i in range(1, 13):
         month_name = calendar.month_name[i]
         month_data = next((item for item in monthly_sales if item['month'].month == i), None)
+        archived = archived_monthly[i]
         if month_data:
             monthly_data.append({
                 'month': month_name,
-                'orders': month_data['total_orders'],
-                'revenue': float(month_data['total_revenue'] or 0)
+                'orders': month_data['total_orders'] + archived['orders'],
+                'revenue': float((month_data['total_revenue'] or 0) + archived['revenue'])
             })
         else:
             monthly_data.append({
                 'month': month_name,
-                'orders': 0,
-                'revenue': 0
+                'orders': archived['orders'],
+                'revenue': float(archived['revenue'])
             })
     
     # Find peak sales month
@@ -1629,10 +1506,15 @@ def tracking_records(request):
         total_orders=Count('id'),
         total_revenue=Sum('pig__price')
     ).order_by('year')
+    years = {row['year'].year: dict(row, total_revenue=row['total_revenue'] or 0) for row in yearly_sales_raw}
+    for year, archived in archived_sales(lambda rollup: rollup.month.year).items():
+        row = years.setdefault(year, {'year': date(year, 1, 1), 'total_orders': 0, 'total_revenue': 0})
+        row['total_orders'] += archived['orders']
+        row['total_revenue'] += archived['revenue']
     
     # Calculate average order value for each year
     yearly_sales = []
-    for year_data in yearly_sales_raw:
+    for _, year_data in sorted(years.items()):
         avg_order_value = 0
         if year_data['total_orders'] > 0 and year_data['total_revenue']:
             avg_order_value = year_data['total_revenue'] / year_data['total_orders']
@@ -1649,18 +1531,24 @@ def tracking_records(request):
     recent_orders = completed_orders.filter(created_at__gte=thirty_days_ago)
     
     # Top selling pig breeds
-    breed_sales = Reservation.objects.filter(
+    breeds = {row['pig__breed']: row for row in Reservation.objects.filter(
         status='completed'
     ).values('pig__breed').annotate(
         total_sold=Count('id'),
         total_revenue=Sum('pig__price')
-    ).order_by('-total_sold')[:5]
+    )}
+    for breed, archived in archived_sales(lambda rollup: rollup.breed).items():
+        row = breeds.setdefault(breed, {'pig__breed': breed, 'total_sold': 0, 'total_revenue': 0})
+        row['total_sold'] += archived['orders']
+        row['total_revenue'] += archived['revenue']
+    breed_sales = sorted(breeds.values(), key=lambda row: -row['total_sold'])[:5]
     
     # Summary statistics
-    total_completed_orders = completed_orders.count()
-    total_revenue = completed_orders.aggregate(
+    archived_total = archived_sales()[None]
+    total_completed_orders = completed_orders.count() + archived_total['orders']
+    total_revenue = (completed_orders.aggregate(
         total=Sum('pig__price')
-    )['total'] or 0
+    )['total'] or 0) + archived_total['revenue']
     
     import json
     
@@ -1939,21 +1827,11 @@ def customer_conversation(request, conversation_id):
 
 @login_required
 def admin_status_api(request):
-    """API endpoint to check if admin is currently active"""
+    """API endpoint to check if any admin is currently active"""
     from django.http import JsonResponse
-    from django.contrib.auth.models import User
-    from django.utils import timezone
-    from datetime import timedelta
-    
-    # Check if any admin user has been active in the last 5 minutes
-    admin_users = User.objects.filter(is_staff=True)
-    recent_activity = timezone.now() - timedelta(minutes=5)
-    
-    # For now, we'll check if any admin has logged in recently
-    # In a real app, you'd track actual activity like page views, message sending, etc.
-    is_admin_active = admin_users.filter(last_login__gte=recent_activity).exists()
+    from .presence import staff_online
     
-    return JsonResponse({'is_online': is_admin_active})
+    return JsonResponse({'is_online': staff_online()})
 
 @login_required
 @user_passes_test(is_admin)
@@ -1982,14 +1860,9 @@ def admin_create_reservation(request):
                 try:
                     customer_user = User.objects.get(email=customer_email)
                 except User.DoesNotExist:
-                    # Create new user for the customer
-                    username = customer_email.split('@')[0]
-                    # Ensure unique username
-                    counter = 1
-                    original_username = username
-                    while User.objects.filter(username=username).exists():
-                        username = f"{original_username}{counter}"
-                        counter += 1
+                    # Create new user for the customer with a unique username
+                    from .customers import allocate_username
+                    username = allocate_username(customer_email.split('@')[0])
                     
                     customer_user = User.objects.create_user(
                         username=username,
@@ -2041,7 +1914,7 @@ def admin_create_reservation(request):
             messages.error(request, f'Error creating reservation: {str(e)}')
     
     # Get available pigs for the form
-    available_pigs = Pig.objects.filter(is_available=True).order_by('breed', 'age_months')
+    available_pigs = inventory.available_pigs(order_by=['breed', 'age_months'])
     
     context = {
         'available_pigs': available_pigs,
@@ -2087,3 +1960,87 @@ def check_message_status_api(request, conversation_id):
             'success': False,
             'error': str(e)
         })
+
+@login_required
+@user_passes_test(is_admin)
+def metrics_api(request):
+    """API endpoint exposing runtime metrics (database, sessions, job queue, order transitions) for staff"""
+    from django.http import JsonResponse
+    from .jobs import queue_stats
+    from .metrics import db_stats, get_counters
+    from .sessions import session_stats
+    from .transitions import TRANSITIONS
+
+    return JsonResponse({
+        'db': db_stats(),
+        'sessions': session_stats(),
+        'jobs': queue_stats(),
+        'transitions': get_counters([f'reservations.{name}' for name in TRANSITIONS]),
+    })
+
+@login_required
+@user_passes_test(is_admin)
+def search_api(request):
+    """Unified staff search over pigs, customers, reservations and messages"""
+    from django.http import JsonResponse
+    from .models import SearchDocument
+    from .search import search
+
+    query = request.GET.get('q', '').strip()
+    kinds = [kind for kind in request.GET.getlist('type') if kind in dict(SearchDocument.KIND_CHOICES)]
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+        page_size = min(max(int(request.GET.get('page_size', 20)), 1), 50)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid page'}, status=400)
+
+    # Fetch one extra row to know whether there is a next page without a COUNT
+    documents = search(query, kinds=kinds, limit=page_size + 1, offset=(page - 1) * page_size)
+
+    results = []
+    for document in documents[:page_size]:
+        results.append({
+            'type': document.kind,
+            'id': document.object_id,
+            'title': document.title,
+            'snippet': document.body[:160],
+            'url': document.url,
+            'rank': round(float(document.rank), 4),
+        })
+
+    return JsonResponse({
+        'success': True,
+        'query': query,
+        'page': page,
+        'has_next': len(documents) > page_size,
+        'results': results,
+    })
+
+@login_required
+@user_passes_test(is_admin)
+def customer_autocomplete_api(request):
+    """API endpoint for picking an existing customer while staff type"""
+    from django.http import JsonResponse
+    from .customers import autocomplete_customers
+
+    query = request.GET.get('q', '').strip()
+    if len(query) < 2:
+        return JsonResponse({'customers': []})
+
+    customers_data = []
+    for user in autocomplete_customers(query):
+        try:
+            profile = user.userprofile
+        except UserProfile.DoesNotExist:
+            profile = None
+        full_name = f"{profile.first_name} {profile.last_name}".strip() if profile else ''
+        customers_data.append({
+            'id': user.id,
+            'username': user.username,
+            'fullname': full_name or user.get_full_name() or user.username,
+            'email': user.email or (profile.email if profile else ''),
+            'contact_number': profile.cellphone_number if profile else '',
+            'address': profile.address if profile else '',
+        })
+
+    return JsonResponse({'customers': customers_data})
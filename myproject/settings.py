@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 
+import dj_database_url
 from decouple import config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -50,10 +51,16 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'myapp.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'myapp.ratelimit.RateLimitMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Outside ReplicaPinningMiddleware: a presence heartbeat is not a user
+    # write and must not pin the browser to the primary
+    'myapp.presence.PresenceMiddleware',
+    'myapp.db_routers.ReplicaPinningMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -82,21 +89,208 @@ TEMPLATES = [
 WSGI_APPLICATION = 'myproject.wsgi.application'
 
 
-# Database - connect directly to Render Postgres (ignore DATABASE_URL env)
+# Database - parsed from DATABASE_URL (defaults to the Render Postgres).
+# Use DATABASE_URL=sqlite:///db.sqlite3 to work offline, or point it at a
+# local Postgres container.
+DEFAULT_DATABASE_URL = (
+    'postgres://maribeth_pigfarm_user:TNcXpvazOmoGP9bROav25W7C7xGZf85J'
+    '@dpg-d5f3e6chg0os73ftgv2g-a.oregon-postgres.render.com:5432/maribeth_pigfarm'
+    '?sslmode=require'
+)
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=600, cast=int)
+# Ping reused connections before handing them out so a connection dropped by
+# the server doesn't surface as a 500
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+
 DATABASES = {
+    'default': dj_database_url.parse(
+        config('DATABASE_URL', default=DEFAULT_DATABASE_URL),
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
+    ),
+}
+
+# Optional read replica for reporting and catalog pages (see
+# myapp.db_routers). Two SQLite files work as stand-ins locally.
+DATABASE_REPLICA_URL = config('DATABASE_REPLICA_URL', default='')
+if DATABASE_REPLICA_URL:
+    DATABASES['replica'] = dj_database_url.parse(
+        DATABASE_REPLICA_URL,
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
+        # Tests see the replica as the same database as default
+        test_options={'MIRROR': 'default'},
+    )
+
+DATABASE_ROUTERS = ['myapp.db_routers.PrimaryReplicaRouter']
+
+# Seconds a browser keeps reading from the primary after it wrote, so users
+# always see their own changes despite replication lag
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=15, cast=int)
+
+# Opt-in connection pool (Django 5.1+ with psycopg[pool]). Pooled connections
+# skip the TLS + auth handshake on checkout; persistent connections must be
+# disabled when the pool is on.
+if config('DB_POOL', default=False, cast=bool):
+    for db in DATABASES.values():
+        if db['ENGINE'] != 'django.db.backends.postgresql':
+            continue
+        db['CONN_MAX_AGE'] = 0
+        db.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+            'max_idle': config('DB_POOL_MAX_IDLE', default=300, cast=float),
+            'max_lifetime': config('DB_POOL_MAX_LIFETIME', default=1800, cast=float),
+        }
+
+
+# Response compression (myapp.compression) - brotli when the Brotli package
+# is installed and the client accepts it, gzip otherwise. Brotli quality 11
+# is meant for static assets; 4-5 suits per-request HTML. Pages that embed a
+# CSRF token always get gzip, with up to COMPRESSION_GZIP_RANDOM_BYTES of
+# random header padding (as GZipMiddleware) to blunt BREACH.
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=500, cast=int)
+COMPRESSION_GZIP_RANDOM_BYTES = config('COMPRESSION_GZIP_RANDOM_BYTES', default=100, cast=int)
+COMPRESSION_BROTLI_QUALITY = config('COMPRESSION_BROTLI_QUALITY', default=5, cast=int)
+# Collapse indentation in HTML before compressing (see
+# myapp.compression.minify_html for what is left untouched)
+COMPRESSION_MINIFY_HTML = config('COMPRESSION_MINIFY_HTML', default=False, cast=bool)
+
+
+# Cache - shared by rate limiting and the metrics counters. Point
+# CACHE_BACKEND/CACHE_LOCATION at Redis or Memcached when running several
+# workers so they share counters.
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'maribeth_pigfarm',
-        'USER': 'maribeth_pigfarm_user',
-        'PASSWORD': 'TNcXpvazOmoGP9bROav25W7C7xGZf85J',
-        'HOST': 'dpg-d5f3e6chg0os73ftgv2g-a.oregon-postgres.render.com',
-        'PORT': '5432',
-        'OPTIONS': {
-            'sslmode': 'require',
-        },
-        'CONN_MAX_AGE': 600,
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='maribeth-pigfarm'),
     }
 }
+# Whether every worker sees the same cache. Caches that rely on another
+# worker's invalidation are shortened or switched off when it doesn't.
+CACHE_IS_SHARED = not CACHES['default']['BACKEND'].endswith('LocMemCache')
+
+# Seconds a worker may serve its in-memory pig inventory snapshot before
+# reloading it. Pig writes invalidate it at once when the cache is shared.
+INVENTORY_SNAPSHOT_MAX_AGE = config('INVENTORY_SNAPSHOT_MAX_AGE', default=30, cast=int)
+
+# Seconds the available pigs page's facet counts stay cached. A Pig write
+# moves the catalog version in their key, but only the writing worker sees
+# that with locmem, so they then live no longer than the inventory snapshot.
+FACET_CACHE_TIMEOUT = config('FACET_CACHE_TIMEOUT', default=600 if CACHE_IS_SHARED else INVENTORY_SNAPSHOT_MAX_AGE,
+                             cast=int)
+
+
+# Sessions - cached_db serves the session read on every request (including
+# the badge polls) from the cache. It needs a cache shared by all workers,
+# so with the per-process locmem cache we stay on plain DB sessions.
+# Expired rows are removed by `manage.py clear_expired_sessions`.
+SESSION_ENGINE = config(
+    'SESSION_ENGINE',
+    default='django.contrib.sessions.backends.db'
+    if CACHES['default']['BACKEND'].endswith('LocMemCache') else 'myapp.sessions',
+)
+
+
+# Authentication - ProfileBackend loads request.user together with its
+# UserProfile in one query and caches the pair for AUTH_USER_CACHE_SECONDS.
+# Saves drop the cached copy only in the writing worker's cache, so caching
+# is off by default with the per-process locmem cache.
+AUTHENTICATION_BACKENDS = [
+    'myapp.auth_backends.ProfileBackend',
+    # Still resolves sessions that logged in through it before the switch
+    'django.contrib.auth.backends.ModelBackend',
+]
+AUTH_USER_CACHE_SECONDS = config(
+    'AUTH_USER_CACHE_SECONDS',
+    default=0 if CACHES['default']['BACKEND'].endswith('LocMemCache') else 300,
+    cast=int,
+)
+
+
+# Seconds myapp.account_summary may serve a customer's order counts from
+# the cache. Off by default with locmem, for the same reason as above.
+ACCOUNT_SUMMARY_CACHE_SECONDS = config(
+    'ACCOUNT_SUMMARY_CACHE_SECONDS',
+    default=0 if CACHES['default']['BACKEND'].endswith('LocMemCache') else 300,
+    cast=int,
+)
+
+# Rate limiting (myapp.ratelimit), keyed by URL name. 'ip' and 'user' are
+# separate buckets written as '<requests>/<s|m|h|d>'; 'methods' restricts
+# the rule to those HTTP methods.
+RATE_LIMIT_ENABLED = config('RATE_LIMIT_ENABLED', default=True, cast=bool)
+# Render's proxy appends the real client address to X-Forwarded-For
+RATE_LIMIT_TRUST_X_FORWARDED_FOR = config('RATE_LIMIT_TRUST_X_FORWARDED_FOR', default=True, cast=bool)
+
+_POLLING_LIMIT = {'ip': '120/m', 'user': '30/m'}
+RATE_LIMITS = {
+    'login': {'methods': ['POST'], 'ip': '20/m', 'user': '5/m'},
+    'signup': {'methods': ['POST'], 'ip': '10/h'},
+    'pending_count_api': _POLLING_LIMIT,
+    'pending_orders_api': _POLLING_LIMIT,
+    'notifications_api': _POLLING_LIMIT,
+    'check_accepted_orders_api': _POLLING_LIMIT,
+    'get_payment_details_api': _POLLING_LIMIT,
+    'poll_api': _POLLING_LIMIT,
+    'presence_api': _POLLING_LIMIT,
+    'admin_status_api': _POLLING_LIMIT,
+    'check_message_status_api': _POLLING_LIMIT,
+    # Single-user presence lookups; the admin inbox batches through presence_api
+    'user_status_api': {'ip': '600/m', 'user': '300/m'},
+}
+
+
+# Presence (myapp.presence): a user reads as online for
+# PRESENCE_TIMEOUT_SECONDS after their last request; PresenceMiddleware
+# refreshes the heartbeat at most every PRESENCE_HEARTBEAT_SECONDS
+PRESENCE_TIMEOUT_SECONDS = config('PRESENCE_TIMEOUT_SECONDS', default=300, cast=int)
+PRESENCE_HEARTBEAT_SECONDS = config('PRESENCE_HEARTBEAT_SECONDS', default=60, cast=int)
+# Keep heartbeats in UserProfile.last_seen instead of the cache, so every
+# worker sees them; the default whenever the cache is per-process
+PRESENCE_IN_DB = config('PRESENCE_IN_DB', default=not CACHE_IS_SHARED, cast=bool)
+
+
+# `manage.py expire_reservations` expires orders still pending after this
+# many hours (releasing the pig) and prunes cart rows older than
+# CART_TTL_DAYS
+RESERVATION_PENDING_TTL_HOURS = config('RESERVATION_PENDING_TTL_HOURS', default=72, cast=int)
+CART_TTL_DAYS = config('CART_TTL_DAYS', default=14, cast=int)
+
+
+# `manage.py prune_notifications` deletes notifications older than this
+NOTIFICATION_RETENTION_DAYS = config('NOTIFICATION_RETENTION_DAYS', default=90, cast=int)
+
+
+# admin_feedback_list statistics come from the per-day FeedbackRollup table
+# instead of aggregating every Feedback row. Worth it once there is a lot of
+# feedback; run `manage.py rebuild_feedback_rollup` before turning it on.
+FEEDBACK_STATS_FROM_ROLLUP = config('FEEDBACK_STATS_FROM_ROLLUP', default=False, cast=bool)
+
+
+# Django admin changelists show the Postgres planner's row estimate instead
+# of running COUNT(*) for unfiltered tables at least this large
+ADMIN_ESTIMATED_COUNT_MIN_ROWS = config('ADMIN_ESTIMATED_COUNT_MIN_ROWS', default=10000, cast=int)
+
+
+# `manage.py archive_records` moves finished reservations and read
+# messages/notifications older than this into ArchivedRecord
+ARCHIVE_AFTER_MONTHS = config('ARCHIVE_AFTER_MONTHS', default=12, cast=int)
+
+
+# Background jobs (myapp.jobs). Tasks run inside the request until a
+# worker is deployed: set JOBS_RUN_INLINE=False only alongside a process
+# running `manage.py run_worker`, or queued jobs are never run.
+JOBS_RUN_INLINE = config('JOBS_RUN_INLINE', default=True, cast=bool)
+JOBS_CONCURRENCY = config('JOBS_CONCURRENCY', default=4, cast=int)
+JOBS_MAX_ATTEMPTS = config('JOBS_MAX_ATTEMPTS', default=5, cast=int)
+# Retry delays double from JOBS_BACKOFF_BASE seconds up to JOBS_MAX_BACKOFF
+JOBS_BACKOFF_BASE = config('JOBS_BACKOFF_BASE', default=30, cast=int)
+JOBS_MAX_BACKOFF = config('JOBS_MAX_BACKOFF', default=3600, cast=int)
+# A running job whose worker hasn't finished it after this many seconds is
+# assumed dead and handed to another worker
+JOBS_LOCK_TIMEOUT = config('JOBS_LOCK_TIMEOUT', default=600, cast=int)
 
 
 # Password validation
@@ -118,6 +312,21 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing - Argon2 first; the others are only kept so existing
+# hashes still verify. Django re-hashes them with Argon2 on the next
+# successful login. Run `manage.py benchmark_hashers` to size these costs
+# for the host (memory_cost is in KiB).
+PASSWORD_HASHERS = [
+    'myapp.hashers.TunedArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+ARGON2_TIME_COST = config('ARGON2_TIME_COST', default=2, cast=int)
+ARGON2_MEMORY_COST = config('ARGON2_MEMORY_COST', default=19456, cast=int)
+ARGON2_PARALLELISM = config('ARGON2_PARALLELISM', default=1, cast=int)
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -19,22 +19,18 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import TemplateView
-from django.contrib.sitemaps.views import sitemap as django_sitemap
 
-from myapp.sitemaps import PigSitemap, UserProfileSitemap, FeedbackSitemap, StaticViewSitemap
+from myapp.http_cache import cache_policy
+from myapp.sitemaps import PigSitemap, StaticViewSitemap, sitemap_response
 
 
 def sitemap_view(request, section=None):
-    """Serve sitemap without X-Robots-Tag header to allow indexing."""
-    response = django_sitemap(request, sitemaps, section=section)
-    response.headers.pop("X-Robots-Tag", None)
-    return response
+    """Serve the sitemap (or one paged section), without an X-Robots-Tag header to allow indexing."""
+    return sitemap_response(request, sitemaps, section=section)
 
 
 sitemaps = {
     'pigs': PigSitemap,
-    'users': UserProfileSitemap,
-    'feedback': FeedbackSitemap,
     'pages': StaticViewSitemap,
 }
 
@@ -43,21 +39,26 @@ urlpatterns = [
     path('', include('myapp.urls')),
     path(
         'googlebf784462d42b7884.html',
-        TemplateView.as_view(
-            template_name='googlebf784462d42b7884.html',
-            content_type='text/plain'
+        cache_policy(max_age=86400, public=True, per_user=False, templates=['googlebf784462d42b7884.html'])(
+            TemplateView.as_view(
+                template_name='googlebf784462d42b7884.html',
+                content_type='text/plain'
+            )
         ),
         name='google-site-verification'
     ),
     path(
         'robots.txt',
-        TemplateView.as_view(
-            template_name='robots.txt',
-            content_type='text/plain'
+        cache_policy(max_age=86400, public=True, per_user=False, templates=['robots.txt'])(
+            TemplateView.as_view(
+                template_name='robots.txt',
+                content_type='text/plain'
+            )
         ),
         name='robots'
     ),
     path('sitemap.xml', sitemap_view, name='sitemap'),
+    path('sitemap-<str:section>.xml', sitemap_view, name='sitemap_section'),
 ]
 
 if settings.DEBUG: